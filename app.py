@@ -2,13 +2,28 @@
 import streamlit as st
 import os
 import tempfile
-from utils.ai_service import AIService
-from utils.ppt_generator import PPTGenerator
+from contextlib import nullcontext
+from utils.metrics import metrics, profile
 from utils.templates import ResumeTemplates
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Decks larger than this are spooled to a per-session temporary file
+SPOOL_THRESHOLD_BYTES = 5 * 1024 * 1024
+
+# When set, generation runs in the out-of-process job service (python -m utils.job_service)
+GENERATION_SERVICE_URL = os.getenv("GENERATION_SERVICE_URL")
+
+# Slide thumbnails shown per preview page
+PREVIEW_PAGE_SIZE = 6
+PREVIEW_COLUMNS = 3
+# Slides shown per color scheme when comparing schemes
+SCHEME_PREVIEW_SLIDES = 2
+
+# AI Service choices in the sidebar
+SERVICE_TYPES = {"OpenAI": "openai", "Perplexity AI": "perplexity", "Offline (rule-based)": "offline"}
+
 # Page configuration
 st.set_page_config(
     page_title="AI Resume PowerPoint Generator",
@@ -22,8 +37,316 @@ if 'generate_clicked' not in st.session_state:
     st.session_state.generate_clicked = False
 if 'download_ready' not in st.session_state:
     st.session_state.download_ready = False
-if 'temp_file' not in st.session_state:
-    st.session_state.temp_file = None
+if 'presentation' not in st.session_state:
+    st.session_state.presentation = None
+if 'generated_scheme' not in st.session_state:
+    st.session_state.generated_scheme = None
+if 'themed_presentation' not in st.session_state:
+    # (color scheme, deck bytes) of the last re-themed copy offered for download
+    st.session_state.themed_presentation = None
+if 'profile_report' not in st.session_state:
+    st.session_state.profile_report = None
+if 'pipeline' not in st.session_state:
+    st.session_state.pipeline = None
+if 'imported' not in st.session_state:
+    st.session_state.imported = {}
+if 'tenant_id' not in st.session_state:
+    # Each browser session is its own tenant for fair queueing at the shared rate limiter
+    import uuid
+    st.session_state.tenant_id = f"session-{uuid.uuid4().hex[:12]}"
+
+
+def store_presentation(ppt_gen=None, data=None, color_scheme=None):
+    """
+    Keep the generated deck in memory, spilling to disk only above the threshold,
+    with the color scheme it was built in (detected from the deck when not given)
+    """
+    previous = st.session_state.presentation
+    if previous is not None:
+        previous.close()
+    
+    presentation = tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD_BYTES)
+    if ppt_gen is not None:
+        ppt_gen.save_to(presentation)
+    else:
+        presentation.write(data)
+    st.session_state.presentation = presentation
+    
+    if color_scheme is None:
+        from utils.retheme import detect_scheme
+        try:
+            color_scheme = detect_scheme(presentation_bytes())
+        except ValueError:
+            # Not in a known scheme, so the deck is offered only as built
+            color_scheme = None
+    st.session_state.generated_scheme = color_scheme
+    st.session_state.themed_presentation = None
+
+
+def presentation_bytes():
+    """Read back the deck stored for this session"""
+    presentation = st.session_state.presentation
+    presentation.seek(0)
+    return presentation.read()
+
+
+@st.cache_resource
+def get_response_cache():
+    """Response cache shared by every session in this process"""
+    from utils.cache import ResponseCache
+    return ResponseCache()
+
+
+@st.cache_resource
+def get_ai_service(service_type, offline_fallback=False):
+    """One AI service per provider, so its HTTP client and connection pool are reused across sessions"""
+    from utils.ai_service import AIService
+    return AIService(service_type=service_type, cache=get_response_cache(), offline_fallback=offline_fallback)
+
+
+def show_previews(data):
+    """Render thumbnails for one page of a deck"""
+    import io
+    from pptx import Presentation
+    from utils.preview import render_thumbnails
+    
+    prs = Presentation(io.BytesIO(data))
+    slide_count = len(prs.slides)
+    pages = (slide_count + PREVIEW_PAGE_SIZE - 1) // PREVIEW_PAGE_SIZE
+    page = st.number_input("Preview page", min_value=1, max_value=max(pages, 1), value=1) - 1
+    
+    columns = st.columns(PREVIEW_COLUMNS)
+    start = page * PREVIEW_PAGE_SIZE
+    for offset, thumbnail in enumerate(render_thumbnails(prs, start=start, count=PREVIEW_PAGE_SIZE)):
+        with columns[offset % PREVIEW_COLUMNS]:
+            st.image(thumbnail, caption=f"Slide {start + offset + 1} of {slide_count}", use_column_width=True)
+
+
+def show_scheme_previews(data, from_scheme):
+    """Render the first slides of a deck in every color scheme, re-themed without rebuilding it"""
+    import io
+    from pptx import Presentation
+    from utils.preview import render_thumbnails
+    from utils.retheme import retheme_all
+    
+    decks = retheme_all(data, from_scheme=from_scheme)
+    columns = st.columns(len(decks))
+    for column, (scheme_name, deck) in zip(columns, decks.items()):
+        with column:
+            st.caption(scheme_name.capitalize())
+            for thumbnail in render_thumbnails(Presentation(io.BytesIO(deck)), count=SCHEME_PREVIEW_SLIDES):
+                st.image(thumbnail, use_column_width=True)
+
+
+def import_resumes(uploads):
+    """Parse newly uploaded resume files in parallel (keyed by content hash so reruns skip them) and pick one"""
+    import json
+    from utils.ingest import ingest_files
+    
+    imported = st.session_state.imported
+    files = [(upload.name, upload.getvalue()) for upload in uploads]
+    # Small uploads are not worth starting worker processes for
+    workers = 1 if len(files) <= 2 else None
+    for result in ingest_files(files, workers=workers, seen=imported):
+        if "error" in result:
+            st.warning(f"Could not import {result['source']}: {result['error']}")
+        elif not result.get("duplicate"):
+            imported[result["hash"]] = {"source": result["source"], "user_data": result["user_data"]}
+    
+    if not imported:
+        return {}
+    choices = {f"{entry['source']} ({entry['user_data']['name']})": entry for entry in imported.values()}
+    choice = st.selectbox("Fill the form from", list(choices))
+    st.download_button(
+        label="Download imported resumes as batch JSONL",
+        data="".join(
+            json.dumps({"id": os.path.splitext(entry["source"])[0], "user_data": entry["user_data"]}) + "\n"
+            for entry in imported.values()
+        ),
+        file_name="resumes.jsonl",
+        mime="application/jsonl",
+        help="Input for python -m utils.batch"
+    )
+    return choices[choice]["user_data"]
+
+
+@st.cache_resource
+def get_job_client():
+    """HTTP client for the generation service, shared by every session"""
+    from utils.job_service import JobClient
+    return JobClient(GENERATION_SERVICE_URL)
+
+
+def wait_for_job(job_id, progress_bar, status_text):
+    """Poll the generation service and return the finished deck bytes, or None on failure"""
+    client = get_job_client()
+    
+    def on_status(info):
+        if info["status"] == "queued":
+            status_text.text(f"Waiting in queue (position {info.get('queue_position', 0) + 1})...")
+        elif info["status"] == "running":
+            status_text.text("Generating content with AI...")
+            progress_bar.progress(50)
+    
+    try:
+        info = client.wait(job_id, on_status=on_status)
+        if info["status"] != "done":
+            st.query_params.pop("job", None)
+            st.error(info.get("error", "Unknown error"))
+            return None
+        return client.result(job_id)
+    except Exception as e:
+        st.error(f"Generation Service Error: {str(e)}")
+        return None
+
+
+def build_presentation_remotely(user_data, service_type, template, parallel_sections, progress_bar, status_text,
+                                offline_fallback=False):
+    """Submit the request to the generation service and wait for the deck"""
+    try:
+        job_id = get_job_client().submit({
+            "user_data": user_data,
+            "service_type": service_type,
+            "template": template,
+            "parallel_sections": parallel_sections,
+            "tenant": st.session_state.tenant_id,
+            "offline_fallback": offline_fallback
+        })
+    except Exception as e:
+        st.error(f"Generation Service Error: {str(e)}")
+        return None
+    
+    # Keep the job id in the URL so a reload resumes polling instead of resubmitting
+    st.query_params["job"] = job_id
+    return wait_for_job(job_id, progress_bar, status_text)
+
+
+def warn_failed_sections(sections):
+    """Tell the user which sections could not be generated and were left out of the deck"""
+    if sections:
+        names = ", ".join(section.replace("_", " ") for section in sections)
+        st.warning(f"Could not generate {names}, so those slides are missing. Try generating again.")
+
+
+def build_presentation(user_data, service_type, template, stream_generation, parallel_sections, incremental,
+                       progress_bar, status_text, hedge_requests=False, offline_fallback=False):
+    """
+    Generate AI content and build the deck, reporting errors in the page. Returns the
+    PPTGenerator, or the .pptx bytes of a deck built without streaming.
+    """
+    # Generation modules are imported on first use so plain reruns stay cheap
+    from utils.ppt_generator import PPTGenerator
+    from utils.slide_plan import compile_plan
+    
+    ai = get_ai_service(service_type, offline_fallback)
+    # The template's slide plan decides which sections are generated and in what order they are built
+    plan = compile_plan(template)
+    
+    if service_type == "offline":
+        # Rule-based content takes milliseconds, so there is nothing to hedge
+        hedge_requests = False
+    if hedge_requests:
+        # Hedged requests race both providers, so they are not streamed or incremental
+        stream_generation = incremental = False
+    
+    if incremental:
+        return build_presentation_incrementally(ai, user_data, plan, progress_bar, status_text)
+
+    if stream_generation:
+        # Build each section's slides as soon as the model finishes writing it
+        status_text.text("Generating content with AI...")
+        ppt_gen = PPTGenerator()
+        ppt_gen.set_color_scheme(plan.color_scheme)
+        completed = 0
+        generated = {}
+        try:
+            if parallel_sections:
+                events = ai.stream_resume_content_by_section(user_data, list(plan.sections))
+            else:
+                events = ai.stream_resume_content(user_data, plan.sections)
+            for event in events:
+                # An error naming a section only drops that section; the rest of the deck is still built
+                if event.kind == "error" and event.section is None:
+                    st.error(f"AI Content Generation Failed: {event.value}")
+                    return None
+                if event.kind == "done":
+                    generated = event.value
+                ppt_gen.add_stream_event(event)
+                if event.kind == "section":
+                    completed += 1
+                    progress_bar.progress(20 + int(70 * min(completed, len(plan.sections)) / len(plan.sections)))
+                    status_text.text(f"Created {event.section.replace('_', ' ')} slides...")
+            ppt_gen.reorder_sections(plan.sections)
+        except Exception as e:
+            st.error(f"Presentation Generation Error: {str(e)}")
+            return None
+        warn_failed_sections([section for section in plan.sections if section not in generated])
+    else:
+        # Generate content with AI
+        status_text.text("Generating content with AI...")
+        progress_bar.progress(40)
+        if hedge_requests:
+            from utils.hedging import generate_hedged
+            ai_content = generate_hedged(user_data, service_type, cache=get_response_cache(),
+                                         by_section=parallel_sections, sections=list(plan.sections),
+                                         offline_fallback=offline_fallback)
+        elif parallel_sections:
+            ai_content = ai.generate_resume_content_by_section(user_data, list(plan.sections))
+        else:
+            ai_content = ai.generate_resume_content(user_data, plan.sections)
+
+        status_text.text("Creating your presentation...")
+        progress_bar.progress(60)
+
+        # Generate PowerPoint
+        if not isinstance(ai_content, dict) or "error" in ai_content:
+            st.error(f"AI Content Generation Failed: {ai_content.get('error', 'Unknown error')}")
+            return None
+        warn_failed_sections([section for section in plan.sections if section not in ai_content])
+
+        try:
+            # Large decks are rendered as section groups in worker processes and merged
+            from utils.deck_merge import build_deck
+            return build_deck(ai_content, plan.color_scheme, plan.sections)
+        except Exception as e:
+            st.error(f"Presentation Generation Error: {str(e)}")
+            return None
+
+    return ppt_gen
+
+
+def build_presentation_incrementally(ai, user_data, plan, progress_bar, status_text):
+    """Regenerate and re-render only the sections whose inputs changed since the last run"""
+    from utils.incremental import IncrementalPipeline
+    
+    pipeline = st.session_state.pipeline
+    if pipeline is None or pipeline.ai.service_type != ai.service_type:
+        pipeline = IncrementalPipeline(ai)
+        st.session_state.pipeline = pipeline
+    
+    dirty = pipeline.dirty_sections(user_data, plan.sections)
+    status_text.text(f"Generating {len(dirty)} changed section(s) with AI...")
+    completed = []
+    
+    def on_section(section):
+        completed.append(section)
+        progress_bar.progress(20 + int(70 * len(completed) / max(len(dirty), 1)))
+        status_text.text(f"Created {section.replace('_', ' ')} slides...")
+    
+    try:
+        result = pipeline.run(user_data, plan.color_scheme, on_section, plan.sections)
+    except Exception as e:
+        st.error(f"Presentation Generation Error: {str(e)}")
+        return None
+    
+    if isinstance(result, dict):
+        st.error(f"AI Content Generation Failed: {result.get('error', 'Unknown error')}")
+        return None
+    if pipeline.stale_sections:
+        names = ", ".join(section.replace("_", " ") for section in pipeline.stale_sections)
+        st.warning(f"Could not regenerate {names}, so those slides still show your previous input.")
+    warn_failed_sections([section for section in plan.sections if section not in pipeline.ai_content])
+    return result
 
 
 def main():
@@ -36,9 +359,9 @@ def main():
         
         ai_service = st.selectbox(
             "AI Service",
-            ["OpenAI", "Perplexity AI"],
+            list(SERVICE_TYPES),
             index=0,
-            help="Select the AI service to use for content generation"
+            help="Select the AI service to use for content generation, or build the content offline with rules"
         )
         
         template = st.selectbox(
@@ -48,11 +371,54 @@ def main():
             help="Select a template style for your presentation"
         )
         
+        stream_generation = st.checkbox(
+            "Stream generation",
+            value=True,
+            help="Build slides while the AI is still writing instead of waiting for the full response"
+        )
+        
+        parallel_sections = st.checkbox(
+            "Generate sections in parallel",
+            value=False,
+            help="Send one smaller request per section concurrently instead of one large request"
+        )
+        
+        incremental = st.checkbox(
+            "Only regenerate changed sections",
+            value=False,
+            help="On resubmit, regenerate and rebuild only the sections whose inputs changed. "
+                 "Sections are always requested one by one in parallel."
+        )
+        
+        hedge_requests = st.checkbox(
+            "Hedge slow requests",
+            value=False,
+            help="Also ask the other AI service when the selected one is slower than usual, using whichever answers first"
+        )
+        
+        offline_fallback = st.checkbox(
+            "Fall back to offline generation",
+            value=True,
+            help="If the AI service fails or has no API key, build the content from your input with rules instead"
+        )
+        
+        profile_generation = st.checkbox(
+            "Profile next generation",
+            value=False,
+            help="Record a cProfile report for the next generation"
+        )
+        
         st.markdown("---")
         st.markdown("### About")
         st.markdown("This tool uses AI to transform your resume information into a professional PowerPoint presentation.")
         st.markdown("Your data is processed securely and not stored permanently.")
     
+    # Existing resumes can be imported to fill the form
+    with st.expander("Import existing resumes (.docx, .txt)"):
+        uploads = st.file_uploader("Resume files", type=["docx", "txt"], accept_multiple_files=True)
+        prefill = import_resumes(uploads or [])
+    contact = prefill.get("contact", {})
+    
     # Main form for resume information
     with st.form("resume_form"):
         st.header("Your Resume Information")
@@ -60,18 +426,19 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            name = st.text_input("Full Name", placeholder="John Doe")
-            title = st.text_input("Professional Title", placeholder="Senior Software Engineer")
-            email = st.text_input("Email", placeholder="john.doe@example.com")
-            phone = st.text_input("Phone", placeholder="+1 (123) 456-7890")
+            name = st.text_input("Full Name", value=prefill.get("name", ""), placeholder="John Doe")
+            title = st.text_input("Professional Title", value=prefill.get("title", ""), placeholder="Senior Software Engineer")
+            email = st.text_input("Email", value=contact.get("email", ""), placeholder="john.doe@example.com")
+            phone = st.text_input("Phone", value=contact.get("phone", ""), placeholder="+1 (123) 456-7890")
         
         with col2:
-            linkedin = st.text_input("LinkedIn", placeholder="linkedin.com/in/johndoe")
-            portfolio = st.text_input("Portfolio/Website", placeholder="johndoe.com")
+            linkedin = st.text_input("LinkedIn", value=contact.get("linkedin", ""), placeholder="linkedin.com/in/johndoe")
+            portfolio = st.text_input("Portfolio/Website", value=contact.get("portfolio", ""), placeholder="johndoe.com")
         
         st.subheader("Professional Summary")
         summary = st.text_area(
             "Summary",
+            value=prefill.get("summary", ""),
             placeholder="A brief summary of your professional background and career goals.",
             height=100
         )
@@ -79,6 +446,7 @@ def main():
         st.subheader("Work Experience")
         experience = st.text_area(
             "Experience",
+            value=prefill.get("experience", ""),
             placeholder="Describe your work experience in detail. Format: Job Title, Company, Dates, Responsibilities (separate multiple positions with a new line)",
             height=200
         )
@@ -86,6 +454,7 @@ def main():
         st.subheader("Education")
         education = st.text_area(
             "Education",
+            value=prefill.get("education", ""),
             placeholder="List your education details. Format: Degree, Institution, Year, GPA/Achievements (separate multiple entries with a new line)",
             height=100
         )
@@ -93,6 +462,7 @@ def main():
         st.subheader("Skills")
         skills = st.text_area(
             "Skills",
+            value=prefill.get("skills", ""),
             placeholder="List your skills, preferably categorized (e.g., Technical: Python, Java; Soft: Communication, Leadership)",
             height=100
         )
@@ -100,6 +470,7 @@ def main():
         st.subheader("Achievements & Certifications")
         achievements = st.text_area(
             "Achievements",
+            value=prefill.get("achievements", ""),
             placeholder="List your key achievements, awards, and certifications",
             height=100
         )
@@ -139,42 +510,33 @@ def main():
                 }
                 
                 # Initialize AI service
-                service_type = "perplexity" if ai_service == "Perplexity AI" else "openai"
-
-                ai = AIService(service_type=service_type)
-                
-                # Generate content with AI
-                status_text.text("Generating content with AI...")
-                progress_bar.progress(40)
-                ai_content = ai.generate_resume_content(user_data)
+                service_type = SERVICE_TYPES[ai_service]
                 
-                # Initialize PowerPoint generator
-                status_text.text("Creating your presentation...")
-                progress_bar.progress(60)
-                ppt_gen = PPTGenerator()
-                
-                # Get template details
-                template_details = ResumeTemplates.get_template_structure(template)
-                
-                # Generate PowerPoint
-                if not isinstance(ai_content, dict) or "error" in ai_content:
-                    st.error(f"AI Content Generation Failed: {ai_content.get('error', 'Unknown error')}")
-                    return
-
-                try:
-                    ppt_gen.generate_from_ai_content(ai_content, template_details["color_scheme"])
-                except Exception as e:
-                    st.error(f"Presentation Generation Error: {str(e)}")
+                # Optionally profile this single request with cProfile
+                from utils.rate_limiter import tenant_context
+                profiler = profile() if profile_generation else nullcontext()
+                with profiler as report, tenant_context(st.session_state.tenant_id):
+                    if GENERATION_SERVICE_URL:
+                        data = build_presentation_remotely(
+                            user_data, service_type, template, parallel_sections, progress_bar, status_text,
+                            offline_fallback
+                        )
+                        ppt_gen = None
+                    else:
+                        result = build_presentation(
+                            user_data, service_type, template, stream_generation, parallel_sections, incremental,
+                            progress_bar, status_text, hedge_requests, offline_fallback
+                        )
+                        ppt_gen, data = (None, result) if isinstance(result, bytes) else (result, None)
+                if ppt_gen is None and data is None:
                     return
+                st.session_state.profile_report = report["stats"] if report else None
                 
-                # Save to temporary file
+                # Save the deck for this session
                 status_text.text("Finalizing your presentation...")
-                progress_bar.progress(80)
-                temp_dir = tempfile.gettempdir()
-                temp_file = os.path.join(temp_dir, "resume_presentation.pptx")
-                ppt_gen.save(temp_file)
-                
-                st.session_state.temp_file = temp_file
+                progress_bar.progress(90)
+                from utils.slide_plan import compile_plan
+                store_presentation(ppt_gen, data, compile_plan(template).color_scheme)
                 st.session_state.download_ready = True
                 
                 # Complete progress
@@ -182,29 +544,71 @@ def main():
                 status_text.text("Presentation generated successfully!")
     
     
+    # Resume a service job submitted before the page was reloaded
+    job_id = st.query_params.get("job")
+    if GENERATION_SERVICE_URL and job_id and not st.session_state.download_ready:
+        progress_bar = st.progress(20)
+        status_text = st.empty()
+        data = wait_for_job(job_id, progress_bar, status_text)
+        if data is not None:
+            store_presentation(data=data)
+            st.session_state.download_ready = True
+            progress_bar.progress(100)
+            status_text.text("Presentation generated successfully!")
+    
     # Show download option if generation is complete
-    if st.session_state.download_ready and st.session_state.temp_file:
+    if st.session_state.download_ready and st.session_state.presentation is not None:
         st.success("Your presentation is ready for download!")
         
-        with open(st.session_state.temp_file, "rb") as file:
+        # Another color scheme is applied to the finished deck by swapping its colors, with no new AI call
+        from utils.color_schemes import COLOR_SCHEMES
+        deck = data = presentation_bytes()
+        generated_scheme = st.session_state.generated_scheme
+        if generated_scheme is not None:
+            color_scheme = st.selectbox("Color scheme", list(COLOR_SCHEMES), index=list(COLOR_SCHEMES).index(generated_scheme))
+            if color_scheme != generated_scheme:
+                # Re-theme only when the choice changes; reruns reuse the last copy
+                themed = st.session_state.themed_presentation
+                if themed is None or themed[0] != color_scheme:
+                    from utils.retheme import retheme
+                    themed = (color_scheme, retheme(deck, color_scheme, generated_scheme))
+                    st.session_state.themed_presentation = themed
+                data = themed[1]
+        
+        st.download_button(
+            label="Download Presentation",
+            data=data,
+            file_name="resume_presentation.pptx",
+            mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+        )
+        
+        # Timings, token counts and output sizes recorded by this process
+        if st.toggle("Show performance metrics", value=False):
+            st.json(metrics.snapshot())
             st.download_button(
-                label="Download Presentation",
-                data=file,
-                file_name="resume_presentation.pptx",
-                mime="application/vnd.openxmlformats-officedocument.presentationml.presentation"
+                label="Export metrics (Prometheus)",
+                data=metrics.to_prometheus(),
+                file_name="metrics.prom",
+                mime="text/plain"
             )
+            if st.session_state.profile_report:
+                st.code(st.session_state.profile_report)
         
-        # Preview section
-        st.subheader("Preview (Sample Slides)")
-        st.image("https://via.placeholder.com/800x450.png?text=Preview+Not+Available", 
-                 caption="Preview functionality requires additional components", 
-                 use_column_width=True)
+        # Preview section, rendered on demand and cached per slide
+        if st.toggle("Show slide previews", value=False):
+            show_previews(data)
+        if generated_scheme is not None and st.toggle("Preview in all color schemes", value=False):
+            show_scheme_previews(deck, generated_scheme)
         
         # Reset button
         if st.button("Create Another Presentation"):
             st.session_state.generate_clicked = False
             st.session_state.download_ready = False
-            st.session_state.temp_file = None
+            st.session_state.presentation.close()
+            st.session_state.presentation = None
+            st.session_state.themed_presentation = None
+            st.session_state.pipeline = None
+            st.query_params.pop("job", None)
             st.experimental_rerun()
 
 if __name__ == "__main__":
@@ -1,97 +1,462 @@
 # utils/ai_service.py
 import os
 import json
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-import openai
-import requests
+from utils.metrics import metrics
+from utils.offline_generator import OFFLINE_MODEL, generate_offline
+from utils.prompt_builder import (
+    SYSTEM_PROMPT, build_user_prompt, estimate_tokens, input_token_budget, request_token_estimate
+)
+from utils.rate_limiter import current_tenant, shared_limiter
+from utils.response_parser import parse_json_response
+from utils.resume_schema import DEFAULT_SECTIONS, ITEM_VALIDATORS, validate_sections
+from utils.slide_plan import section_inputs
+from utils.stream_parser import IncrementalSectionParser, SectionEvent, events_from_content
 
 load_dotenv()
 
+# API roots, overridable per provider with OPENAI_BASE_URL / PERPLEXITY_BASE_URL
+DEFAULT_BASE_URLS = {
+    "openai": "https://api.openai.com/v1",
+    "perplexity": "https://api.perplexity.ai"
+}
+BASE_URL_ENV = {
+    "openai": "OPENAI_BASE_URL",
+    "perplexity": "PERPLEXITY_BASE_URL"
+}
+
 class AIService:
-    def __init__(self, service_type="openai"):
+    def __init__(self, service_type="openai", cache=None, max_input_tokens=None, base_url=None,
+                 limiter=None, admission_timeout=120.0, offline_fallback=False):
         self.service_type = service_type
+        # Optional ResponseCache shared across generations
+        self.cache = cache
+        # Free-text input beyond this many tokens is truncated before it is sent
+        self.max_input_tokens = max_input_tokens or input_token_budget()
+        # Cross-process rate limiter every provider call waits on (None when no limits are configured)
+        self.limiter = limiter or shared_limiter()
+        self.admission_timeout = admission_timeout
+        # Build rule-based content instead of failing when the provider returns an error
+        self.offline_fallback = offline_fallback
+        
+        # Provider clients are created on first use and reused for every request
+        self._openai_client = None
+        self._http_session = None
         
         if service_type == "openai":
             self.api_key = os.getenv("OPENAI_API_KEY")
-            openai.api_key = self.api_key
+            self.model = "gpt-4"
         elif service_type == "perplexity":
             self.api_key = os.getenv("PERPLEXITY_API_KEY")
-            self.perplexity_api_url = "https://api.perplexity.ai/chat/completions"
+            self.model = "sonar-pro"
+        elif service_type == "offline":
+            # Rule-based generation with no model or network
+            self.api_key = None
+            self.model = OFFLINE_MODEL
+            self.base_url = None
+            return
         else:
             raise ValueError(f"Unsupported service type: {service_type}")
+        
+        # Point at any compatible server, such as utils.stub_server for offline load tests
+        self.base_url = (base_url or os.getenv(BASE_URL_ENV[service_type]) or DEFAULT_BASE_URLS[service_type]).rstrip("/")
+        if service_type == "perplexity":
+            self.perplexity_api_url = f"{self.base_url}/chat/completions"
+
+    @property
+    def openai_client(self):
+        """OpenAI client for this service, imported and created lazily"""
+        if self._openai_client is None:
+            import openai
+            self._openai_client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
+        return self._openai_client
 
-    def _create_resume_prompt(self, user_input):
-        """Create a detailed prompt for the AI based on user input"""
-        return f"""
-        Generate a professional resume presentation with the following information:
-        
-        {json.dumps(user_input, indent=2)}
-        
-        Create structured JSON with these REQUIRED fields:
-        {{
-            "title_slide": {{
-                "name": "FULL_NAME (REQUIRED)",
-                "title": "PROFESSIONAL_TITLE (REQUIRED)",
-                "tagline": "Optional tagline"
-            }},
-            "about_me": {{
-                "points": ["Bullet point 1", "Bullet point 2"]
-            }},
-            "work_experience": [
-                {{
-                    "title": "Job Title",
-                    "company": "Company Name",
-                    "dates": "Employment Dates",
-                    "responsibilities": ["Responsibility 1", "Responsibility 2"]
-                }}
-            ],
-            "education": [
-                {{
-                    "degree": "Degree Name",
-                    "institution": "Institution Name",
-                    "year": "Graduation Year",
-                    "gpa": "Optional GPA",
-                    "achievements": ["Achievement 1"]
-                }}
-            ],
-            "skills": {{
-                "technical": ["Skill 1"],
-                "soft": ["Skill 2"],
-                "domain": ["Skill 3"]
-            }},
-            "achievements": ["Achievement 1"],
-            "contact": {{
-                "email": "user@example.com",
-                "phone": "+1234567890",
-                "linkedin": "linkedin.com/in/username",
-                "portfolio": "portfolio.com"
-            }}
-        }}
+    @property
+    def http_session(self):
+        """Pooled HTTP session for the Perplexity API, imported and created lazily"""
+        if self._http_session is None:
+            import requests
+            self._http_session = requests.Session()
+        return self._http_session
+
+    def _create_resume_prompt(self, user_input, sections=None):
+        """Create the compact, token-budgeted user message for a whole deck (default: the standard sections)"""
+        return self._create_section_prompt(user_input, sections)
+
+    def generate_resume_content(self, user_input, sections=None):
+        """
+        Generate structured resume content from user input using AI, asking
+        only for the given sections (a slide plan's sections)
+        """
+        if self.service_type == "offline":
+            return self._generate_offline(user_input, sections)
+        
+        with metrics.timer("ai_prompt_build_seconds"):
+            prompt = self._create_resume_prompt(user_input, sections)
+        
+        cache_key, cached = self._cache_get(prompt)
+        if cached is not None:
+            return cached
+        
+        result = self._generate_with_provider(prompt)
+        if isinstance(result, dict) and "error" in result:
+            return self._fall_back(user_input, sections, result["error"])
+        if isinstance(result, dict):
+            result = self._regenerate_invalid_sections(user_input, result, sections)
+        
+        # Never cache failed or incomplete generations so they are retried next time
+        if isinstance(result, dict) and "error" not in result and not validate_sections(result, sections):
+            self._cache_set(cache_key, result)
+        
+        return result
+
+    def generate_section(self, user_input, section):
+        """
+        Generate a single section from only the user input fields it depends on.
+        Returns the section value, or {"error": ...} on failure.
+        """
+        if self.service_type == "offline":
+            return self._generate_offline(user_input, [section])[section]
+        
+        section_input = {field: user_input[field] for field in section_inputs(section) if user_input.get(field)}
+        prompt = self._create_section_prompt(section_input, [section])
+        
+        cache_key, cached = self._cache_get(prompt)
+        if cached is not None:
+            return cached
+        
+        with metrics.timer("ai_section_seconds", service=self.service_type, section=section):
+            result = self._generate_with_provider(prompt)
+        if not isinstance(result, dict) or "error" in result:
+            content = self._fall_back(user_input, [section], result.get("error", "Unknown error"))
+            return content.get(section, content)
+        
+        invalid = validate_sections(result, [section])
+        if invalid:
+            content = self._fall_back(user_input, [section], f"Invalid {section} section: {'; '.join(invalid[section])}")
+            return content.get(section, content)
+        
+        self._cache_set(cache_key, result[section])
+        return result[section]
+
+    def stream_resume_content_by_section(self, user_input, sections=None):
+        """
+        Generate every section with its own request, all running concurrently,
+        and yield SectionEvents as each one completes. A section that still fails
+        after one retry yields an "error" event naming it; an error event without
+        a section means nothing could be generated.
+        """
+        sections = sections or list(DEFAULT_SECTIONS)
+        content = {}
+        errors = []
+        
+        with ThreadPoolExecutor(max_workers=len(sections)) as pool:
+            # Each worker runs in a copy of this context so calls keep the caller's tenant
+            futures = {
+                pool.submit(contextvars.copy_context().run, self._generate_section_with_retry, user_input, section): section
+                for section in sections
+            }
+            for future in as_completed(futures):
+                section = futures[future]
+                value = future.result()
+                if isinstance(value, dict) and "error" in value:
+                    metrics.increment("ai_section_errors_total", service=self.service_type, section=section)
+                    errors.append(value["error"])
+                    yield SectionEvent("error", section, value["error"])
+                    continue
+                content[section] = value
+                for event in events_from_content({section: value}):
+                    if event.kind != "done":
+                        yield event
+        
+        if not content:
+            yield SectionEvent("error", None, errors[0] if errors else "No sections were generated")
+            return
+        yield SectionEvent("done", None, content)
+
+    def generate_resume_content_by_section(self, user_input, sections=None):
+        """
+        Generate structured resume content with one concurrent request per
+        section, merged into the same dict as generate_resume_content.
+        Sections that failed are left out.
         """
+        for event in self.stream_resume_content_by_section(user_input, sections):
+            if event.kind == "error" and event.section is None:
+                return {"error": event.value}
+            if event.kind == "done":
+                return event.value
 
-    def generate_resume_content(self, user_input):
+    def stream_resume_content(self, user_input, sections=None):
         """
-        Generate structured resume content from user input using AI
+        Generate resume content as a stream of SectionEvents, emitting each
+        section as soon as the model has finished writing it
         """
-        prompt = self._create_resume_prompt(user_input)
+        sections = sections or DEFAULT_SECTIONS
+        if self.service_type == "offline":
+            yield from events_from_content(self._generate_offline(user_input, sections))
+            return
         
+        with metrics.timer("ai_prompt_build_seconds"):
+            prompt = self._create_resume_prompt(user_input, sections)
+        
+        cache_key, cached = self._cache_get(prompt)
+        if cached is not None:
+            yield from events_from_content(cached)
+            return
+        
+        parser = IncrementalSectionParser()
+        content = {}
+        # Items already emitted for sections that have not closed yet
+        streamed = {}
+        started = time.perf_counter()
+        first_section = True
+        error = self._admit(prompt)
+        if error:
+            yield from self._fall_back_events(user_input, sections, error, content)
+            return
+        try:
+            if self.service_type == "openai":
+                chunks = self._stream_with_openai(prompt)
+            else:
+                chunks = self._stream_with_perplexity(prompt)
+            
+            for chunk in chunks:
+                for event in parser.feed(chunk):
+                    if event.section not in sections:
+                        continue
+                    if first_section:
+                        metrics.observe("ai_time_to_first_section_seconds", time.perf_counter() - started, service=self.service_type)
+                        first_section = False
+                    
+                    # Drop invalid entries and hold back invalid sections so they can be re-requested
+                    if event.kind == "item":
+                        validate_item = ITEM_VALIDATORS.get(event.section)
+                        if validate_item is None or not validate_item(event.value, event.section):
+                            streamed.setdefault(event.section, []).append(event.value)
+                            yield event
+                    elif event.kind == "section":
+                        value = event.value
+                        validate_item = ITEM_VALIDATORS.get(event.section)
+                        if validate_item is not None and isinstance(value, list):
+                            value = [item for item in value if not validate_item(item, event.section)]
+                        elif validate_sections({event.section: value}, [event.section]):
+                            continue
+                        content[event.section] = value
+                        streamed.pop(event.section, None)
+                        yield SectionEvent("section", event.section, value)
+                if parser.done:
+                    break
+            metrics.observe("ai_request_seconds", time.perf_counter() - started, service=self.service_type, model=self.model)
+        except json.JSONDecodeError:
+            # Keep the sections that already arrived and re-request the rest below
+            metrics.increment("ai_stream_parse_errors_total", service=self.service_type)
+        except Exception as e:
+            yield from self._fall_back_events(user_input, sections, str(e), content, streamed)
+            return
+        
+        # Ask again only for sections that were missing, invalid or cut off
+        missing = [section for section in sections if section not in content]
+        if missing:
+            repaired = self._regenerate_invalid_sections(user_input, content, sections)
+            yield from self._replay_events({section: repaired[section] for section in missing if section in repaired},
+                                           streamed)
+            content = repaired
+        
+        unfilled = [section for section in sections if section not in content]
+        if not content or (unfilled and self.offline_fallback):
+            if content:
+                error = f"Incomplete response: missing {', '.join(unfilled)}"
+            else:
+                error = "JSON Parsing Error: no valid sections in the response"
+            yield from self._fall_back_events(user_input, sections, error, content, streamed)
+            return
+        
+        if not validate_sections(content, sections):
+            self._cache_set(cache_key, content)
+        yield SectionEvent("done", None, content)
+
+    def _stream_with_openai(self, prompt):
+        """Yield content deltas from a streamed OpenAI chat completion"""
+        stream = self.openai_client.chat.completions.create(**self._build_payload(prompt), stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def _stream_with_perplexity(self, prompt):
+        """Yield content deltas from a streamed Perplexity chat completion"""
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        data = self._build_payload(prompt)
+        data["stream"] = True
+        
+        with self.http_session.post(self.perplexity_api_url, headers=headers, json=data, timeout=30, stream=True) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"API Error {response.status_code}: {response.text}")
+            
+            # Server-sent events: one "data: {...}" line per chunk
+            for raw_line in response.iter_lines():
+                line = raw_line.decode("utf-8")
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                delta = json.loads(payload)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+
+    def _cache_get(self, prompt):
+        """Look a prompt up in the response cache, returning (key, cached value or None)"""
+        if self.cache is None:
+            return None, None
+        cache_key = self.cache.make_key(self.service_type, self.model, f"{SYSTEM_PROMPT}\n{prompt}")
+        cached = self.cache.get(cache_key)
+        metrics.increment("ai_cache_lookups_total", service=self.service_type, hit=cached is not None)
+        return cache_key, cached
+
+    def _cache_set(self, cache_key, value):
+        """Store a successful result in the response cache"""
+        if cache_key is not None:
+            self.cache.set(cache_key, value)
+
+    def _create_section_prompt(self, user_input, sections):
+        """Create a prompt asking only for the given sections; the schema is in the system prompt"""
+        prompt, truncated = build_user_prompt(user_input, sections, self.max_input_tokens)
+        for field in truncated:
+            metrics.increment("ai_input_truncations_total", service=self.service_type, field=field)
+        metrics.observe("ai_prompt_tokens_estimated", estimate_tokens(prompt), service=self.service_type)
+        return prompt
+
+    def _regenerate_invalid_sections(self, user_input, content, sections=None):
+        """Validate content and re-request only the sections that are missing or invalid"""
+        invalid = validate_sections(content, sections)
+        if not invalid:
+            return content
+        
+        content = {section: value for section, value in content.items() if section not in invalid}
+        metrics.increment("ai_section_regenerations_total", len(invalid), service=self.service_type)
+        repaired = self._generate_with_provider(self._create_section_prompt(user_input, list(invalid)))
+        if isinstance(repaired, dict) and "error" not in repaired:
+            still_invalid = validate_sections(repaired, list(invalid))
+            for section in invalid:
+                if section not in still_invalid:
+                    content[section] = repaired[section]
+        return content
+
+    def _generate_offline(self, user_input, sections=None):
+        """Build content for the sections locally with the rule-based generator"""
+        with metrics.timer("ai_offline_seconds"):
+            return generate_offline(user_input, sections)
+
+    def _generate_section_with_retry(self, user_input, section):
+        """generate_section, retried once when the section fails"""
+        value = self.generate_section(user_input, section)
+        if isinstance(value, dict) and "error" in value:
+            metrics.increment("ai_section_retries_total", service=self.service_type, section=section)
+            value = self.generate_section(user_input, section)
+        return value
+
+    def _fall_back(self, user_input, sections, error):
+        """Rule-based content for the sections when fallback is enabled, otherwise {"error": error}"""
+        if not self.offline_fallback:
+            return {"error": error}
+        metrics.increment("ai_offline_fallbacks_total", service=self.service_type)
+        return self._generate_offline(user_input, sections)
+
+    def _fall_back_events(self, user_input, sections, error, content=None, streamed=None):
+        """Stream rule-based content for the sections not received yet, or the error when fallback is off"""
+        content = dict(content or {})
+        fallback = self._fall_back(user_input, [section for section in sections if section not in content], error)
+        if "error" in fallback:
+            yield SectionEvent("error", None, error)
+            return
+        yield from self._replay_events(fallback, streamed or {})
+        content.update(fallback)
+        yield SectionEvent("done", None, content)
+
+    def _replay_events(self, values, streamed):
+        """
+        Events for sections generated after the stream broke off. A section whose
+        items were partly streamed is sent whole as a "replace" event instead of
+        item by item, so its earlier items are not emitted twice.
+        """
+        for event in events_from_content(values):
+            if event.kind == "done":
+                continue
+            if event.section in streamed:
+                if event.kind == "item":
+                    continue
+                if event.kind == "section":
+                    yield SectionEvent("replace", event.section, event.value)
+            yield event
+
+    def _admit(self, prompt):
+        """Wait until the shared rate limiter admits a request; returns an error message if it times out"""
+        if self.limiter is None:
+            return None
+        tenant, priority = current_tenant()
+        if self.limiter.acquire(self.service_type, request_token_estimate(prompt), tenant, priority,
+                                timeout=self.admission_timeout):
+            return None
+        return f"Rate limited: no {self.service_type} capacity within {self.admission_timeout:.0f}s"
+
+    def _generate_with_provider(self, prompt):
+        """Send a prompt to the configured service once the rate limiter admits it"""
+        error = self._admit(prompt)
+        if error:
+            return {"error": error}
         if self.service_type == "openai":
             return self._generate_with_openai(prompt)
         elif self.service_type == "perplexity":
             return self._generate_with_perplexity(prompt)
 
+    def _build_payload(self, prompt):
+        """Build the chat-completion request body for the configured service"""
+        # The system prompt is identical for every request so providers can cache it
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ]
+        }
+        if self.service_type == "openai":
+            payload["response_format"] = {"type": "json_object"}
+        return payload
+
+    def _parse_response(self, raw_response):
+        """Parse the message content returned by the model"""
+        with metrics.timer("ai_response_parse_seconds", service=self.service_type):
+            # Strip fences and preamble, repairing trailing commas and truncation
+            content = parse_json_response(raw_response)
+        if not isinstance(content, dict):
+            raise ValueError("Expected a JSON object in the response")
+        return content
+
+    def _record_usage(self, usage):
+        """Record the token counts reported by the provider"""
+        if not usage:
+            return
+        for kind in ("prompt", "completion"):
+            if isinstance(usage, dict):
+                tokens = usage.get(f"{kind}_tokens")
+            else:
+                tokens = getattr(usage, f"{kind}_tokens", None)
+            if tokens:
+                metrics.increment("ai_tokens_total", tokens, service=self.service_type, model=self.model, kind=kind)
+
     def _generate_with_openai(self, prompt):
         """Generate content using OpenAI API"""
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert resume writer creating PowerPoint content."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content)
+            with metrics.timer("ai_request_seconds", service=self.service_type, model=self.model):
+                response = self.openai_client.chat.completions.create(**self._build_payload(prompt))
+            self._record_usage(response.usage)
+            return self._parse_response(response.choices[0].message.content)
         except Exception as e:
             return {"error": str(e)}
 
@@ -102,32 +467,21 @@ class AIService:
                 "Authorization": f"Bearer {self.api_key}",
                 "Content-Type": "application/json"
             }
-            data = {
-                "model": "sonar-pro",
-                "messages": [
-                  {
-                        "role": "system", 
-                        "content": "You are an expert resume writer. Return ONLY valid JSON."
-                    },
-                    {
-                    "role": "user", 
-                            "content": f"{prompt}\n\nReturn response as valid JSON only."
-                    }
-                ]
-            }
+            data = self._build_payload(prompt)
         
-            response = requests.post(
-                self.perplexity_api_url,
-                headers=headers,
-                json=data,
-                timeout=30
-            )
+            with metrics.timer("ai_request_seconds", service=self.service_type, model=self.model):
+                response = self.http_session.post(
+                    self.perplexity_api_url,
+                    headers=headers,
+                    json=data,
+                    timeout=30
+                )
         
             if response.status_code == 200:
-                raw_response = response.json()["choices"][0]["message"]["content"]
-                # Clean response before parsing
-                cleaned_response = raw_response.replace("``````", "").strip()
-                return json.loads(cleaned_response)
+                body = response.json()
+                self._record_usage(body.get("usage"))
+                raw_response = body["choices"][0]["message"]["content"]
+                return self._parse_response(raw_response)
             return {"error": f"API Error {response.status_code}: {response.text}"}
         except json.JSONDecodeError as e:
             return {"error": f"JSON Parsing Error: {str(e)}"}
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import random
+import time
+import httpx
+from utils.ai_service import AIService
+from utils.metrics import metrics
+from utils.prompt_builder import request_token_estimate
+from utils.rate_limiter import current_tenant
+from utils.resume_schema import DEFAULT_SECTIONS, validate_sections
+from utils.slide_plan import section_inputs
+
+
+# Status codes worth retrying with backoff
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class AsyncRateLimiter:
+    """Spaces out request starts so a provider sees at most `rate` requests per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AsyncAIService(AIService):
+    """
+    asyncio variant of AIService sharing one pooled HTTP client across requests.
+    The coroutine methods are a-prefixed so the inherited sync methods keep working.
+    """
+
+    def __init__(self, service_type="openai", cache=None, base_url=None, max_concurrency=8,
+                 requests_per_second=None, max_retries=4, backoff_base=0.5, backoff_max=30.0,
+                 timeout=60.0, limiter=None, offline_fallback=False):
+        super().__init__(service_type=service_type, cache=cache, base_url=base_url, limiter=limiter,
+                         offline_fallback=offline_fallback)
+        self.api_url = f"{self.base_url}/chat/completions" if self.base_url else None
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.rate_limiter = AsyncRateLimiter(requests_per_second)
+        self._semaphore = None
+        self._client = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def open(self):
+        """Create the shared connection pool"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                ),
+                timeout=self.timeout
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        """Close the shared connection pool"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def agenerate_resume_content(self, user_input, sections=None):
+        """
+        Generate structured resume content from user input using AI, asking
+        only for the given sections (a slide plan's sections)
+        """
+        if self.service_type == "offline":
+            return self._generate_offline(user_input, sections)
+
+        with metrics.timer("ai_prompt_build_seconds"):
+            prompt = self._create_resume_prompt(user_input, sections)
+
+        cache_key, cached = await asyncio.to_thread(self._cache_get, prompt)
+        if cached is not None:
+            return cached
+
+        result = await self._generate(prompt)
+        if "error" in result:
+            return self._fall_back(user_input, sections, result["error"])
+        result = await self._regenerate_invalid_sections_async(user_input, result, sections)
+
+        # Never cache failed or incomplete generations so they are retried next time
+        if "error" not in result and not validate_sections(result, sections):
+            await asyncio.to_thread(self._cache_set, cache_key, result)
+
+        return result
+
+    async def agenerate_section(self, user_input, section):
+        """
+        Generate a single section from only the user input fields it depends on.
+        Returns the section value, or {"error": ...} on failure.
+        """
+        if self.service_type == "offline":
+            return self._generate_offline(user_input, [section])[section]
+
+        section_input = {field: user_input[field] for field in section_inputs(section) if user_input.get(field)}
+        prompt = self._create_section_prompt(section_input, [section])
+
+        cache_key, cached = await asyncio.to_thread(self._cache_get, prompt)
+        if cached is not None:
+            return cached
+
+        result = await self._generate(prompt)
+        if "error" in result:
+            content = self._fall_back(user_input, [section], result["error"])
+            return content.get(section, content)
+
+        invalid = validate_sections(result, [section])
+        if invalid:
+            content = self._fall_back(user_input, [section], f"Invalid {section} section: {'; '.join(invalid[section])}")
+            return content.get(section, content)
+
+        await asyncio.to_thread(self._cache_set, cache_key, result[section])
+        return result[section]
+
+    async def agenerate_resume_content_by_section(self, user_input, sections=None):
+        """Generate every section concurrently and merge them into one ai_content dict"""
+        sections = sections or list(DEFAULT_SECTIONS)
+        values = await asyncio.gather(*(self.agenerate_section(user_input, section) for section in sections))
+
+        content = {}
+        errors = []
+        for section, value in zip(sections, values):
+            if isinstance(value, dict) and "error" in value:
+                errors.append(value["error"])
+            else:
+                content[section] = value
+        if not content:
+            return {"error": errors[0] if errors else "No sections were generated"}
+        return content
+
+    async def generate_many(self, user_inputs, sections=None):
+        """Generate content for many resumes concurrently, preserving input order"""
+        owns_client = self._client is None
+        if owns_client:
+            await self.open()
+        try:
+            return await asyncio.gather(
+                *(self.agenerate_resume_content(user_input, sections) for user_input in user_inputs)
+            )
+        finally:
+            if owns_client:
+                await self.close()
+
+    async def _regenerate_invalid_sections_async(self, user_input, content, sections=None):
+        """Validate content and re-request only the sections that are missing or invalid"""
+        invalid = validate_sections(content, sections)
+        if not invalid:
+            return content
+
+        content = {section: value for section, value in content.items() if section not in invalid}
+        metrics.increment("ai_section_regenerations_total", len(invalid), service=self.service_type)
+        repaired = await self._generate(self._create_section_prompt(user_input, list(invalid)))
+        if "error" not in repaired:
+            still_invalid = validate_sections(repaired, list(invalid))
+            for section in invalid:
+                if section not in still_invalid:
+                    content[section] = repaired[section]
+        return content
+
+    async def _generate(self, prompt):
+        """Send one request, retrying 429/5xx responses with exponential backoff"""
+        if self._client is None:
+            await self.open()
+
+        payload = self._build_payload(prompt)
+        tenant, priority = current_tenant()
+        for attempt in range(self.max_retries + 1):
+            # Every attempt, retries included, spends the shared provider budget
+            if self.limiter is not None and not await self.limiter.acquire_async(
+                    self.service_type, request_token_estimate(prompt), tenant, priority,
+                    timeout=self.admission_timeout):
+                return {"error": f"Rate limited: no {self.service_type} capacity within "
+                                 f"{self.admission_timeout:.0f}s"}
+            await self.rate_limiter.acquire()
+            try:
+                # Only the request itself holds a concurrency slot; backoff sleeps and
+                # admission waits do not, so retrying requests never starve the others
+                async with self._semaphore:
+                    with metrics.timer("ai_request_seconds", service=self.service_type, model=self.model):
+                        response = await self._client.post(self.api_url, json=payload)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    return {"error": str(e)}
+                await asyncio.sleep(self._backoff_delay(attempt))
+                continue
+
+            if response.status_code == 200:
+                try:
+                    body = response.json()
+                    self._record_usage(body.get("usage"))
+                    raw_response = body["choices"][0]["message"]["content"]
+                    return self._parse_response(raw_response)
+                except json.JSONDecodeError as e:
+                    return {"error": f"JSON Parsing Error: {str(e)}"}
+                except Exception as e:
+                    return {"error": str(e)}
+
+            metrics.increment("ai_request_errors_total", service=self.service_type, status=response.status_code)
+            if response.status_code not in RETRYABLE_STATUS_CODES or attempt == self.max_retries:
+                return {"error": f"API Error {response.status_code}: {response.text}"}
+
+            await asyncio.sleep(self._backoff_delay(attempt, response.headers.get("retry-after")))
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, honouring Retry-After when the provider sends it"""
+        if retry_after:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
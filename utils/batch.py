@@ -0,0 +1,327 @@
+"""
+Headless batch generation of resume presentations.
+
+Usage:
+    python -m utils.batch records.jsonl --output decks/ --workers 8
+    python -m utils.batch records.csv --output decks.zip --service perplexity
+    python -m utils.batch resumes/ --output decks/
+
+Each JSONL record is either a user_data dict, {"id": ..., "user_data": {...}}
+or {"id": ..., "ai_content": {...}} with pre-generated content. CSV files use
+the user_data field names as columns (email, phone, linkedin and portfolio
+are folded into "contact"), or an "ai_content" column holding JSON. A directory
+input is ingested from its .docx/.txt resumes; files whose content already
+produced a deck (per the ingest ledger) are skipped.
+"""
+import argparse
+import contextvars
+import csv
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from utils.rate_limiter import tenant_context
+from utils.resume_ir import Resume, pack, unpack
+from utils.slide_plan import compile_plan
+from utils.templates import ResumeTemplates
+
+
+CONTACT_FIELDS = ("email", "phone", "linkedin", "portfolio")
+
+
+def read_records(path, ledger=None, workers=None):
+    """Yield (record_id, record) pairs from a JSONL or CSV file, or a directory of resume files"""
+    if os.path.isdir(path):
+        yield from _ingest_records(path, ledger, workers)
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for index, row in enumerate(rows):
+            record_id = str(row.get("id") or f"record-{index:06d}")
+            yield record_id, _normalize_record(row)
+
+
+def _normalize_record(row):
+    """Turn a raw JSONL/CSV row into {"user_data": ...} or {"ai_content": ...}"""
+    if row.get("ai_content"):
+        content = row["ai_content"]
+        return {"ai_content": json.loads(content) if isinstance(content, str) else content}
+    if row.get("user_data"):
+        return {"user_data": row["user_data"]}
+
+    user_data = {key: value for key, value in row.items() if key != "id" and key not in CONTACT_FIELDS}
+    if "contact" not in user_data:
+        user_data["contact"] = {key: row.get(key, "") for key in CONTACT_FIELDS}
+    return {"user_data": user_data}
+
+
+def _ingest_records(directory, ledger=None, workers=None):
+    """Parse the resumes in a directory into records carrying their content hash"""
+    from utils.ingest import ingest_files, iter_resume_files
+
+    for result in ingest_files(iter_resume_files(directory), workers=workers, seen=ledger):
+        record_id = os.path.splitext(os.path.relpath(result["source"], directory))[0]
+        record = {"hash": result["hash"]}
+        if result.get("duplicate"):
+            record["duplicate"] = True
+        elif "error" in result:
+            record["error"] = f"Ingestion Error: {result['error']}"
+        else:
+            record["user_data"] = result["user_data"]
+        yield record_id, record
+
+
+def _safe_name(record_id):
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", record_id) or "record"
+
+
+def _render_record(packed, template, output_path):
+    """Build and save one deck from a packed Resume in a worker process, returning timings"""
+    from utils.ppt_generator import PPTGenerator
+
+    plan = compile_plan(template)
+    started = time.perf_counter()
+    ppt_gen = PPTGenerator()
+    ppt_gen.generate_from_ai_content(unpack(packed), plan.color_scheme, plan.sections)
+    built = time.perf_counter()
+
+    ppt_gen.save(output_path)
+    saved = time.perf_counter()
+
+    return {"build": built - started, "save": saved - built}
+
+
+def _load_checkpoint(path):
+    """Return the ids already completed successfully in a previous run"""
+    done = set()
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry.get("status") == "ok":
+                        done.add(entry["id"])
+    return done
+
+
+def _finalize_archive(output, staging, done):
+    """
+    Rebuild the .zip output from the previous archive plus the staged decks of
+    finished records, in a temporary file that then replaces it atomically.
+    Returns the time spent adding each staged deck.
+    """
+    staged = [name for name in sorted({f"{_safe_name(record_id)}.pptx" for record_id in done})
+              if os.path.exists(os.path.join(staging, name))]
+    replaced = set(staged)
+    temp_path = f"{output}.tmp"
+    write_times = []
+    with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_STORED) as archive:
+        if os.path.exists(output):
+            with zipfile.ZipFile(output) as previous:
+                for info in previous.infolist():
+                    if info.filename not in replaced:
+                        archive.writestr(info, previous.read(info))
+        for name in staged:
+            write_started = time.perf_counter()
+            archive.write(os.path.join(staging, name), name)
+            write_times.append(time.perf_counter() - write_started)
+    os.replace(temp_path, output)
+    shutil.rmtree(staging, ignore_errors=True)
+    return write_times
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct * len(ordered) / 100) - 1))
+    return ordered[rank]
+
+
+def run_batch(input_path, output, service_type="openai", template="professional", workers=None,
+              ai_concurrency=8, checkpoint_path=None, ledger_path=None, tenant="batch", priority=-1,
+              offline_fallback=False):
+    """
+    Generate a deck for every record in input_path and return a summary dict. AI calls
+    are queued at the shared rate limiter as `tenant`, below interactive sessions by default.
+    With offline_fallback, records whose generation fails get rule-based content instead.
+    A .zip output is only written at the end: decks are staged as files next to it
+    so a killed run never leaves a half-written archive behind a checkpoint.
+    """
+    plan = compile_plan(template)
+    to_zip = output.lower().endswith(".zip")
+    # Zip runs render into a staging directory that survives a killed run until it is archived
+    deck_dir = f"{output}.parts" if to_zip else output
+    os.makedirs(deck_dir, exist_ok=True)
+    checkpoint_path = checkpoint_path or f"{output.rstrip(os.sep)}.checkpoint.jsonl"
+
+    ledger = None
+    if os.path.isdir(input_path):
+        from utils.ingest import IngestLedger
+        ledger = IngestLedger(ledger_path)
+
+    done = _load_checkpoint(checkpoint_path)
+    records = [(record_id, record) for record_id, record in read_records(input_path, ledger, workers)
+               if record_id not in done]
+    pending = [(record_id, record) for record_id, record in records if not record.get("duplicate")]
+    hashes = {record_id: record["hash"] for record_id, record in pending if record.get("hash")}
+
+    timings = {"ai": [], "build": [], "save": [], "write": []}
+    counts = {"ok": 0, "error": 0, "skipped": len(done) + len(records) - len(pending)}
+    ai = None
+    if any("user_data" in record for _, record in pending):
+        from utils.ai_service import AIService
+        from utils.cache import ResponseCache
+        ai = AIService(service_type=service_type, cache=ResponseCache(), offline_fallback=offline_fallback)
+
+    def generate(record):
+        if "ai_content" in record:
+            return record["ai_content"], 0.0
+        started = time.perf_counter()
+        content = ai.generate_resume_content(record["user_data"], plan.sections)
+        return content, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+            ThreadPoolExecutor(max_workers=ai_concurrency) as io_pool, \
+            ProcessPoolExecutor(max_workers=workers) as cpu_pool:
+
+        def record_result(record_id, status, error=None):
+            entry = {"id": record_id, "status": status}
+            if error:
+                entry["error"] = error
+            checkpoint.write(json.dumps(entry) + "\n")
+            checkpoint.flush()
+            counts[status] += 1
+            # Only content that produced a deck counts as ingested
+            if status == "ok" and ledger is not None and record_id in hashes:
+                ledger.add(hashes[record_id], record_id)
+
+        # Stage 1: AI calls overlap on threads; stage 2: rendering fans out over processes
+        for record_id, record in pending:
+            if "error" in record:
+                record_result(record_id, "error", record["error"])
+        with tenant_context(tenant, priority):
+            # Each AI thread runs in a copy of this context so its calls carry the batch tenant
+            generations = {io_pool.submit(contextvars.copy_context().run, generate, record): record_id
+                           for record_id, record in pending if "error" not in record}
+        renders = {}
+
+        def finish_generation(future):
+            record_id = generations.pop(future)
+            try:
+                content, ai_time = future.result()
+            except Exception as e:
+                record_result(record_id, "error", str(e))
+                return
+            if not isinstance(content, dict) or "error" in content:
+                error = content.get("error", "Unknown error") if isinstance(content, dict) else "Unknown error"
+                record_result(record_id, "error", f"AI Content Generation Failed: {error}")
+                return
+            if ai_time:
+                timings["ai"].append(ai_time)
+            try:
+                # Normalize once here and ship the compact packed form to the worker
+                packed = pack(Resume.from_dict(content))
+            except Exception as e:
+                record_result(record_id, "error", f"Invalid AI content: {str(e)}")
+                return
+
+            output_path = os.path.join(deck_dir, f"{_safe_name(record_id)}.pptx")
+            render = cpu_pool.submit(_render_record, packed, template, output_path)
+            renders[render] = record_id
+
+        def finish_render(render):
+            record_id = renders.pop(render)
+            try:
+                result = render.result()
+            except Exception as e:
+                record_result(record_id, "error", f"Presentation Generation Error: {str(e)}")
+                return
+
+            timings["build"].append(result["build"])
+            timings["save"].append(result["save"])
+            record_result(record_id, "ok")
+
+        # One wait loop over both stages, so each deck is checkpointed as soon as it
+        # renders instead of after the last AI call; all writes stay on this thread
+        while generations or renders:
+            finished, _ = wait(list(generations) + list(renders), return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future in generations:
+                    finish_generation(future)
+                else:
+                    finish_render(future)
+
+    if to_zip:
+        # Every deck the checkpoint marks done, from this run or a killed one, goes into the archive
+        timings["write"] = _finalize_archive(output, deck_dir, _load_checkpoint(checkpoint_path))
+
+    elapsed = time.perf_counter() - started
+    return {
+        "decks": counts["ok"],
+        "errors": counts["error"],
+        "skipped": counts["skipped"],
+        "elapsed_seconds": round(elapsed, 3),
+        "decks_per_second": round(counts["ok"] / elapsed, 3) if elapsed else None,
+        "stages": {
+            stage: {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "count": len(values)
+            }
+            for stage, values in timings.items() if values
+        },
+        "checkpoint": checkpoint_path
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate resume presentations in bulk")
+    parser.add_argument("input", help="JSONL or CSV file of user_data or ai_content records, "
+                                      "or a directory of .docx/.txt resumes")
+    parser.add_argument("--output", required=True, help="Output directory, or a .zip file")
+    parser.add_argument("--service", choices=["openai", "perplexity", "offline"], default="openai",
+                        help="AI provider, or offline for rule-based content without any AI call")
+    parser.add_argument("--template", choices=ResumeTemplates.get_template_options(), default="professional")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--ai-concurrency", type=int, default=8, help="Concurrent AI requests")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--ledger", help="Ingest ledger for directory inputs (default: INGEST_LEDGER_PATH or ~/.cache)")
+    parser.add_argument("--tenant", default="batch", help="Tenant name at the shared rate limiter")
+    parser.add_argument("--priority", type=int, default=-1, help="Rate limiter priority (interactive sessions use 0)")
+    parser.add_argument("--offline-fallback", action="store_true",
+                        help="Use rule-based content for records whose AI generation fails")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(
+        args.input,
+        args.output,
+        service_type=args.service,
+        template=args.template,
+        workers=args.workers,
+        ai_concurrency=args.ai_concurrency,
+        checkpoint_path=args.checkpoint,
+        ledger_path=args.ledger,
+        tenant=args.tenant,
+        priority=args.priority,
+        offline_fallback=args.offline_fallback
+    )
+    json.dump(summary, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0 if summary["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Offline benchmark for deck generation with synthetic resumes.
+
+Usage:
+    python -m utils.benchmark --output results.json
+    python -m utils.benchmark --save-baseline baseline.json
+    python -m utils.benchmark --baseline baseline.json --tolerance 0.2
+
+Each case runs in a fresh process so peak RSS is attributable to that case.
+With --baseline, the exit status is 1 when any case's build or save time
+regresses by more than the tolerance.
+"""
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+from utils.ai_service import AIService
+
+
+# (name, jobs, responsibilities per job, skills, words per bullet)
+RESUME_SIZES = [
+    ("small", 1, 3, 10, 8),
+    ("medium", 10, 5, 100, 16),
+    ("large", 50, 6, 500, 24),
+    ("xlarge", 200, 8, 2000, 40)
+]
+COLOR_SCHEMES = ["professional", "modern", "creative"]
+
+WORDS = (
+    "led designed built shipped scaled migrated optimized automated platform service pipeline "
+    "team customers revenue latency reliability cloud data analytics product roadmap strategy "
+    "stakeholders architecture python java kubernetes reporting compliance growth quality"
+).split()
+
+
+def synthetic_ai_content(jobs=10, responsibilities=5, skills=100, bullet_words=16, seed=0):
+    """Build a deterministic ai_content dict of the requested size"""
+    rng = random.Random(seed)
+
+    def sentence(words=bullet_words):
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    skill_names = [f"{rng.choice(WORDS).capitalize()} {i}" for i in range(skills)]
+    return {
+        "title_slide": {"name": "Alex Example", "title": "Principal Engineer", "tagline": sentence(8)},
+        "about_me": {"points": [sentence() for _ in range(4)]},
+        "work_experience": [
+            {
+                "title": f"Engineer {i}",
+                "company": f"Company {i}",
+                "dates": f"{2000 + i % 20} - {2001 + i % 20}",
+                "responsibilities": [sentence() for _ in range(responsibilities)]
+            }
+            for i in range(jobs)
+        ],
+        "education": [
+            {"degree": "BSc Computer Science", "institution": "Example University", "year": "2005",
+             "gpa": "3.8", "achievements": [sentence(6)]}
+        ],
+        "skills": {
+            "technical": skill_names[0::3],
+            "soft": skill_names[1::3],
+            "domain": skill_names[2::3]
+        },
+        "achievements": [sentence() for _ in range(5)],
+        "contact": {"email": "alex@example.com", "phone": "+1 555 0100",
+                    "linkedin": "linkedin.com/in/alex", "portfolio": "alex.example.com"}
+    }
+
+
+class StubAIService(AIService):
+    """AIService that returns synthetic content without any network call"""
+
+    def __init__(self, ai_content, latency=0.0):
+        self.service_type = "stub"
+        self.model = "stub"
+        self.cache = None
+        self.ai_content = ai_content
+        self.latency = latency
+
+    def generate_resume_content(self, user_input, sections=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.ai_content
+
+
+def _run_case(case):
+    """Run one benchmark case in a worker process"""
+    from utils.ppt_generator import PPTGenerator
+
+    size_name, jobs, responsibilities, skills, bullet_words = case["size"]
+    ai = StubAIService(synthetic_ai_content(jobs, responsibilities, skills, bullet_words, seed=case["seed"]))
+
+    # Warm up once so the cached themed template is not charged to the first repeat
+    PPTGenerator().generate_from_ai_content(synthetic_ai_content(1, 1, 1, 1), case["scheme"])
+
+    build_times, save_times = [], []
+    output_bytes = slides = 0
+    for _ in range(case["repeat"]):
+        ai_content = ai.generate_resume_content({})
+
+        started = time.perf_counter()
+        ppt_gen = PPTGenerator()
+        ppt_gen.generate_from_ai_content(ai_content, case["scheme"])
+        built = time.perf_counter()
+        data = ppt_gen.to_bytes()
+        saved = time.perf_counter()
+
+        build_times.append(built - started)
+        save_times.append(saved - built)
+        output_bytes = len(data)
+        slides = len(ppt_gen.prs.slides)
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+
+    return {
+        "case": f"{size_name}/{case['scheme']}",
+        "jobs": jobs,
+        "skills": skills,
+        "slides": slides,
+        "build_seconds": statistics.median(build_times),
+        "save_seconds": statistics.median(save_times),
+        "peak_rss_bytes": peak_rss,
+        "output_bytes": output_bytes
+    }
+
+
+def run_benchmark(sizes=None, schemes=None, repeat=3, seed=0):
+    """Run every size/scheme combination and return machine-readable results"""
+    sizes = [size for size in RESUME_SIZES if not sizes or size[0] in sizes]
+    schemes = schemes or COLOR_SCHEMES
+    cases = [{"size": size, "scheme": scheme, "repeat": repeat, "seed": seed} for size in sizes for scheme in schemes]
+
+    # A fresh process per case keeps peak RSS measurements independent
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=1, maxtasksperchild=1) as pool:
+        results = pool.map(_run_case, cases, chunksize=1)
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results
+    }
+
+
+def compare_to_baseline(current, baseline, tolerance=0.2):
+    """Return per-case ratios against a baseline and the cases that regressed"""
+    previous = {result["case"]: result for result in baseline["results"]}
+    comparison, regressions = [], []
+    for result in current["results"]:
+        base = previous.get(result["case"])
+        if base is None:
+            continue
+        entry = {"case": result["case"]}
+        for metric in ("build_seconds", "save_seconds", "output_bytes", "peak_rss_bytes"):
+            if base[metric]:
+                entry[metric] = round(result[metric] / base[metric], 3)
+        comparison.append(entry)
+        if any(entry.get(metric, 0) > 1 + tolerance for metric in ("build_seconds", "save_seconds")):
+            regressions.append(result["case"])
+    return comparison, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark deck generation with synthetic resumes")
+    parser.add_argument("--sizes", nargs="*", choices=[size[0] for size in RESUME_SIZES])
+    parser.add_argument("--schemes", nargs="*", choices=COLOR_SCHEMES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON to this file instead of stdout")
+    parser.add_argument("--baseline", help="Compare against a stored baseline results file")
+    parser.add_argument("--save-baseline", help="Store the results as a new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before failing")
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(args.sizes, args.schemes, args.repeat, args.seed)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            comparison, regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        results["comparison"] = comparison
+        results["regressions"] = regressions
+        status = 1 if regressions else 0
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
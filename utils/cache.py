@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "ai_ppt_generator", "responses.sqlite3"
+)
+
+
+class ResponseCache:
+    """Persistent, content-addressed cache for AI responses backed by SQLite"""
+
+    def __init__(self, path=None, max_entries=1000, max_bytes=50 * 1024 * 1024, ttl=7 * 24 * 3600):
+        self.path = path or os.getenv("AI_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # Hit/miss counters for this process
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    hit_count INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(service_type, model, prompt):
+        """Build a canonical cache key from the service, model and prompt"""
+        payload = json.dumps(
+            {"service_type": service_type, "model": model, "prompt": prompt},
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached response for a key, or None on a miss"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            conn.execute(
+                "UPDATE responses SET accessed_at = ?, hit_count = hit_count + 1 WHERE key = ?",
+                (now, key)
+            )
+
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, value):
+        """Store a response and evict expired or least recently used entries"""
+        encoded = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at, hit_count)
+                VALUES (?, ?, ?, ?, ?, 0)
+                """,
+                (key, encoded, len(encoded), now, now)
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        """Drop expired entries, then the least recently used ones over the size limits"""
+        if self.ttl is not None:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+
+        if self.max_entries is not None:
+            conn.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+
+        if self.max_bytes is not None:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total > self.max_bytes:
+                rows = conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall()
+                stale = []
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    stale.append((key,))
+                    total -= size
+                conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        """Return hit/miss counters and the current size of the cache"""
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size
+        }
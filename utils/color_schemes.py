@@ -0,0 +1,25 @@
+"""
+Color schemes as RRGGBB hex strings. Kept free of python-pptx so the app and the
+re-themer can list and compare schemes without loading the presentation library.
+"""
+
+COLOR_SCHEMES = {
+    "professional": {
+        "primary": "00558C",    # Deep Blue
+        "secondary": "E1E1E1",  # Light Grey
+        "accent": "00A4EF",     # Bright Blue
+        "text": "333333"        # Dark Grey
+    },
+    "modern": {
+        "primary": "34495E",    # Dark Slate
+        "secondary": "ECF0F1",  # Cloud
+        "accent": "1ABC9C",     # Turquoise
+        "text": "2C3E50"        # Midnight Blue
+    },
+    "creative": {
+        "primary": "9B59B6",    # Purple
+        "secondary": "FAFAFA",  # White Smoke
+        "accent": "F1C40F",     # Yellow
+        "text": "34495E"        # Dark Slate
+    }
+}
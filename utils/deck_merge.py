@@ -0,0 +1,335 @@
+"""
+Parallel construction of large decks. The sections of a slide plan are split
+into contiguous groups of about the same number of slides (a long work history
+is split between jobs), each group is rendered into its own .pptx in a worker
+process from the same cached themed template, and the slide parts are merged
+at the zip level. The merged package keeps the first part's single copy of the
+master, layouts and theme, so only the slides themselves are copied.
+"""
+import io
+import multiprocessing
+import os
+import posixpath
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+from utils.metrics import metrics
+from utils.ppt_generator import PPTGenerator, SECTION_ORDER
+from utils.resume_ir import Resume
+from utils.slide_plan import SECTION_RENDERERS
+
+
+# Decks expected to have fewer slides than this are built in-process
+PARALLEL_MIN_SLIDES = int(os.getenv("PPT_PARALLEL_MIN_SLIDES", "40"))
+
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+SLIDE_RT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slide"
+SLIDE_LAYOUT_RT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/slideLayout"
+IMAGE_RT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/image"
+SLIDE_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+
+PRESENTATION = "ppt/presentation.xml"
+PRESENTATION_RELS = "ppt/_rels/presentation.xml.rels"
+CONTENT_TYPES = "[Content_Types].xml"
+# Parts every group renders identically from the themed template
+SHARED_PREFIXES = ("ppt/slideMasters/", "ppt/slideLayouts/", "ppt/theme/")
+
+# First slide id PowerPoint allows
+FIRST_SLIDE_ID = 256
+
+# Approximate bullets that fit on one slide, for balancing groups
+BULLETS_PER_SLIDE = 8
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def estimate_slides(section, data):
+    """Rough number of slides a section renders to"""
+    renderer = SECTION_RENDERERS.get(section)
+    if renderer is None or not data:
+        return 0
+    if renderer.kind == "jobs" and isinstance(data, list):
+        return len(data)
+    if renderer.kind == "skills" and isinstance(data, dict):
+        skills = sum(len(items) for items in data.values() if isinstance(items, list))
+        return 1 + (skills + len(data)) // (2 * BULLETS_PER_SLIDE)
+    if isinstance(data, list):
+        return 1 + len(data) // BULLETS_PER_SLIDE
+    return 1
+
+
+def _units(ai_content, sections):
+    """(section, data, estimated slides) in deck order, with each job of a work history as its own unit"""
+    units = []
+    for section in sections:
+        data = ai_content.get(section)
+        renderer = SECTION_RENDERERS.get(section)
+        if renderer is None:
+            continue
+        if renderer.kind == "jobs" and isinstance(data, list):
+            units.extend((section, [job], 1) for job in data)
+        else:
+            # Sections render even when empty (a contact slide of N/As), as in a serial build
+            units.append((section, data, max(1, estimate_slides(section, data))))
+    return units
+
+
+def partition(units, groups):
+    """Split units into at most `groups` contiguous runs of about equal estimated slides"""
+    total = sum(weight for _, _, weight in units)
+    runs = []
+    current = []
+    done = 0
+    for unit in units:
+        current.append(unit)
+        done += unit[2]
+        if len(runs) < groups - 1 and done >= total * (len(runs) + 1) / groups:
+            runs.append(current)
+            current = []
+    if current:
+        runs.append(current)
+    return runs
+
+
+def _coalesce(run):
+    """Rejoin adjacent jobs of the same section into one list so they render with one call"""
+    merged = []
+    for section, data, _ in run:
+        if merged and merged[-1][0] == section and SECTION_RENDERERS[section].kind == "jobs":
+            merged[-1][1].extend(data)
+        else:
+            merged.append((section, list(data) if isinstance(data, list) else data))
+    return merged
+
+
+def _render_group(group, color_scheme):
+    """Render (section, data) pairs into a standalone .pptx, in a worker process"""
+    ppt_gen = PPTGenerator()
+    ppt_gen.set_color_scheme(color_scheme)
+    for section, data in group:
+        ppt_gen.build_section(section, data)
+    return ppt_gen.to_bytes()
+
+
+def _warm_worker():
+    """Compile the themed templates once per worker instead of on its first group"""
+    ppt_gen = PPTGenerator()
+    for scheme_name in ppt_gen.color_schemes:
+        ppt_gen.set_color_scheme(scheme_name)
+
+
+def _get_pool(workers):
+    """Process pool kept warm across decks, recreated only when the worker count changes"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Workers come from a fork server, not a fork of a possibly multithreaded caller such as Streamlit
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver"),
+                                        initializer=_warm_worker)
+            _pool_workers = workers
+        return _pool
+
+
+def _parse(data):
+    return etree.fromstring(data)
+
+
+def _serialize(root):
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _resolve(source, target):
+    """Package member name of a relationship target relative to its source part"""
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source), target))
+
+
+def _rels_name(part):
+    return posixpath.join(posixpath.dirname(part), "_rels", posixpath.basename(part) + ".rels")
+
+
+def _slide_parts(archive):
+    """Slide member names of a package in presentation order"""
+    targets = {
+        rel.get("Id"): _resolve(PRESENTATION, rel.get("Target"))
+        for rel in _parse(archive.read(PRESENTATION_RELS))
+        if rel.get("Type") == SLIDE_RT
+    }
+    sld_id_lst = _parse(archive.read(PRESENTATION)).find(f"{{{P_NS}}}sldIdLst")
+    if sld_id_lst is None:
+        return []
+    return [targets[sld_id.get(f"{{{R_NS}}}id")] for sld_id in sld_id_lst]
+
+
+def _check_shared_parts(base, archive):
+    """Refuse to merge parts that were not rendered from the same master, layouts and theme"""
+    for info in archive.infolist():
+        if info.filename.startswith(SHARED_PREFIXES):
+            try:
+                shared = base.getinfo(info.filename)
+            except KeyError:
+                raise ValueError(f"Part {info.filename} is missing from the first deck")
+            if (shared.CRC, shared.file_size) != (info.CRC, info.file_size):
+                raise ValueError(f"Decks were built from different templates: {info.filename} differs")
+
+
+def merge_decks(parts):
+    """Merge .pptx packages rendered from the same themed template into one, in the given order"""
+    if not parts:
+        raise ValueError("No decks to merge")
+    if len(parts) == 1:
+        return parts[0]
+
+    archives = [zipfile.ZipFile(io.BytesIO(part)) for part in parts]
+    base = archives[0]
+    output = io.BytesIO()
+    slides = []
+    # CRC, size -> merged member name, so identical media is stored once
+    media = {}
+    written = set()
+
+    with metrics.timer("ppt_merge_seconds"), zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as merged:
+        base_slides = set(_slide_parts(base))
+        skip = {PRESENTATION, PRESENTATION_RELS, CONTENT_TYPES}
+        skip.update(base_slides)
+        skip.update(_rels_name(slide) for slide in base_slides)
+        for info in base.infolist():
+            if info.filename not in skip:
+                merged.writestr(info, base.read(info.filename))
+                written.add(info.filename)
+                if info.filename.startswith("ppt/media/"):
+                    media[(info.CRC, info.file_size)] = info.filename
+
+        for archive in archives:
+            if archive is not base:
+                _check_shared_parts(base, archive)
+            for slide in _slide_parts(archive):
+                name = f"ppt/slides/slide{len(slides) + 1}.xml"
+                merged.writestr(name, archive.read(slide))
+                rels_name = _rels_name(slide)
+                if rels_name in archive.namelist():
+                    rels = _parse(archive.read(rels_name))
+                    for rel in rels:
+                        if rel.get("TargetMode") == "External" or rel.get("Type") == SLIDE_LAYOUT_RT:
+                            continue
+                        if rel.get("Type") != IMAGE_RT:
+                            raise ValueError(f"Cannot merge slide relationship {rel.get('Type')}")
+                        rel.set("Target", "../media/" + posixpath.basename(
+                            _copy_media(archive, _resolve(slide, rel.get("Target")), merged, media, written)
+                        ))
+                    merged.writestr(_rels_name(name), _serialize(rels))
+                slides.append(name)
+
+        rel_ids = _slide_rel_ids(base, len(slides))
+        merged.writestr(PRESENTATION_RELS, _merged_presentation_rels(base, slides, rel_ids))
+        merged.writestr(PRESENTATION, _merged_presentation(base, rel_ids))
+        merged.writestr(CONTENT_TYPES, _merged_content_types(archives, slides, written))
+
+    metrics.observe("ppt_merged_parts", len(parts))
+    return output.getvalue()
+
+
+def _copy_media(archive, member, merged, media, written):
+    """Copy one media part into the merged package unless identical bytes are already there"""
+    info = archive.getinfo(member)
+    key = (info.CRC, info.file_size)
+    if key in media:
+        return media[key]
+    stem, extension = posixpath.splitext(posixpath.basename(member))
+    name = f"ppt/media/{stem}{extension}"
+    number = 1
+    while name in written:
+        number += 1
+        name = f"ppt/media/{stem}_{number}{extension}"
+    merged.writestr(name, archive.read(member))
+    written.add(name)
+    media[key] = name
+    return name
+
+
+def _slide_rel_ids(base, slide_count):
+    """Relationship ids for the merged slides that do not collide with the first deck's other relationships"""
+    used = {rel.get("Id") for rel in _parse(base.read(PRESENTATION_RELS)) if rel.get("Type") != SLIDE_RT}
+    rel_ids = []
+    number = 0
+    while len(rel_ids) < slide_count:
+        number += 1
+        if f"rId{number}" not in used:
+            rel_ids.append(f"rId{number}")
+    return rel_ids
+
+
+def _merged_presentation_rels(base, slides, rel_ids):
+    """The first deck's non-slide relationships plus one per merged slide"""
+    rels = _parse(base.read(PRESENTATION_RELS))
+    for rel in list(rels):
+        if rel.get("Type") == SLIDE_RT:
+            rels.remove(rel)
+    for rel_id, slide in zip(rel_ids, slides):
+        etree.SubElement(rels, f"{{{RELS_NS}}}Relationship", Id=rel_id, Type=SLIDE_RT,
+                         Target=posixpath.relpath(slide, "ppt"))
+    return _serialize(rels)
+
+
+def _merged_presentation(base, rel_ids):
+    """The first deck's presentation.xml with a slide id list covering every merged slide"""
+    presentation = _parse(base.read(PRESENTATION))
+    sld_id_lst = presentation.find(f"{{{P_NS}}}sldIdLst")
+    if sld_id_lst is None:
+        sld_id_lst = etree.Element(f"{{{P_NS}}}sldIdLst")
+        presentation.find(f"{{{P_NS}}}sldMasterIdLst").addnext(sld_id_lst)
+    for sld_id in list(sld_id_lst):
+        sld_id_lst.remove(sld_id)
+    for index, rel_id in enumerate(rel_ids):
+        etree.SubElement(sld_id_lst, f"{{{P_NS}}}sldId", {"id": str(FIRST_SLIDE_ID + index), f"{{{R_NS}}}id": rel_id})
+    return _serialize(presentation)
+
+
+def _merged_content_types(archives, slides, written):
+    """Content types of the first deck with slide overrides for the merged slides and every media extension"""
+    types = _parse(archives[0].read(CONTENT_TYPES))
+    for override in list(types.findall(f"{{{CONTENT_TYPES_NS}}}Override")):
+        if override.get("PartName").startswith("/ppt/slides/"):
+            types.remove(override)
+    defaults = {default.get("Extension").lower() for default in types.findall(f"{{{CONTENT_TYPES_NS}}}Default")}
+    for archive in archives[1:]:
+        for default in _parse(archive.read(CONTENT_TYPES)).findall(f"{{{CONTENT_TYPES_NS}}}Default"):
+            extension = default.get("Extension").lower()
+            if extension not in defaults and any(name.lower().endswith("." + extension) for name in written):
+                types.append(default)
+                defaults.add(extension)
+    for slide in slides:
+        etree.SubElement(types, f"{{{CONTENT_TYPES_NS}}}Override", PartName=f"/{slide}", ContentType=SLIDE_CONTENT_TYPE)
+    return _serialize(types)
+
+
+def build_deck(ai_content, color_scheme="professional", sections=SECTION_ORDER, workers=None,
+               min_slides=PARALLEL_MIN_SLIDES):
+    """
+    Render a deck to .pptx bytes, splitting large decks into section groups rendered
+    in worker processes and merged. Small decks, single-worker runs and callers that
+    are themselves daemon worker processes render in-process.
+    """
+    if isinstance(ai_content, Resume):
+        ai_content = ai_content.to_dict()
+    workers = workers or os.cpu_count() or 1
+    units = _units(ai_content, sections)
+    estimated = sum(weight for _, _, weight in units)
+
+    if workers <= 1 or estimated < min_slides or multiprocessing.current_process().daemon:
+        ppt_gen = PPTGenerator()
+        ppt_gen.generate_from_ai_content(ai_content, color_scheme, sections)
+        return ppt_gen.to_bytes()
+
+    with metrics.timer("ppt_parallel_build_seconds"):
+        groups = [_coalesce(run) for run in partition(units, workers)]
+        pool = _get_pool(workers)
+        parts = list(pool.map(_render_group, groups, [color_scheme] * len(groups)))
+        return merge_decks(parts)
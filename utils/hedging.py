@@ -0,0 +1,216 @@
+"""
+Hedged requests with provider failover. A request goes to the primary provider
+first; if it has not answered by a threshold learned from its recent latency
+percentile, the same prompt is sent to the secondary provider and the first
+valid result wins. Per-provider circuit breakers skip providers that keep failing.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from utils.async_ai_service import AsyncAIService
+from utils.metrics import metrics
+from utils.offline_generator import generate_offline
+
+
+# Hedge delay used until enough latencies have been observed
+DEFAULT_HEDGE_DELAY = 10.0
+OTHER_PROVIDER = {"openai": "perplexity", "perplexity": "openai"}
+
+
+class LatencyTracker:
+    """Sliding window of recent successful request latencies for one provider"""
+
+    def __init__(self, window=200, percentile=95, min_samples=20, default=DEFAULT_HEDGE_DELAY):
+        self.samples = deque(maxlen=window)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default = default
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def threshold(self):
+        """The configured percentile of recent latencies, or the default before warm-up"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return self.default
+            ordered = sorted(self.samples)
+        rank = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[rank]
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects requests for
+    reset_timeout seconds, then lets a single trial request through (half-open)
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """True if a request may be sent to the provider now"""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    metrics.increment("ai_circuit_opened_total", service=self.name)
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give back a half-open trial slot whose request was cancelled"""
+        with self._lock:
+            self._trial_running = False
+
+
+# Latency and breaker state is shared process-wide so it survives individual services
+_provider_health = {}
+_health_lock = threading.Lock()
+
+
+def provider_health(service_type):
+    """Return the (LatencyTracker, CircuitBreaker) pair for a provider"""
+    with _health_lock:
+        health = _provider_health.get(service_type)
+        if health is None:
+            health = _provider_health[service_type] = (LatencyTracker(), CircuitBreaker(service_type))
+        return health
+
+
+class HedgedAIService(AsyncAIService):
+    """AsyncAIService that hedges every request against a secondary provider"""
+
+    def __init__(self, service_type="openai", secondary_type=None, cache=None, **kwargs):
+        super().__init__(service_type=service_type, cache=cache, **kwargs)
+        # The secondary uses its provider's default endpoint
+        kwargs.pop("base_url", None)
+        self.secondary = AsyncAIService(service_type=secondary_type or OTHER_PROVIDER[service_type], **kwargs)
+
+    async def close(self):
+        """Close both providers' connection pools"""
+        await super().close()
+        await self.secondary.close()
+
+    async def _generate(self, prompt):
+        """Send to the primary, hedge to the secondary past the latency threshold, return the first valid result"""
+        candidates = [
+            (self.service_type, super()._generate),
+            (self.secondary.service_type, self.secondary._generate)
+        ]
+        tasks = {}
+
+        def launch_next():
+            # Breakers are consulted only when a request is about to be sent
+            while candidates:
+                name, send = candidates.pop(0)
+                if provider_health(name)[1].allow():
+                    tasks[asyncio.create_task(self._attempt(name, send, prompt))] = name
+                    return True
+            return False
+
+        if not launch_next():
+            return {"error": "All AI providers are temporarily unavailable"}
+        hedge_at = time.monotonic() + provider_health(next(iter(tasks.values())))[0].threshold()
+        errors = []
+        pending = set(tasks)
+        try:
+            while pending:
+                timeout = max(0.0, hedge_at - time.monotonic()) if candidates else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # The primary is slower than usual: race the secondary against it
+                    if launch_next():
+                        metrics.increment("ai_hedges_total", service=self.service_type)
+                    pending = {task for task in tasks if not task.done()}
+                    continue
+
+                for task in done:
+                    result = task.result()
+                    if "error" not in result:
+                        metrics.increment("ai_hedge_wins_total", service=tasks[task])
+                        return result
+                    errors.append(result["error"])
+
+                if not pending and launch_next():
+                    # Fail over at once instead of waiting for the hedge threshold
+                    metrics.increment("ai_failovers_total", service=self.service_type)
+                    pending = {task for task in tasks if not task.done()}
+        finally:
+            # Cancel the losing request
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return {"error": errors[0]}
+
+    async def _attempt(self, name, send, prompt):
+        """Run one provider request, feeding its latency tracker and circuit breaker"""
+        tracker, breaker = provider_health(name)
+        started = time.monotonic()
+        try:
+            result = await send(prompt)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            result = {"error": str(e)}
+
+        if "error" in result:
+            breaker.record_failure()
+        else:
+            tracker.observe(time.monotonic() - started)
+            breaker.record_success()
+        return result
+
+
+def generate_hedged(user_input, service_type="openai", secondary_type=None, cache=None, by_section=False,
+                    sections=None, offline_fallback=False):
+    """Synchronous entry point: generate resume content with a hedged service"""
+    async def run():
+        async with HedgedAIService(service_type, secondary_type, cache=cache) as ai:
+            if by_section:
+                return await ai.agenerate_resume_content_by_section(user_input, sections)
+            return await ai.agenerate_resume_content(user_input, sections)
+
+    result = asyncio.run(run())
+    if offline_fallback and isinstance(result, dict) and "error" in result:
+        # Both providers failed, so build the content from the form fields instead
+        metrics.increment("ai_offline_fallbacks_total", service=service_type)
+        return generate_offline(user_input, sections)
+    return result
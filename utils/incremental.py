@@ -0,0 +1,88 @@
+import hashlib
+import json
+from utils.ppt_generator import PPTGenerator, SECTION_ORDER
+from utils.slide_plan import section_inputs
+
+
+def content_hash(value):
+    """Stable hash of any JSON-serializable value"""
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class IncrementalPipeline:
+    """
+    Keeps the previous run's per-section AI output and slides so that a
+    resubmit only regenerates and re-renders the sections whose inputs changed
+    """
+
+    def __init__(self, ai_service):
+        self.ai = ai_service
+        self.ppt_gen = None
+        self.color_scheme = None
+        self.sections = None
+        # section -> hash of the user input fields it was generated from
+        self.input_hashes = {}
+        # section -> AI output from the last successful generation
+        self.ai_content = {}
+        # section -> hash of the content its current slides were rendered from
+        self.rendered_hashes = {}
+        # Changed sections whose regeneration failed in the last run, still showing their old content
+        self.stale_sections = []
+
+    def section_input_hash(self, user_input, section):
+        """Hash the slice of user input a section depends on, plus the provider and model"""
+        fields = {field: user_input.get(field) for field in section_inputs(section)}
+        return content_hash([self.ai.service_type, self.ai.model, section, fields])
+
+    def dirty_sections(self, user_input, sections=SECTION_ORDER):
+        """Return the sections whose inputs changed since the last run"""
+        return [
+            section for section in sections
+            if section not in self.ai_content
+            or self.input_hashes.get(section) != self.section_input_hash(user_input, section)
+        ]
+
+    def run(self, user_input, color_scheme="professional", on_section=None, sections=SECTION_ORDER):
+        """
+        Regenerate the dirty sections of a slide plan and splice their slides into the
+        existing deck. Returns the PPTGenerator, or {"error": ...} if nothing could be generated.
+        Changed sections that failed keep their previous content and are listed in stale_sections.
+        """
+        sections = tuple(sections)
+        dirty = self.dirty_sections(user_input, sections)
+        failed = []
+
+        if dirty:
+            for event in self.ai.stream_resume_content_by_section(user_input, dirty):
+                if event.kind == "error":
+                    if event.section is None and not self.ai_content:
+                        return {"error": event.value}
+                    if event.section is not None:
+                        failed.append(event.section)
+                elif event.kind == "section":
+                    self.ai_content[event.section] = event.value
+                    self.input_hashes[event.section] = self.section_input_hash(user_input, event.section)
+                    if on_section is not None:
+                        on_section(event.section)
+        self.stale_sections = [section for section in failed if section in self.ai_content]
+
+        if self.ppt_gen is None or color_scheme != self.color_scheme or sections != self.sections:
+            # First run, a new color scheme or a new plan: build the whole deck from the stored sections
+            self.ppt_gen = PPTGenerator()
+            self.ppt_gen.generate_from_ai_content(self.ai_content, color_scheme, sections)
+            self.color_scheme = color_scheme
+            self.sections = sections
+            self.rendered_hashes = {section: content_hash(value) for section, value in self.ai_content.items()}
+            return self.ppt_gen
+
+        # Re-render only the sections whose content actually changed
+        for section in sections:
+            if section not in self.ai_content:
+                continue
+            rendered = content_hash(self.ai_content[section])
+            if self.rendered_hashes.get(section) != rendered:
+                self.ppt_gen.replace_section(section, self.ai_content[section], sections)
+                self.rendered_hashes[section] = rendered
+
+        return self.ppt_gen
@@ -0,0 +1,353 @@
+"""
+Bulk ingestion of existing resumes. Extracts the user_data structure that
+AIService.generate_resume_content expects from .docx and plain-text files,
+parsing many files in parallel worker processes. Files are identified by the
+SHA-256 of their bytes so content that was already ingested is skipped.
+
+Usage:
+    python -m utils.ingest resumes/ --output records.jsonl --workers 4
+"""
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+
+
+SUPPORTED_EXTENSIONS = (".docx", ".txt")
+
+# Larger files are rejected instead of parsed
+MAX_FILE_BYTES = 10 * 1024 * 1024
+MAX_DOCUMENT_XML_BYTES = 50 * 1024 * 1024
+
+DEFAULT_LEDGER_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "ai_ppt_generator", "ingested.sqlite3"
+)
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# user_data field -> headings that start its section (compared lowercased, "&" read as "and")
+SECTION_HEADINGS = {
+    "summary": ("summary", "professional summary", "profile", "professional profile", "objective",
+                "career objective", "about", "about me"),
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history"),
+    "education": ("education", "academic background", "qualifications", "education and training"),
+    "skills": ("skills", "technical skills", "key skills", "core competencies", "competencies",
+               "skills and expertise", "expertise"),
+    "achievements": ("achievements", "accomplishments", "awards", "honors", "honours", "certifications",
+                     "achievements and certifications", "awards and certifications",
+                     "certifications and awards"),
+    "contact": ("contact", "contact information", "contact details")
+}
+HEADING_FIELDS = {heading: field for field, headings in SECTION_HEADINGS.items() for heading in headings}
+
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{6,}\d")
+LINKEDIN_PATTERN = re.compile(r"(?:https?://)?(?:[\w-]+\.)?linkedin\.com/[^\s|,;]+", re.IGNORECASE)
+URL_PATTERN = re.compile(r"(?:https?://|www\.)[^\s|,;]+|\b[\w-]+\.(?:com|io|dev|net|org|me|co)(?:/[^\s|,;]*)?\b",
+                         re.IGNORECASE)
+BULLET_PATTERN = re.compile(r"^[•▪●–—*\-]\s*")
+
+
+def content_hash(data):
+    """SHA-256 of a file's bytes, the identity used to skip repeat ingestion"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def docx_paragraphs(source):
+    """Yield the text of each paragraph in a .docx file (path or file object), streaming the XML"""
+    with zipfile.ZipFile(source) as archive:
+        try:
+            info = archive.getinfo("word/document.xml")
+        except KeyError:
+            raise ValueError("Not a Word document: word/document.xml is missing")
+        if info.file_size > MAX_DOCUMENT_XML_BYTES:
+            raise ValueError("Word document is too large to ingest")
+
+        with archive.open(info) as document:
+            parts = []
+            for _, element in ET.iterparse(document, events=("end",)):
+                tag = element.tag
+                if tag == f"{WORD_NS}t":
+                    parts.append(element.text or "")
+                elif tag == f"{WORD_NS}tab":
+                    parts.append("\t")
+                elif tag in (f"{WORD_NS}br", f"{WORD_NS}cr"):
+                    parts.append("\n")
+                elif tag == f"{WORD_NS}p":
+                    yield "".join(parts)
+                    parts = []
+                    # Drop parsed paragraphs so memory stays flat on long documents
+                    element.clear()
+
+
+def decode_text(data):
+    """Decode plain-text resume bytes, falling back to cp1252 for legacy files"""
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return data.decode("cp1252", errors="replace")
+
+
+def extract_text(name, data):
+    """Return the plain text of a supported resume file given its name and bytes"""
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".docx":
+        return "\n".join(docx_paragraphs(io.BytesIO(data)))
+    if extension == ".txt":
+        return decode_text(data)
+    raise ValueError(f"Unsupported file type: {extension or name}")
+
+
+def _heading_field(line):
+    """The user_data field a heading line starts, or None"""
+    key = line.strip().rstrip(":").strip().lower().replace("&", "and")
+    key = re.sub(r"\s+", " ", key)
+    if len(key) > 40:
+        return None
+    return HEADING_FIELDS.get(key)
+
+
+def _extract_contact(lines):
+    """Pull email, phone, LinkedIn and portfolio out of free-form lines"""
+    text = "\n".join(lines)
+    email = EMAIL_PATTERN.search(text)
+    linkedin = LINKEDIN_PATTERN.search(text)
+    # Strip the matched values so their digits and domains are not reused
+    rest = EMAIL_PATTERN.sub(" ", LINKEDIN_PATTERN.sub(" ", text))
+    phone = PHONE_PATTERN.search(rest)
+    portfolio = URL_PATTERN.search(rest)
+    return {
+        "email": email.group(0) if email else "",
+        "phone": phone.group(0).strip() if phone else "",
+        "linkedin": linkedin.group(0) if linkedin else "",
+        "portfolio": portfolio.group(0) if portfolio else ""
+    }
+
+
+def _is_contact_line(line):
+    return bool(EMAIL_PATTERN.search(line) or LINKEDIN_PATTERN.search(line) or PHONE_PATTERN.fullmatch(line)
+                or URL_PATTERN.fullmatch(line))
+
+
+def parse_resume_text(text):
+    """Split resume text into the user_data structure using its section headings"""
+    header = []
+    sections = {}
+    current = None
+    for raw_line in text.splitlines():
+        line = BULLET_PATTERN.sub("", raw_line.strip()).strip()
+        if not line:
+            continue
+        field = _heading_field(line)
+        if field:
+            current = field
+            sections.setdefault(field, [])
+        elif current is None:
+            header.append(line)
+        else:
+            sections[current].append(line)
+
+    # The header holds the name, the professional title and usually the contact details
+    identity = [line for line in header if not _is_contact_line(line)]
+    name = identity[0] if identity else ""
+    title = identity[1] if len(identity) > 1 and len(identity[1]) <= 80 else ""
+    leftover = identity[2 if title else 1:]
+    if leftover and "summary" not in sections:
+        sections["summary"] = leftover
+
+    return {
+        "name": name,
+        "title": title,
+        "contact": _extract_contact(header + sections.pop("contact", [])),
+        "summary": " ".join(sections.get("summary", [])),
+        "experience": "\n".join(sections.get("experience", [])),
+        "education": "\n".join(sections.get("education", [])),
+        "skills": "\n".join(sections.get("skills", [])),
+        "achievements": "\n".join(sections.get("achievements", []))
+    }
+
+
+def parse_file(name, data):
+    """Extract user_data from one resume file's bytes"""
+    if len(data) > MAX_FILE_BYTES:
+        raise ValueError("File is too large to ingest")
+    user_data = parse_resume_text(extract_text(name, data))
+    if not user_data["name"]:
+        raise ValueError("No resume content found")
+    return user_data
+
+
+def _parse_item(source, data, digest):
+    """Worker entry point: parse one file (bytes, or read from the source path) into a result dict"""
+    try:
+        if data is None:
+            if os.path.getsize(source) > MAX_FILE_BYTES:
+                raise ValueError("File is too large to ingest")
+            with open(source, "rb") as f:
+                data = f.read()
+        return {"source": source, "hash": digest, "user_data": parse_file(source, data)}
+    except Exception as e:
+        return {"source": source, "hash": digest, "error": str(e)}
+
+
+def iter_resume_files(directory):
+    """Yield the supported resume files under a directory, in a stable order"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.lower().endswith(SUPPORTED_EXTENSIONS) and not filename.startswith("~$"):
+                yield os.path.join(root, filename)
+
+
+def ingest_files(items, workers=None, seen=None, max_in_flight=None):
+    """
+    Parse resume files in parallel, yielding one result dict per file as it finishes.
+    items are file paths or (name, bytes) pairs. Files whose hash is in `seen` (any
+    container, such as an IngestLedger) or repeats an earlier file are reported as
+    duplicates without being parsed. At most max_in_flight files are queued at once.
+    """
+    seen = seen if seen is not None else ()
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    hashes = set()
+
+    def tasks():
+        for item in items:
+            if isinstance(item, (str, os.PathLike)):
+                source, data = os.fspath(item), None
+                try:
+                    digest = file_hash(source)
+                except OSError as e:
+                    yield {"source": source, "hash": None, "error": str(e)}
+                    continue
+            else:
+                source, data = item
+                digest = content_hash(data)
+            if digest in hashes or digest in seen:
+                yield {"source": source, "hash": digest, "duplicate": True}
+                continue
+            hashes.add(digest)
+            yield source, data, digest
+
+    if workers == 1:
+        for task in tasks():
+            yield task if isinstance(task, dict) else _parse_item(*task)
+        return
+
+    # Workers come from a fork server, not a fork of a possibly multithreaded caller such as Streamlit
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver")) as pool:
+        pending = set()
+        for task in tasks():
+            if isinstance(task, dict):
+                yield task
+                continue
+            pending.add(pool.submit(_parse_item, *task))
+            # Bound the number of files held in memory by queued tasks
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+
+
+class IngestLedger:
+    """Persistent set of ingested content hashes backed by SQLite"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("INGEST_LEDGER_PATH", DEFAULT_LEDGER_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingested (
+                    hash TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    ingested_at REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __contains__(self, digest):
+        with self._connect() as conn:
+            return conn.execute("SELECT 1 FROM ingested WHERE hash = ?", (digest,)).fetchone() is not None
+
+    def add(self, digest, source):
+        """Record a content hash as ingested"""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested (hash, source, ingested_at) VALUES (?, ?, ?)",
+                (digest, source, time.time())
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract user_data records from .docx/.txt resumes")
+    parser.add_argument("inputs", nargs="+", help="Resume files or directories")
+    parser.add_argument("--output", help="JSONL file to append records to (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--ledger", help="Ledger of ingested hashes (default: INGEST_LEDGER_PATH or ~/.cache)")
+    parser.add_argument("--no-ledger", action="store_true", help="Ingest every file, even if seen before")
+    args = parser.parse_args(argv)
+
+    ledger = None if args.no_ledger else IngestLedger(args.ledger)
+    paths = (path for item in args.inputs
+             for path in (iter_resume_files(item) if os.path.isdir(item) else [item]))
+
+    counts = {"ok": 0, "error": 0, "duplicate": 0}
+    out = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in ingest_files(paths, workers=args.workers, seen=ledger):
+            if result.get("duplicate"):
+                counts["duplicate"] += 1
+            elif "error" in result:
+                counts["error"] += 1
+                sys.stderr.write(f"{result['source']}: {result['error']}\n")
+            else:
+                counts["ok"] += 1
+                record_id = os.path.splitext(os.path.basename(result["source"]))[0]
+                out.write(json.dumps({"id": record_id, "user_data": result["user_data"]}) + "\n")
+                if ledger is not None:
+                    ledger.add(result["hash"], result["source"])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    sys.stderr.write(json.dumps(counts) + "\n")
+    return 0 if counts["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
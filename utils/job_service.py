@@ -0,0 +1,464 @@
+"""
+Out-of-process generation service: a local HTTP API in front of a durable
+SQLite job queue drained by a pool of worker processes.
+
+Usage:
+    python -m utils.job_service --port 8765 --workers 4
+
+Endpoints:
+    POST /jobs               submit {"user_data": {...}, "service_type": ..., "template": ...}
+                             or {"ai_content": {...}, "template": ...}; returns {"id", "status"}.
+                             Optional "tenant" and "priority" are used by the shared rate limiter;
+                             "offline_fallback" builds rule-based content if the provider fails.
+    GET  /jobs/<id>          job status: queued, running, done or error
+    GET  /jobs/<id>/result   the generated .pptx once the job is done
+    GET  /health             queue depth by status
+
+Jobs survive restarts of both the UI and the service: a job whose worker stops
+sending heartbeats is put back in the queue, up to max_attempts times.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.templates import ResumeTemplates
+
+
+DEFAULT_QUEUE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "ai_ppt_generator", "jobs.sqlite3"
+)
+PPTX_MIME = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+class JobQueue:
+    """Durable job queue backed by SQLite, shared by the HTTP server and its workers"""
+
+    def __init__(self, path=None, lease_seconds=120, max_attempts=3, result_ttl=24 * 3600):
+        self.path = path or os.getenv("JOB_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    request TEXT NOT NULL,
+                    result BLOB,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    heartbeat_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def submit(self, request):
+        """Queue a generation request and return its job id"""
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, request, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(request, ensure_ascii=False), time.time())
+            )
+        return job_id
+
+    def claim(self, worker_id):
+        """Take the oldest queued job for a worker, returning (job_id, request) or None"""
+        while True:
+            now = time.time()
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT id, request FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                claimed = conn.execute(
+                    """
+                    UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?,
+                        attempts = attempts + 1
+                    WHERE id = ? AND status = 'queued'
+                    """,
+                    (worker_id, now, now, row[0])
+                ).rowcount
+            # Another worker may have claimed the same job first
+            if claimed:
+                return row[0], json.loads(row[1])
+
+    def heartbeat(self, job_id, worker_id):
+        """Extend the lease of a running job the worker still holds"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running' AND worker = ?",
+                (time.time(), job_id, worker_id)
+            )
+
+    def complete(self, job_id, worker_id, data):
+        """Store the finished deck; returns False if the worker no longer holds the job"""
+        with self._connect() as conn:
+            return conn.execute(
+                """
+                UPDATE jobs SET status = 'done', result = ?, finished_at = ?
+                WHERE id = ? AND status = 'running' AND worker = ?
+                """,
+                (sqlite3.Binary(data), time.time(), job_id, worker_id)
+            ).rowcount > 0
+
+    def fail(self, job_id, worker_id, error):
+        """Record a job that failed for good; returns False if the worker no longer holds the job"""
+        with self._connect() as conn:
+            return conn.execute(
+                """
+                UPDATE jobs SET status = 'error', error = ?, finished_at = ?
+                WHERE id = ? AND status = 'running' AND worker = ?
+                """,
+                (error, time.time(), job_id, worker_id)
+            ).rowcount > 0
+
+    def status(self, job_id):
+        """Return the job's status dict without its result, or None if unknown"""
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT status, error, attempts, created_at, started_at, finished_at, LENGTH(result)
+                FROM jobs WHERE id = ?
+                """,
+                (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            status, error, attempts, created_at, started_at, finished_at, size = row
+            position = None
+            if status == "queued":
+                position = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?", (created_at,)
+                ).fetchone()[0]
+
+        info = {"id": job_id, "status": status, "attempts": attempts, "created_at": created_at}
+        if position is not None:
+            info["queue_position"] = position
+        if started_at:
+            info["started_at"] = started_at
+        if finished_at:
+            info["finished_at"] = finished_at
+        if error:
+            info["error"] = error
+        if size is not None:
+            info["result_bytes"] = size
+        return info
+
+    def result(self, job_id):
+        """Return the finished deck bytes, or None if the job is not done"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM jobs WHERE id = ? AND status = 'done'", (job_id,)
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def requeue_stale(self):
+        """Requeue running jobs whose worker stopped heartbeating; fail those out of attempts"""
+        cutoff = time.time() - self.lease_seconds
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE jobs SET status = 'error', error = 'Worker stopped responding', finished_at = ?
+                WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?
+                """,
+                (time.time(), cutoff, self.max_attempts)
+            )
+            return conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                (cutoff,)
+            ).rowcount
+
+    def purge(self):
+        """Delete finished jobs older than the result TTL"""
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'error') AND finished_at < ?",
+                (time.time() - self.result_ttl,)
+            )
+
+    def counts(self):
+        """Number of jobs in each status"""
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def run_job(request, services):
+    """Generate the deck for one request, returning (pptx bytes, None) or (None, error)"""
+    from utils.ppt_generator import PPTGenerator
+    from utils.rate_limiter import tenant_context
+    from utils.slide_plan import compile_plan
+
+    template = request.get("template") or ResumeTemplates.get_template_options()[0]
+    if template not in ResumeTemplates.get_template_options():
+        return None, f"Unknown template: {template}"
+    plan = compile_plan(template)
+
+    ai_content = request.get("ai_content")
+    if ai_content is None:
+        service_type = request.get("service_type", "openai")
+        offline_fallback = bool(request.get("offline_fallback"))
+        ai = services.get((service_type, offline_fallback))
+        if ai is None:
+            from utils.ai_service import AIService
+            from utils.cache import ResponseCache
+            ai = services[(service_type, offline_fallback)] = AIService(
+                service_type=service_type, cache=ResponseCache(), offline_fallback=offline_fallback
+            )
+        with tenant_context(request.get("tenant") or "jobs", int(request.get("priority") or 0)):
+            if request.get("parallel_sections"):
+                ai_content = ai.generate_resume_content_by_section(request["user_data"], list(plan.sections))
+            else:
+                ai_content = ai.generate_resume_content(request["user_data"], plan.sections)
+
+    if not isinstance(ai_content, dict) or "error" in ai_content:
+        error = ai_content.get("error", "Unknown error") if isinstance(ai_content, dict) else "Unknown error"
+        return None, f"AI Content Generation Failed: {error}"
+
+    try:
+        ppt_gen = PPTGenerator()
+        ppt_gen.generate_from_ai_content(ai_content, plan.color_scheme, plan.sections)
+        return ppt_gen.to_bytes(), None
+    except Exception as e:
+        return None, f"Presentation Generation Error: {str(e)}"
+
+
+def worker_loop(queue_path, worker_id, poll_interval=0.5, lease_seconds=120):
+    """Claim and run jobs until the process is terminated"""
+    queue = JobQueue(queue_path, lease_seconds=lease_seconds)
+    # AI services are created once per worker so their clients are reused
+    services = {}
+    while True:
+        claimed = queue.claim(worker_id)
+        if claimed is None:
+            time.sleep(poll_interval)
+            continue
+
+        job_id, request = claimed
+        finished = threading.Event()
+
+        def keep_alive():
+            while not finished.wait(lease_seconds / 3):
+                queue.heartbeat(job_id, worker_id)
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            data, error = run_job(request, services)
+        except Exception as e:
+            data, error = None, str(e)
+        finally:
+            finished.set()
+            heartbeat.join()
+
+        if error:
+            queue.fail(job_id, worker_id, error)
+        else:
+            queue.complete(job_id, worker_id, data)
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end for the job queue"""
+
+    queue = None
+    max_body_bytes = 5 * 1024 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "Not found"})
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > self.max_body_bytes:
+            return self._send(413, {"error": "Request too large"})
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "Request body must be JSON"})
+        if not isinstance(request, dict) or not (
+                isinstance(request.get("user_data"), dict) or isinstance(request.get("ai_content"), dict)):
+            return self._send(400, {"error": "Expected user_data or ai_content"})
+        if request.get("service_type", "openai") not in ("openai", "perplexity", "offline"):
+            return self._send(400, {"error": f"Unsupported service type: {request['service_type']}"})
+        # Validated here so bad values fail fast instead of as jobs, and compile_plan only caches real templates
+        if request.get("template") and request["template"] not in ResumeTemplates.get_template_options():
+            return self._send(400, {"error": f"Unknown template: {request['template']}"})
+        try:
+            int(request.get("priority") or 0)
+        except (TypeError, ValueError):
+            return self._send(400, {"error": "priority must be an integer"})
+
+        job_id = self.queue.submit(request)
+        self._send(202, {"id": job_id, "status": "queued"})
+
+    def do_GET(self):
+        if self.path == "/health":
+            return self._send(200, {"status": "ok", "jobs": self.queue.counts()})
+
+        match = re.fullmatch(r"/jobs/([0-9a-f]{32})(/result)?", self.path)
+        if not match:
+            return self._send(404, {"error": "Not found"})
+
+        job_id, want_result = match.groups()
+        info = self.queue.status(job_id)
+        if info is None:
+            return self._send(404, {"error": "Unknown job"})
+        if not want_result:
+            return self._send(200, info)
+        if info["status"] != "done":
+            return self._send(409, info)
+        self._send(200, self.queue.result(job_id), PPTX_MIME)
+
+
+def serve(host="127.0.0.1", port=8765, workers=None, queue_path=None, lease_seconds=120):
+    """Run the HTTP server and supervise the worker processes until interrupted"""
+    queue = JobQueue(queue_path, lease_seconds=lease_seconds)
+    # Jobs left running by a previous instance are picked up again after their lease expires
+    queue.requeue_stale()
+
+    workers = workers or os.cpu_count() or 1
+    processes = {}
+
+    def start_worker(slot):
+        process = multiprocessing.Process(
+            target=worker_loop,
+            args=(queue.path, f"{os.getpid()}-{slot}"),
+            kwargs={"lease_seconds": lease_seconds},
+            daemon=True
+        )
+        process.start()
+        processes[slot] = process
+
+    for slot in range(workers):
+        start_worker(slot)
+
+    handler = type("BoundJobRequestHandler", (JobRequestHandler,), {"queue": queue})
+    server = ThreadingHTTPServer((host, port), handler)
+    stopping = threading.Event()
+
+    def supervise():
+        # Restart crashed workers, requeue their jobs and drop expired results
+        while not stopping.wait(min(lease_seconds / 3, 10)):
+            for slot, process in list(processes.items()):
+                if not process.is_alive():
+                    start_worker(slot)
+            queue.requeue_stale()
+            queue.purge()
+
+    supervisor = threading.Thread(target=supervise, daemon=True)
+    supervisor.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopping.set()
+        server.server_close()
+        for process in processes.values():
+            process.terminate()
+            process.join()
+
+
+class JobClient:
+    """Thin HTTP client for the generation service"""
+
+    def __init__(self, base_url, timeout=30):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def submit(self, request):
+        """Submit a generation request and return the job id"""
+        response = self.session.post(f"{self.base_url}/jobs", json=request, timeout=self.timeout)
+        if response.status_code != 202:
+            raise RuntimeError(f"Job submission failed {response.status_code}: {response.text}")
+        return response.json()["id"]
+
+    def status(self, job_id):
+        """Return the job status dict, or None for an unknown job"""
+        response = self.session.get(f"{self.base_url}/jobs/{job_id}", timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def result(self, job_id):
+        """Return the finished .pptx bytes"""
+        response = self.session.get(f"{self.base_url}/jobs/{job_id}/result", timeout=self.timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Result not available {response.status_code}: {response.text}")
+        return response.content
+
+    def wait(self, job_id, poll_interval=1.0, timeout=600, on_status=None):
+        """Poll until the job is done or failed and return its final status"""
+        deadline = time.monotonic() + timeout
+        while True:
+            info = self.status(job_id)
+            if info is None:
+                return {"id": job_id, "status": "error", "error": "Unknown job"}
+            if on_status is not None:
+                on_status(info)
+            if info["status"] in ("done", "error"):
+                return info
+            if time.monotonic() > deadline:
+                return {**info, "status": "error", "error": "Timed out waiting for the generation service"}
+            time.sleep(poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the presentation generation service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--queue", help="Job queue database (default: $JOB_QUEUE_PATH or ~/.cache)")
+    parser.add_argument("--lease", type=int, default=120, help="Seconds before a silent worker's job is retried")
+    args = parser.parse_args(argv)
+
+    serve(args.host, args.port, args.workers, args.queue, args.lease)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
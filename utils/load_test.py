@@ -0,0 +1,180 @@
+"""
+End-to-end load test of the generation pipeline against the local stub server.
+
+Usage:
+    python -m utils.load_test --requests 200 --concurrency 16 --mode sections
+    python -m utils.load_test --base-url http://127.0.0.1:8080 --service perplexity
+
+Each simulated generation runs the real AIService (prompt building, HTTP,
+parsing, validation) and PPTGenerator build and save. Without --base-url an
+in-process stub is started with the given latency and error settings, so the
+run needs no network or API keys.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from utils.batch import percentile
+from utils.stub_server import add_behavior_arguments, behavior_from_args, start_stub_server
+
+
+MODES = ("full", "sections", "stream")
+
+SAMPLE_USER_INPUT = {
+    "name": "Alex Example",
+    "title": "Principal Engineer",
+    "contact": {"email": "alex@example.com", "phone": "+1 555 0100"},
+    "summary": "Engineer with fifteen years of experience building data platforms.",
+    "experience": "Principal Engineer, Example Corp, 2018-2024, led the platform team\n"
+                  "Senior Engineer, Sample Inc, 2012-2018, built streaming pipelines",
+    "education": "BSc Computer Science, Example University, 2008",
+    "skills": "Technical: Python, Go, Kubernetes; Soft: Leadership, Mentoring",
+    "achievements": "Speaker at PyCon; two patents in stream processing"
+}
+
+
+def _simulate(ai, mode, index):
+    """Run one generation through the pipeline and return its stage timings"""
+    from utils.ppt_generator import PPTGenerator
+
+    # Vary the input so no two prompts are identical
+    user_input = dict(SAMPLE_USER_INPUT, name=f"{SAMPLE_USER_INPUT['name']} {index}")
+    started = time.perf_counter()
+    ppt_gen = PPTGenerator()
+    if mode == "stream":
+        for event in ai.stream_resume_content(user_input):
+            if event.kind == "error":
+                raise RuntimeError(event.value)
+            ppt_gen.add_stream_event(event)
+        ppt_gen.reorder_sections()
+        generated = built = time.perf_counter()
+    else:
+        if mode == "sections":
+            ai_content = ai.generate_resume_content_by_section(user_input)
+        else:
+            ai_content = ai.generate_resume_content(user_input)
+        if "error" in ai_content:
+            raise RuntimeError(ai_content["error"])
+        generated = time.perf_counter()
+        ppt_gen.generate_from_ai_content(ai_content)
+        built = time.perf_counter()
+    size = len(ppt_gen.to_bytes())
+    saved = time.perf_counter()
+    return {"total": saved - started, "ai": generated - started, "build": built - generated,
+            "save": saved - built, "bytes": size}
+
+
+def run_load_test(requests=100, concurrency=8, mode="full", service_type="openai", base_url=None,
+                  behavior=None, trace_memory=False):
+    """Run `requests` generations with `concurrency` in flight and return a summary dict"""
+    from utils.ai_service import AIService
+
+    server = None
+    if base_url is None:
+        server, base_url = start_stub_server(behavior)
+    # The stub accepts any key, but the clients refuse to start without one
+    os.environ.setdefault("OPENAI_API_KEY" if service_type == "openai" else "PERPLEXITY_API_KEY", "stub")
+
+    # One service shared by every simulated session, as in the app
+    ai = AIService(service_type=service_type, base_url=base_url)
+    timings = {"total": [], "ai": [], "build": [], "save": []}
+    errors = {}
+    output_bytes = []
+    lock = threading.Lock()
+
+    def one(index):
+        try:
+            result = _simulate(ai, mode, index)
+        except Exception as e:
+            with lock:
+                key = str(e)[:120]
+                errors[key] = errors.get(key, 0) + 1
+            return
+        with lock:
+            for stage in timings:
+                timings[stage].append(result[stage])
+            output_bytes.append(result["bytes"])
+
+    # Heap tracing is accurate but slows the pipeline down, so it is opt-in
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests)))
+    finally:
+        elapsed = time.perf_counter() - started
+        peak_traced = None
+        if trace_memory:
+            _, peak_traced = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak_rss *= 1024
+
+    completed = len(timings["total"])
+    return {
+        "mode": mode,
+        "service": service_type,
+        "requests": requests,
+        "concurrency": concurrency,
+        "completed": completed,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "generations_per_second": round(completed / elapsed, 3) if elapsed else None,
+        "latency": {
+            stage: {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": max(values)
+            }
+            for stage, values in timings.items() if values
+        },
+        "memory": {"peak_rss_bytes": peak_rss, "peak_python_heap_bytes": peak_traced},
+        "mean_output_bytes": round(sum(output_bytes) / len(output_bytes)) if output_bytes else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the generation pipeline against a stub AI server")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=MODES, default="full")
+    parser.add_argument("--service", choices=["openai", "perplexity"], default="openai")
+    parser.add_argument("--base-url", help="Use an already running stub instead of starting one")
+    parser.add_argument("--trace-memory", action="store_true", help="Also report the peak Python heap (slower)")
+    parser.add_argument("--output", help="Write the summary JSON to this file instead of stdout")
+    add_behavior_arguments(parser)
+    args = parser.parse_args(argv)
+
+    summary = run_load_test(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        mode=args.mode,
+        service_type=args.service,
+        base_url=args.base_url,
+        behavior=behavior_from_args(args),
+        trace_memory=args.trace_memory
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+    else:
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    return 0 if not summary["errors"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+
+class Metrics:
+    """Lightweight in-process registry of timings, counters and sizes"""
+
+    def __init__(self, max_events=10000, max_samples=1024):
+        self._lock = threading.Lock()
+        self.max_samples = max_samples
+        # Raw events for JSON lines export, oldest dropped first
+        self.events = deque(maxlen=max_events)
+        # (name, labels) -> {"count", "sum", "samples"}
+        self.summaries = {}
+        # (name, labels) -> value
+        self.counters = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name, value, **labels):
+        """Record one observation of a timing or size"""
+        key = self._key(name, labels)
+        with self._lock:
+            summary = self.summaries.get(key)
+            if summary is None:
+                summary = {"count": 0, "sum": 0.0, "samples": deque(maxlen=self.max_samples)}
+                self.summaries[key] = summary
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["samples"].append(value)
+            self.events.append({"ts": time.time(), "metric": name, "value": value, "labels": labels})
+
+    def increment(self, name, value=1, **labels):
+        """Add to a monotonically increasing counter"""
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            self.events.append({"ts": time.time(), "metric": name, "value": value, "labels": labels})
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time a block of code and record its wall time in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator form of timer()"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Return count, sum and p50/p95/p99 for every summary plus all counters"""
+        with self._lock:
+            summaries = {key: (s["count"], s["sum"], sorted(s["samples"])) for key, s in self.summaries.items()}
+            counters = dict(self.counters)
+
+        result = {"summaries": [], "counters": []}
+        for (name, labels), (count, total, samples) in sorted(summaries.items()):
+            result["summaries"].append({
+                "metric": name,
+                "labels": dict(labels),
+                "count": count,
+                "sum": total,
+                "p50": _quantile(samples, 0.5),
+                "p95": _quantile(samples, 0.95),
+                "p99": _quantile(samples, 0.99)
+            })
+        for (name, labels), value in sorted(counters.items()):
+            result["counters"].append({"metric": name, "labels": dict(labels), "value": value})
+        return result
+
+    def to_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+        for summary in snapshot["summaries"]:
+            name = summary["metric"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            labels = summary["labels"]
+            for quantile, field in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                lines.append(f"{name}{_format_labels(dict(labels, quantile=quantile))} {summary[field]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {summary['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {summary['count']}")
+        for counter in snapshot["counters"]:
+            name = counter["metric"]
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{_format_labels(counter['labels'])} {counter['value']}")
+        return "\n".join(lines) + "\n"
+
+    def to_json_lines(self):
+        """Render the raw event log as JSON lines"""
+        with self._lock:
+            events = list(self.events)
+        return "".join(json.dumps(event, default=str) + "\n" for event in events)
+
+    def reset(self):
+        """Forget every recorded metric"""
+        with self._lock:
+            self.events.clear()
+            self.summaries.clear()
+            self.counters.clear()
+
+
+def _quantile(samples, q):
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for key, value in sorted(labels.items())
+    )
+    return "{" + body + "}"
+
+
+@contextmanager
+def profile(sort="cumulative", limit=30):
+    """
+    Profile a single request with cProfile. Yields a dict whose "stats" entry
+    holds the formatted report once the block exits.
+    """
+    report = {"stats": ""}
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+        report["stats"] = output.getvalue()
+
+
+# Process-wide registry used by AIService and PPTGenerator
+metrics = Metrics()
@@ -0,0 +1,327 @@
+"""
+Rule-based resume content generation that needs no model and no network. The
+free-text form fields are split into the same JSON structure the model returns,
+and skills are sorted into technical, soft and domain with a keyword trie that
+is compiled once at import time. Used as the "offline" provider and as the
+fallback when a provider fails.
+"""
+import re
+from utils.resume_schema import DEFAULT_SECTIONS
+
+
+# Model name reported by the offline provider, part of incremental-generation hashes
+OFFLINE_MODEL = "rules-v1"
+
+SKILL_CATEGORIES = ("technical", "soft", "domain")
+
+# Keywords and phrases of each skill category, matched on whole words
+SKILL_KEYWORDS = {
+    "technical": (
+        "python", "java", "javascript", "typescript", "c", "c++", "c#", "go", "golang", "rust", "ruby", "php",
+        "kotlin", "swift", "scala", "r", "matlab", "sql", "nosql", "bash", "shell", "html", "css", "react",
+        "angular", "vue", "node", "node.js", "django", "flask", "fastapi", "spring", "rails", ".net", "aws",
+        "azure", "gcp", "google cloud", "docker", "kubernetes", "terraform", "ansible", "jenkins", "git",
+        "ci/cd", "linux", "unix", "postgresql", "postgres", "mysql", "mongodb", "redis", "kafka", "spark",
+        "hadoop", "airflow", "tableau", "power bi", "excel", "pandas", "numpy", "tensorflow", "pytorch",
+        "scikit-learn", "machine learning", "deep learning", "nlp", "computer vision", "data analysis",
+        "data engineering", "data science", "statistics", "microservices", "rest", "graphql", "api design",
+        "distributed systems", "cloud", "devops", "networking", "security", "cybersecurity", "testing",
+        "automation", "embedded", "android", "ios", "figma", "autocad", "solidworks", "salesforce", "sap",
+        "jira", "photoshop", "illustrator", "software development", "web development", "system design"
+    ),
+    "soft": (
+        "communication", "leadership", "teamwork", "collaboration", "problem solving", "problem-solving",
+        "critical thinking", "time management", "adaptability", "creativity", "mentoring", "coaching",
+        "negotiation", "presentation", "public speaking", "conflict resolution", "decision making",
+        "emotional intelligence", "empathy", "interpersonal", "organization", "attention to detail",
+        "stakeholder management", "team building", "people management", "customer service", "writing",
+        "active listening", "self-motivated", "work ethic", "strategic thinking", "influencing", "facilitation"
+    ),
+    "domain": (
+        "finance", "fintech", "banking", "accounting", "healthcare", "clinical", "pharmaceutical", "biotech",
+        "insurance", "retail", "e-commerce", "ecommerce", "logistics", "supply chain", "manufacturing",
+        "energy", "telecommunications", "education", "edtech", "real estate", "legal", "compliance",
+        "marketing", "digital marketing", "seo", "sales", "hospitality", "media", "gaming", "automotive",
+        "aerospace", "government", "public sector", "nonprofit", "consulting", "product management",
+        "project management", "agile", "scrum", "risk management", "operations", "human resources",
+        "recruiting", "saas", "b2b", "b2c", "research", "publishing", "regulatory affairs", "gdpr", "hipaa"
+    )
+}
+
+# Labels that introduce a list of skills, as in "Technical: Python, Java; Soft: Communication"
+CATEGORY_LABELS = {
+    "technical": "technical", "tech": "technical", "hard": "technical", "programming": "technical",
+    "languages": "technical", "tools": "technical", "frameworks": "technical", "technologies": "technical",
+    "platforms": "technical", "software": "technical",
+    "soft": "soft", "interpersonal": "soft", "personal": "soft", "people": "soft", "leadership": "soft",
+    "domain": "domain", "industry": "domain", "business": "domain", "functional": "domain",
+    "knowledge": "domain", "methodologies": "domain"
+}
+
+_END = ""
+
+WORD_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./-]*|[.#][a-z0-9+#]+", re.IGNORECASE)
+MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+DATE_RANGE_PATTERN = re.compile(
+    rf"(?:{MONTH}\s+)?(?:19|20)\d{{2}}\s*(?:-|–|—|to)\s*(?:present|current|now|today|(?:{MONTH}\s+)?(?:19|20)\d{{2}})",
+    re.IGNORECASE
+)
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+GPA_PATTERN = re.compile(r"\bGPA\s*:?\s*(\d(?:\.\d+)?(?:\s*/\s*\d(?:\.\d+)?)?)", re.IGNORECASE)
+BULLET_PATTERN = re.compile(r"^\s*(?:[•▪●–—*\-]|\d+[.)])\s*")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9])|\s*;\s*")
+ROLE_AT_PATTERN = re.compile(r"^(?P<title>.+?)\s+(?:at|@)\s+(?P<company>.+)$", re.IGNORECASE)
+HEADER_SEPARATOR_PATTERN = re.compile(r"\s*(?:,|\||\s[–—-]\s)\s*")
+
+LEADERSHIP_PATTERN = re.compile(
+    r"\b(?:lead|head|director|chief|vp|vice president|president|manager|principal|founder|partner|c[etfo]o)\b",
+    re.IGNORECASE
+)
+TEACHING_PATTERN = re.compile(
+    r"\b(?:teach\w*|lecturer|professor|instructor|tutor|teaching assistant|faculty)\b", re.IGNORECASE
+)
+BOARD_PATTERN = re.compile(r"\b(?:board|trustee|advisory|governor|committee chair)\b", re.IGNORECASE)
+PORTFOLIO_PATTERN = re.compile(r"\b(?:project|portfolio|built|launched|shipped|designed|created|developed)\b",
+                               re.IGNORECASE)
+PUBLICATION_PATTERN = re.compile(r"\b(?:published|journal|conference|proceedings|paper|book|article|patent)\b",
+                                 re.IGNORECASE)
+RESEARCH_PATTERN = re.compile(r"\bresearch", re.IGNORECASE)
+GRANT_PATTERN = re.compile(r"\b(?:grant|award|fellowship|prize|scholarship|funded|honou?r)\w*\b", re.IGNORECASE)
+
+MAX_POINTS = 5
+MAX_TAGLINE_CHARS = 100
+
+
+def _words(text):
+    return [word.lower().rstrip(".") or word.lower() for word in WORD_PATTERN.findall(text)]
+
+
+class KeywordTrie:
+    """Word-level trie mapping keyword phrases to a category, matched longest first"""
+
+    def __init__(self, keywords=None):
+        self.root = {}
+        for category, phrases in (keywords or {}).items():
+            for phrase in phrases:
+                self.add(phrase, category)
+
+    def add(self, phrase, category):
+        """Register a phrase; a later registration of the same phrase wins"""
+        node = self.root
+        for word in _words(phrase):
+            node = node.setdefault(word, {})
+        node[_END] = category
+
+    def longest_match(self, words, start):
+        """Return (category, length) of the longest phrase starting at words[start], or (None, 0)"""
+        node = self.root
+        match = (None, 0)
+        for index in range(start, len(words)):
+            node = node.get(words[index])
+            if node is None:
+                break
+            if _END in node:
+                match = (node[_END], index - start + 1)
+        return match
+
+    def categorize(self, text, default=None):
+        """Category of the longest phrase found anywhere in text, or default"""
+        words = _words(text)
+        best = (default, 0)
+        for start in range(len(words)):
+            category, length = self.longest_match(words, start)
+            if length > best[1]:
+                best = (category, length)
+        return best[0]
+
+
+# Compiled once and shared by every generation
+SKILL_TRIE = KeywordTrie(SKILL_KEYWORDS)
+
+
+def _lines(text):
+    """Non-empty lines of a free-text field, without bullets"""
+    if not isinstance(text, str):
+        return []
+    return [line for line in (BULLET_PATTERN.sub("", raw).strip() for raw in text.splitlines()) if line]
+
+
+def _sentences(text):
+    """Split text into sentences or semicolon-separated clauses"""
+    return [sentence.strip().rstrip(";") for sentence in SENTENCE_PATTERN.split(text) if sentence.strip()]
+
+
+def _category_label(label):
+    words = _words(label)
+    for word in words:
+        if word in CATEGORY_LABELS:
+            return CATEGORY_LABELS[word]
+    return None
+
+
+def categorize_skills(text):
+    """Split a skills field into {"technical", "soft", "domain"} lists, honoring "Label: a, b" groups"""
+    skills = {category: [] for category in SKILL_CATEGORIES}
+    seen = set()
+    for line in _lines(text):
+        for group in re.split(r"\s*;\s*", line):
+            label, colon, items = group.partition(":")
+            if not colon or len(label) > 40:
+                label, items = "", group
+            category = _category_label(label)
+            for skill in re.split(r"\s*[,|•]\s*(?![^()]*\))", items):
+                # Only trailing periods are punctuation; a leading one is part of names like .NET
+                skill = skill.strip().rstrip(".")
+                if not skill or skill.lower() in seen:
+                    continue
+                seen.add(skill.lower())
+                skills[category or SKILL_TRIE.categorize(skill, "technical")].append(skill)
+    return skills
+
+
+def _split_dates(text):
+    """Return (text without its date range or year, dates)"""
+    match = DATE_RANGE_PATTERN.search(text) or YEAR_PATTERN.search(text)
+    if match is None:
+        return text, ""
+    rest = (text[:match.start()] + text[match.end():]).strip()
+    return re.sub(r"\(\s*\)|\s{2,}", " ", rest).strip(" ,|–—-()"), match.group(0)
+
+
+def _job_header(line):
+    """Parse "Title, Company, Dates, Responsibilities" or "Title at Company (Dates)" into a job, or None"""
+    text, dates = _split_dates(line)
+    parts = [part for part in HEADER_SEPARATOR_PATTERN.split(text) if part.strip(" ()")]
+    role = ROLE_AT_PATTERN.match(parts[0]) if parts else None
+    if role and len(parts[0]) <= 100:
+        parts[:1] = [role.group("title"), role.group("company")]
+    if len(parts) < 2 and not dates:
+        return None
+    # A header is short; long comma-separated prose is a responsibility
+    if not dates and (len(parts[0]) > 60 or len(parts[1]) > 60):
+        return None
+    title = parts[0].strip(" ()")
+    company = parts[1].strip(" ()") if len(parts) > 1 else ""
+    responsibilities = _sentences(", ".join(parts[2:])) if len(parts) > 2 else []
+    return {"title": title, "company": company, "dates": dates, "responsibilities": responsibilities}
+
+
+def parse_experience(text, default_title=""):
+    """Split the experience field into jobs, with the lines under each header as its responsibilities"""
+    jobs = []
+    for line in _lines(text):
+        job = _job_header(line)
+        if job is not None:
+            jobs.append(job)
+        elif jobs:
+            jobs[-1]["responsibilities"].extend(_sentences(line))
+        else:
+            jobs.append({"title": default_title, "company": "", "dates": "", "responsibilities": _sentences(line)})
+    return jobs
+
+
+def parse_education(text):
+    """Split the education field into "Degree, Institution, Year, GPA/Achievements" entries"""
+    entries = []
+    for line in _lines(text):
+        gpa = GPA_PATTERN.search(line)
+        rest = GPA_PATTERN.sub("", line) if gpa else line
+        rest, year = _split_dates(rest)
+        parts = [part.strip(" ()") for part in HEADER_SEPARATOR_PATTERN.split(rest) if part.strip(" ()")]
+        if entries and len(parts) <= 1 and not year and not gpa:
+            # A line on its own under an entry is one of its achievements
+            entries[-1]["achievements"].extend(parts)
+            continue
+        entries.append({
+            "degree": parts[0] if parts else "",
+            "institution": parts[1] if len(parts) > 1 else "",
+            "year": year,
+            "gpa": gpa.group(1).replace(" ", "") if gpa else "",
+            "achievements": parts[2:]
+        })
+    return entries
+
+
+def parse_list(text):
+    """One item per line, splitting semicolon-separated lines"""
+    items = []
+    for line in _lines(text):
+        items.extend(item.strip() for item in line.split(";") if item.strip())
+    return items
+
+
+class ParsedInput:
+    """The form fields parsed once and shared by every section builder"""
+
+    def __init__(self, user_input):
+        self.name = str(user_input.get("name") or "").strip()
+        self.title = str(user_input.get("title") or "").strip()
+        self.summary = " ".join(_lines(user_input.get("summary")))
+        self.jobs = parse_experience(user_input.get("experience"), self.title)
+        self.education = parse_education(user_input.get("education"))
+        self.skills = categorize_skills(user_input.get("skills"))
+        self.achievements = parse_list(user_input.get("achievements"))
+        contact = user_input.get("contact") or {}
+        self.contact = {key: str(value).strip() for key, value in contact.items() if value and str(value).strip()}
+
+    def summary_points(self):
+        """Summary sentences, or a line built from the title and experience when there is no summary"""
+        points = _sentences(self.summary)[:MAX_POINTS]
+        if points:
+            return points
+        companies = [job["company"] for job in self.jobs if job["company"]]
+        if self.title and companies:
+            return [f"{self.title} with experience at {', '.join(companies[:3])}"]
+        return [self.title] if self.title else []
+
+
+def _matching(pattern, items):
+    return [item for item in items if pattern.search(item)]
+
+
+def _points(items):
+    return {"points": items}
+
+
+# Section -> builder from ParsedInput to the section's JSON value
+OFFLINE_BUILDERS = {
+    "title_slide": lambda parsed: {
+        "name": parsed.name,
+        "title": parsed.title,
+        "tagline": next(iter(_sentences(parsed.summary)), "")[:MAX_TAGLINE_CHARS]
+    },
+    "about_me": lambda parsed: _points(parsed.summary_points()),
+    "work_experience": lambda parsed: parsed.jobs,
+    "education": lambda parsed: parsed.education,
+    "skills": lambda parsed: parsed.skills,
+    "achievements": lambda parsed: parsed.achievements,
+    "contact": lambda parsed: parsed.contact,
+    "executive_summary": lambda parsed: _points(parsed.summary_points()),
+    "leadership_experience": lambda parsed: [
+        job for job in parsed.jobs if LEADERSHIP_PATTERN.search(job["title"])
+    ] or parsed.jobs,
+    "key_achievements": lambda parsed: parsed.achievements,
+    "board_positions": lambda parsed: _matching(
+        BOARD_PATTERN, parsed.achievements + [f"{job['title']}, {job['company']}" for job in parsed.jobs]
+    ),
+    "portfolio_highlights": lambda parsed: _matching(PORTFOLIO_PATTERN, parsed.achievements),
+    "research_interests": lambda parsed: _points(
+        _matching(RESEARCH_PATTERN, _sentences(parsed.summary))
+        or parsed.skills["domain"][:MAX_POINTS] or parsed.summary_points()
+    ),
+    "publications": lambda parsed: _matching(PUBLICATION_PATTERN, parsed.achievements),
+    "teaching_experience": lambda parsed: [
+        job for job in parsed.jobs if TEACHING_PATTERN.search(f"{job['title']} {job['company']}")
+    ],
+    "grants_awards": lambda parsed: _matching(GRANT_PATTERN, parsed.achievements)
+}
+
+
+def generate_offline(user_input, sections=None):
+    """Build resume content for the given sections (default: the standard deck) from the form fields alone"""
+    parsed = ParsedInput(user_input)
+    return {
+        section: OFFLINE_BUILDERS[section](parsed)
+        for section in (DEFAULT_SECTIONS if sections is None else sections)
+        if section in OFFLINE_BUILDERS
+    }
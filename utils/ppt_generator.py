@@ -1,45 +1,52 @@
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
+from pptx.util import Pt
 from pptx.dml.color import RGBColor
+from pptx.enum.text import MSO_AUTO_SIZE
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from utils.color_schemes import COLOR_SCHEMES as SCHEME_HEX_COLORS
+from utils.metrics import metrics
+from utils.resume_ir import Resume, parse_section
+from utils.resume_schema import DEFAULT_SECTIONS
+from utils.slide_plan import SECTION_RENDERERS
+from utils.slide_masters import BODY_STYLES, apply_theme, load_themed_presentation
+from utils.stream_parser import ITEM_SECTIONS
+from utils.text_layout import emu_to_points, paginate
+import io
 import os
 
+# Order in which sections appear when no slide plan is given
+SECTION_ORDER = DEFAULT_SECTIONS
+
+# Body font size in points for each paragraph level
+BODY_SIZES = {level - 1: style[0] for level, style in BODY_STYLES.items()}
+
+# Colors of each scheme by role, as python-pptx colors
+COLOR_SCHEMES = {
+    name: {role: RGBColor.from_string(value) for role, value in scheme.items()}
+    for name, scheme in SCHEME_HEX_COLORS.items()
+}
+
 class PPTGenerator:
     def __init__(self):
-        self.prs = Presentation()
-        # Set default slide size to 16:9 (widescreen)
-        self.prs.slide_width = Inches(13.33)
-        self.prs.slide_height = Inches(7.5)
-        
-        # Color schemes
-        self.color_schemes = {
-            "professional": {
-                "primary": RGBColor(0, 85, 140),    # Deep Blue
-                "secondary": RGBColor(225, 225, 225),  # Light Grey
-                "accent": RGBColor(0, 164, 239),    # Bright Blue
-                "text": RGBColor(51, 51, 51)        # Dark Grey
-            },
-            "modern": {
-                "primary": RGBColor(52, 73, 94),    # Dark Slate
-                "secondary": RGBColor(236, 240, 241),  # Cloud
-                "accent": RGBColor(26, 188, 156),   # Turquoise
-                "text": RGBColor(44, 62, 80)        # Midnight Blue
-            },
-            "creative": {
-                "primary": RGBColor(155, 89, 182),  # Purple
-                "secondary": RGBColor(250, 250, 250),  # White Smoke
-                "accent": RGBColor(241, 196, 15),   # Yellow
-                "text": RGBColor(52, 73, 94)        # Dark Slate
-            }
-        }
+        self.color_schemes = COLOR_SCHEMES
         
         # Default color scheme
         self.current_scheme = self.color_schemes["professional"]
+        
+        # Presentation cloned from the cached, pre-styled slide master for the scheme
+        self.prs = load_themed_presentation("professional", self.current_scheme)
+        
+        # Slides created for each section, in creation order
+        self.section_slides = {}
     
     def set_color_scheme(self, scheme_name):
         """Set the color scheme for the presentation"""
         if scheme_name in self.color_schemes:
             self.current_scheme = self.color_schemes[scheme_name]
+            if len(self.prs.slides) == 0:
+                self.prs = load_themed_presentation(scheme_name, self.current_scheme)
+            else:
+                # Restyle the master in place so existing slides follow the new scheme
+                apply_theme(self.prs, self.current_scheme)
             return True
         return False
     
@@ -48,37 +55,17 @@ class PPTGenerator:
         slide_layout = self.prs.slide_layouts[0]  # Title slide layout
         slide = self.prs.slides.add_slide(slide_layout)
         
-        # Set background color
-        background = slide.background
-        fill = background.fill
-        fill.solid()
-        fill.fore_color.rgb = self.current_scheme["secondary"]
-        
-        # Add title (name)
-        title_shape = slide.shapes.title
-        title_shape.text = name
-        title_para = title_shape.text_frame.paragraphs[0]
-        title_para.alignment = PP_ALIGN.CENTER
-        title_run = title_para.runs[0]
-        title_run.font.size = Pt(54)
-        title_run.font.color.rgb = self.current_scheme["primary"]
-        title_run.font.bold = True
+        # Background, fonts and alignment are inherited from the themed layout
+        slide.shapes.title.text = name
         
         # Add subtitle (professional title)
         subtitle = slide.placeholders[1]
         subtitle.text = title
-        subtitle_para = subtitle.text_frame.paragraphs[0]
-        subtitle_para.alignment = PP_ALIGN.CENTER
-        subtitle_run = subtitle_para.runs[0]
-        subtitle_run.font.size = Pt(32)
-        subtitle_run.font.color.rgb = self.current_scheme["text"]
         
         # Add tagline if provided
         if tagline:
             subtitle.text += f"\n\n{tagline}"
-            tagline_para = subtitle.text_frame.paragraphs[2]
-            tagline_para.alignment = PP_ALIGN.CENTER
-            tagline_run = tagline_para.runs[0]
+            tagline_run = subtitle.text_frame.paragraphs[2].runs[0]
             tagline_run.font.size = Pt(24)
             tagline_run.font.color.rgb = self.current_scheme["accent"]
             tagline_run.font.italic = True
@@ -87,180 +74,212 @@ class PPTGenerator:
     
     def create_content_slide(self, title, bullet_points=None, layout_type="bullet"):
         """Create a content slide with title and bullet points"""
+        # Add content based on layout type
+        if layout_type == "bullet" and bullet_points:
+            # Long lists are shrunk to fit or continued on further slides
+            slides = self._create_paginated_slides(title, [(point, 0) for point in bullet_points])
+            return slides[0]
+        
         slide_layout = self.prs.slide_layouts[1]  # Content slide layout
         slide = self.prs.slides.add_slide(slide_layout)
+        slide.shapes.title.text = title
+        return slide
+    
+    def _body_box(self):
+        """Width and height in points of the content layout's body placeholder"""
+        body = self.prs.slide_layouts[1].placeholders.get(idx=1)
+        return emu_to_points(body.width), emu_to_points(body.height)
+    
+    def _create_paginated_slides(self, title, paragraphs, style_paragraph=None):
+        """Add content slides for (text, level) paragraphs, continuing onto "(cont.)" slides on overflow"""
+        width, height = self._body_box()
+        pages, scale = paginate(paragraphs, width, height, BODY_SIZES)
         
-        # Set background color
-        background = slide.background
-        fill = background.fill
-        fill.solid()
-        fill.fore_color.rgb = self.current_scheme["secondary"]
-        
-        # Add title
-        title_shape = slide.shapes.title
-        title_shape.text = title
-        title_para = title_shape.text_frame.paragraphs[0]
-        title_para.alignment = PP_ALIGN.LEFT
-        title_run = title_para.runs[0]
-        title_run.font.size = Pt(40)
-        title_run.font.color.rgb = self.current_scheme["primary"]
-        title_run.font.bold = True
-        
-        # Add content based on layout type
-        if layout_type == "bullet" and bullet_points:
-            content = slide.placeholders[1]
-            text_frame = content.text_frame
+        slides = []
+        for number, page in enumerate(pages):
+            slide = self.prs.slides.add_slide(self.prs.slide_layouts[1])
+            slide.shapes.title.text = title if number == 0 else f"{title} (cont.)"
+            
+            text_frame = slide.placeholders[1].text_frame
             text_frame.clear()  # Clear existing text
+            for index, (text, level) in enumerate(page):
+                p = text_frame.paragraphs[0] if index == 0 else text_frame.add_paragraph()
+                p.text = text
+                p.level = level
+                if style_paragraph is not None:
+                    style_paragraph(p, text, level)
             
-            for point in bullet_points:
-                p = text_frame.add_paragraph()
-                p.text = point
-                p.level = 0
-                p.alignment = PP_ALIGN.LEFT
-                run = p.runs[0]
-                run.font.size = Pt(24)
-                run.font.color.rgb = self.current_scheme["text"]
-        
-        return slide
+            if scale < 1:
+                text_frame.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
+                text_frame._bodyPr.normAutofit.fontScale = scale * 100
+            slides.append(slide)
+        return slides
     
-    def create_experience_slide(self, experiences):
+    def create_experience_slide(self, experiences, label="Experience"):
         """Create a slide with work experience details"""
         for exp in experiences:
-            title = f"Experience: {exp.get('title')} at {exp.get('company')}"
-            bullets = [
-                f"{exp.get('dates', 'N/A')}",
-                *exp.get('responsibilities', [])
-            ]
-            self.create_content_slide(title, bullets)
+            bullets = [exp.dates or "N/A", *exp.responsibilities]
+            self.create_content_slide(exp.heading(label), bullets)
     
-    def create_education_slide(self, education_items):
+    def create_education_slide(self, education_items, title="Education"):
         """Create a slide with education details"""
-        title = "Education"
         bullets = []
         
         for edu in education_items:
-            bullet = f"{edu.get('degree')} - {edu.get('institution')}, {edu.get('year')}"
-            if edu.get('gpa'):
-                bullet += f" (GPA: {edu.get('gpa')})"
-            bullets.append(bullet)
+            bullets.append(edu.summary)
             
             # Add any achievements as sub-bullets
-            if edu.get('achievements'):
-                for achievement in edu.get('achievements'):
+            if edu.achievements:
+                for achievement in edu.achievements:
                     bullets.append(f"  â€¢ {achievement}")
         
         self.create_content_slide(title, bullets)
     
-    def create_skills_slide(self, skills):
+    def create_skills_slide(self, skills, title="Skills & Expertise"):
         """Create a slide with categorized skills"""
-        title = "Skills & Expertise"
-        
-        # Create a custom slide to display categorized skills
-        slide_layout = self.prs.slide_layouts[1]
-        slide = self.prs.slides.add_slide(slide_layout)
-        
-        # Set background color
-        background = slide.background
-        fill = background.fill
-        fill.solid()
-        fill.fore_color.rgb = self.current_scheme["secondary"]
         
-        # Add title
-        title_shape = slide.shapes.title
-        title_shape.text = title
-        title_para = title_shape.text_frame.paragraphs[0]
-        title_para.alignment = PP_ALIGN.LEFT
-        title_run = title_para.runs[0]
-        title_run.font.size = Pt(40)
-        title_run.font.color.rgb = self.current_scheme["primary"]
-        title_run.font.bold = True
+        # Category headings at level 0, skills at level 1 with a spacer after each category
+        paragraphs = []
+        for category, category_skills in skills.categories():
+            paragraphs.append((f"{category.capitalize()} Skills:", 0))
+            paragraphs.extend((f"â€¢ {skill}", 1) for skill in category_skills)
+            paragraphs.append(("", 0))
         
-        # Add content
-        content = slide.placeholders[1]
-        text_frame = content.text_frame
-        text_frame.clear()
-        
-        # Add each skill category
-        categories = ["technical", "soft", "domain"]
-        for category in categories:
-            if category in skills and skills[category]:
-                p = text_frame.add_paragraph()
-                p.text = f"{category.capitalize()} Skills:"
-                p.alignment = PP_ALIGN.LEFT
+        def style_heading(p, text, level):
+            # Size and color of skills come from the level 2 body style
+            if level == 0 and text:
                 run = p.runs[0]
-                run.font.size = Pt(24)
                 run.font.color.rgb = self.current_scheme["accent"]
                 run.font.bold = True
-                
-                # Add skills in this category
-                for skill in skills[category]:
-                    p = text_frame.add_paragraph()
-                    p.text = f"â€¢ {skill}"
-                    p.level = 1
-                    p.alignment = PP_ALIGN.LEFT
-                    run = p.runs[0]
-                    run.font.size = Pt(20)
-                    run.font.color.rgb = self.current_scheme["text"]
-                
-                # Add empty paragraph as spacer
-                text_frame.add_paragraph()
         
-        return slide
+        if not paragraphs:
+            return self.create_content_slide(title)
+        return self._create_paginated_slides(title, paragraphs, style_heading)[0]
     
-    def create_contact_slide(self, contact_info):
+    def create_contact_slide(self, contact_info, title="Contact Information"):
         """Create a contact information slide"""
-        title = "Contact Information"
         bullets = [
-            f"Email: {contact_info.get('email', 'N/A')}",
-            f"Phone: {contact_info.get('phone', 'N/A')}",
-            f"LinkedIn: {contact_info.get('linkedin', 'N/A')}",
-            f"Portfolio: {contact_info.get('portfolio', 'N/A')}"
+            f"Email: {contact_info.email or 'N/A'}",
+            f"Phone: {contact_info.phone or 'N/A'}",
+            f"LinkedIn: {contact_info.linkedin or 'N/A'}",
+            f"Portfolio: {contact_info.portfolio or 'N/A'}"
         ]
         
         self.create_content_slide(title, bullets)
     
-    def generate_from_ai_content(self, ai_content, color_scheme="professional"):
-        """Generate a complete PowerPoint from AI-generated content"""
-        # Set color scheme
-        self.set_color_scheme(color_scheme)
-        
-        # Create title slide
-        title_data = ai_content.get("title_slide", {})
-        self.create_title_slide(
-            title_data.get("name", ""),
-            title_data.get("title", ""),
-            title_data.get("tagline", "")
-        )
-        
-        # Create About Me slide
-        about_data = ai_content.get("about_me", {})
-        self.create_content_slide(
-            "About Me",
-            about_data.get("points", [])
-        )
-        
-        # Create Experience slides
-        experiences = ai_content.get("work_experience", [])
-        self.create_experience_slide(experiences)
+    def build_section(self, section, data):
+        """Build the slides for one top-level section of the AI content"""
+        start = len(self.prs.slides)
+        with metrics.timer("ppt_build_seconds", section=section):
+            self._build_section_slides(section, data)
         
-        # Create Education slide
-        education = ai_content.get("education", [])
-        self.create_education_slide(education)
+        # Remember which slides belong to the section so they can be reordered
+        slides = list(self.prs.slides)[start:]
+        self.section_slides.setdefault(section, []).extend(slides)
+        metrics.increment("ppt_slides_total", len(slides), section=section)
+        return slides
+    
+    def _build_section_slides(self, section, data):
+        """Normalize a section into its typed form and render it with its registered slide kind"""
+        renderer = SECTION_RENDERERS.get(section)
+        if renderer is None:
+            return
+        data = parse_section(section, data)
+        kind = renderer.kind
+        if kind == "title":
+            self.create_title_slide(data.name, data.title, data.tagline)
+        elif kind == "points":
+            if data.points:
+                self.create_content_slide(renderer.title, list(data.points))
+        elif kind == "jobs":
+            self.create_experience_slide(data, renderer.title)
+        elif kind == "education":
+            if data:
+                self.create_education_slide(data, renderer.title)
+        elif kind == "skills":
+            self.create_skills_slide(data, renderer.title)
+        elif kind == "list":
+            if data:
+                self.create_content_slide(renderer.title, list(data))
+        elif kind == "contact":
+            self.create_contact_slide(data, renderer.title)
+    
+    def add_stream_event(self, event):
+        """Build slides for a SectionEvent from AIService.stream_resume_content"""
+        if event.kind == "item":
+            return self.build_section(event.section, [event.value])
+        if event.kind == "replace":
+            return self.replace_section(event.section, event.value)
+        if event.kind == "section" and event.section not in ITEM_SECTIONS:
+            return self.build_section(event.section, event.value)
+        return []
+    
+    def reorder_sections(self, order=SECTION_ORDER):
+        """Move each section's slides into the given section order"""
+        sld_id_lst = self.prs.slides._sldIdLst
+        sld_ids = {sld_id.rId: sld_id for sld_id in sld_id_lst}
         
-        # Create Skills slide
-        skills = ai_content.get("skills", {})
-        self.create_skills_slide(skills)
+        ordered = []
+        for section in order:
+            for slide in self.section_slides.get(section, []):
+                ordered.append(sld_ids.pop(self.prs.part.relate_to(slide.part, RT.SLIDE)))
+        # Slides outside the known sections keep their place at the end
+        ordered.extend(sld_ids.values())
         
-        # Create Achievements slide
-        achievements = ai_content.get("achievements", [])
-        if achievements:
-            self.create_content_slide("Achievements & Certifications", achievements)
+        for sld_id in ordered:
+            sld_id_lst.remove(sld_id)
+            sld_id_lst.append(sld_id)
+    
+    def remove_section(self, section):
+        """Delete every slide that was built for a section"""
+        sld_id_lst = self.prs.slides._sldIdLst
+        for slide in self.section_slides.pop(section, []):
+            rId = self.prs.part.relate_to(slide.part, RT.SLIDE)
+            for sld_id in list(sld_id_lst):
+                if sld_id.rId == rId:
+                    sld_id_lst.remove(sld_id)
+            self.prs.part.drop_rel(rId)
         
-        # Create Contact slide
-        contact = ai_content.get("contact", {})
-        self.create_contact_slide(contact)
+        # Renumber the remaining slide parts so new slides cannot reuse a partname
+        self.prs.part.rename_slide_parts([sld_id.rId for sld_id in sld_id_lst])
+    
+    def replace_section(self, section, data, order=SECTION_ORDER):
+        """Rebuild one section's slides in place, leaving every other slide untouched"""
+        self.remove_section(section)
+        slides = self.build_section(section, data)
+        self.reorder_sections(order)
+        return slides
+    
+    def generate_from_ai_content(self, ai_content, color_scheme="professional", sections=SECTION_ORDER):
+        """Generate a complete PowerPoint from AI-generated content (a dict or a parsed Resume)"""
+        with metrics.timer("ppt_generate_seconds"):
+            # Set color scheme
+            self.set_color_scheme(color_scheme)
+            
+            # Create the slides section by section in the slide plan's order
+            for section in sections:
+                if isinstance(ai_content, Resume):
+                    self.build_section(section, getattr(ai_content, section, None))
+                else:
+                    self.build_section(section, ai_content.get(section))
     
     def save(self, filename="resume_presentation.pptx"):
         """Save the presentation to file"""
-        self.prs.save(filename)
-        return filename
\ No newline at end of file
+        with metrics.timer("ppt_save_seconds"):
+            self.prs.save(filename)
+        if isinstance(filename, (str, os.PathLike)):
+            metrics.observe("ppt_output_bytes", os.path.getsize(filename))
+        return filename
+    
+    def save_to(self, stream):
+        """Write the presentation into any writable binary stream"""
+        start = stream.tell() if stream.seekable() else None
+        with metrics.timer("ppt_save_seconds"):
+            self.prs.save(stream)
+        if start is not None:
+            metrics.observe("ppt_output_bytes", stream.tell() - start)
+        return stream
+    
+    def to_bytes(self):
+        """Return the presentation as .pptx bytes without touching the disk"""
+        return self.save_to(io.BytesIO()).getvalue()
\ No newline at end of file
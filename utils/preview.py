@@ -0,0 +1,213 @@
+"""
+Pure-Python slide thumbnails: draws the solid backgrounds, title and body text
+and bullets that PPTGenerator emits to PNG with Pillow, without LibreOffice.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from lxml import etree
+from PIL import Image, ImageDraw, ImageFont
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.oxml.ns import qn
+from utils.slide_masters import BODY_STYLES, TITLE_SLIDE_SUBTITLE_STYLE, TITLE_SLIDE_TITLE_STYLE, TITLE_STYLE
+from utils.text_layout import EMU_PER_POINT, INSET_X, INSET_Y, LEVEL_MARGINS, LINE_SPACING, PARAGRAPH_SPACING
+
+
+DEFAULT_WIDTH = 480
+MAX_CACHED_THUMBNAILS = 512
+
+# Bullet characters of the master body style levels
+BULLETS = {0: "•", 1: "–"}
+
+# Placeholder type -> (text style, draws bullets, vertically centered)
+PLACEHOLDER_STYLES = {
+    PP_PLACEHOLDER.CENTER_TITLE: (TITLE_SLIDE_TITLE_STYLE, False, True),
+    PP_PLACEHOLDER.SUBTITLE: (TITLE_SLIDE_SUBTITLE_STYLE, False, False),
+    PP_PLACEHOLDER.TITLE: (TITLE_STYLE, False, True)
+}
+
+# Carlito is metric-compatible with Calibri, the theme font; DejaVu Sans is the common fallback
+FONT_FILES = {
+    (False, False): ("Carlito-Regular.ttf", "DejaVuSans.ttf"),
+    (True, False): ("Carlito-Bold.ttf", "DejaVuSans-Bold.ttf"),
+    (False, True): ("Carlito-Italic.ttf", "DejaVuSans-Oblique.ttf"),
+    (True, True): ("Carlito-BoldItalic.ttf", "DejaVuSans-BoldOblique.ttf")
+}
+
+# PNG bytes keyed by slide content hash, color scheme and width
+_thumbnail_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _font(size, bold=False, italic=False):
+    """Load a scalable font, falling back to Pillow's built-in one"""
+    for filename in FONT_FILES[(bool(bold), bool(italic))]:
+        try:
+            return ImageFont.truetype(filename, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=65536)
+def _word_width(word, size, bold=False, italic=False):
+    return _font(size, bold, italic).getlength(word)
+
+
+def _scheme_key(scheme):
+    return tuple(sorted((role, str(color)) for role, color in scheme.items()))
+
+
+def theme_colors(prs):
+    """Read the background, title and body colors that apply_theme wrote to the slide master"""
+    master = prs.slide_master._element
+    tx_styles = master.find(qn("p:txStyles"))
+
+    def color(parent, path):
+        element = parent.find(path) if parent is not None else None
+        return element.get("val") if element is not None else "000000"
+
+    return {
+        "secondary": color(master.cSld, f"{qn('p:bg')}/{qn('p:bgPr')}/{qn('a:solidFill')}/{qn('a:srgbClr')}"),
+        "primary": color(tx_styles.find(qn("p:titleStyle")), f".//{qn('a:defRPr')}/{qn('a:solidFill')}/{qn('a:srgbClr')}"),
+        "text": color(tx_styles.find(qn("p:bodyStyle")), f".//{qn('a:defRPr')}/{qn('a:solidFill')}/{qn('a:srgbClr')}")
+    }
+
+
+def slide_hash(slide):
+    """Hash of a slide's XML, which changes whenever its content or run styling does"""
+    return hashlib.sha256(etree.tostring(slide._element)).hexdigest()
+
+
+def _wrap(text, width, size, bold, italic):
+    """Greedy word wrap into lines no wider than width pixels"""
+    lines, current, current_width = [], [], 0.0
+    space = _word_width(" ", size, bold, italic)
+    for word in text.split():
+        word_width = _word_width(word, size, bold, italic)
+        if current and current_width + space + word_width > width:
+            lines.append(" ".join(current))
+            current, current_width = [], 0.0
+        current_width += (space if current else 0) + word_width
+        current.append(word)
+    if current:
+        lines.append(" ".join(current))
+    return lines or [""]
+
+
+def _paragraph_format(paragraph, style, scheme, px_per_point, font_scale):
+    """Resolve size, color, bold and italic from the first run, falling back to the inherited style"""
+    size, color_role, bold, _ = style
+    color = scheme[color_role]
+    italic = False
+    # Read run properties from the XML; the python-pptx font proxy would add an empty rPr
+    r_pr = paragraph.runs[0]._r.rPr if paragraph.runs else None
+    if r_pr is not None:
+        if r_pr.get("sz"):
+            size = int(r_pr.get("sz")) / 100
+        if r_pr.get("b") is not None:
+            bold = r_pr.get("b") in ("1", "true")
+        if r_pr.get("i") is not None:
+            italic = r_pr.get("i") in ("1", "true")
+        rgb = r_pr.find(f"{qn('a:solidFill')}/{qn('a:srgbClr')}")
+        if rgb is not None:
+            color = rgb.get("val")
+    pixels = max(1, round(size * font_scale * px_per_point))
+    return pixels, "#" + str(color), bool(bold), bool(italic)
+
+
+def _draw_text_frame(draw, shape, scheme, px_per_emu):
+    """Draw one placeholder's paragraphs inside its bounds"""
+    placeholder_type = shape.placeholder_format.type
+    style, bullets, centered = PLACEHOLDER_STYLES.get(placeholder_type, (None, True, False))
+    px_per_point = px_per_emu * EMU_PER_POINT
+
+    left = shape.left * px_per_emu + INSET_X * px_per_point
+    top = shape.top * px_per_emu + INSET_Y * px_per_point
+    width = shape.width * px_per_emu - 2 * INSET_X * px_per_point
+    height = shape.height * px_per_emu - 2 * INSET_Y * px_per_point
+
+    text_frame = shape.text_frame
+    autofit = text_frame._bodyPr.find(qn("a:normAutofit"))
+    font_scale = 1.0
+    if autofit is not None and autofit.get("fontScale"):
+        font_scale = int(autofit.get("fontScale")) / 100000
+
+    # Lay out every line first so centered frames can be positioned vertically
+    lines = []
+    for paragraph in text_frame.paragraphs:
+        # paragraph.level would add an empty pPr and change the slide hash
+        p_pr = paragraph._p.pPr
+        level = int(p_pr.get("lvl", 0)) if p_pr is not None else 0
+        level_style = style or BODY_STYLES.get(level + 1, BODY_STYLES[1])
+        size, color, bold, italic = _paragraph_format(paragraph, level_style, scheme, px_per_point, font_scale)
+        align = level_style[3]
+        margin = LEVEL_MARGINS.get(level, LEVEL_MARGINS[0]) * px_per_point if bullets else 0
+        spacing = size * PARAGRAPH_SPACING if bullets else 0
+        text = "".join(run.text for run in paragraph.runs)
+        bullet = BULLETS.get(level, BULLETS[0]) if bullets and text.strip() else None
+        for index, line in enumerate(_wrap(text, width - margin, size, bold, italic)):
+            lines.append((line, size, color, bold, italic, align, margin, spacing if index == 0 else 0,
+                          bullet if index == 0 else None))
+
+    total = sum(size * LINE_SPACING + spacing for _, size, _, _, _, _, _, spacing, _ in lines)
+    y = top + max(0.0, (height - total) / 2) if centered else top
+    for line, size, color, bold, italic, align, margin, spacing, bullet in lines:
+        y += spacing
+        font = _font(size, bold, italic)
+        if bullet:
+            draw.text((left + margin - size, y), bullet, fill=color, font=font)
+        x = left + margin
+        if align == "ctr":
+            x = left + (width - _word_width(line, size, bold, italic)) / 2
+        draw.text((x, y), line, fill=color, font=font)
+        y += size * LINE_SPACING
+
+
+def _render(slide, scheme, slide_width, slide_height, width):
+    """Rasterize one slide to PNG bytes"""
+    px_per_emu = width / slide_width
+    height = max(1, round(slide_height * px_per_emu))
+    image = Image.new("RGB", (width, height), "#" + str(scheme["secondary"]))
+    draw = ImageDraw.Draw(image)
+
+    for shape in slide.placeholders:
+        if shape.has_text_frame and shape.text_frame.text.strip():
+            _draw_text_frame(draw, shape, scheme, px_per_emu)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=False)
+    return buffer.getvalue()
+
+
+def render_thumbnail(prs, index, scheme=None, width=DEFAULT_WIDTH):
+    """
+    PNG thumbnail of one slide, rendered on first request and cached by content
+    and scheme. The scheme defaults to the colors defined on the deck's master.
+    """
+    scheme = scheme or theme_colors(prs)
+    slide = prs.slides[index]
+    key = (slide_hash(slide), _scheme_key(scheme), width, prs.slide_width, prs.slide_height)
+    with _cache_lock:
+        png = _thumbnail_cache.get(key)
+        if png is not None:
+            _thumbnail_cache.move_to_end(key)
+            return png
+
+    png = _render(slide, scheme, prs.slide_width, prs.slide_height, width)
+    with _cache_lock:
+        _thumbnail_cache[key] = png
+        while len(_thumbnail_cache) > MAX_CACHED_THUMBNAILS:
+            _thumbnail_cache.popitem(last=False)
+    return png
+
+
+def render_thumbnails(prs, scheme=None, start=0, count=None, width=DEFAULT_WIDTH):
+    """Lazily yield PNG thumbnails for a range of slides"""
+    scheme = scheme or theme_colors(prs)
+    stop = len(prs.slides) if count is None else min(len(prs.slides), start + count)
+    for index in range(start, stop):
+        yield render_thumbnail(prs, index, scheme, width)
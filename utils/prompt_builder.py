@@ -0,0 +1,163 @@
+"""
+Compact, token-budgeted prompts. The schema instructions for every section live
+in a fixed system prefix shared by every request and template so provider-side
+prompt caching can apply; the user message names the sections the slide plan
+renders and carries the resume input, with empty fields dropped and oversized
+free-text fields truncated to the budget.
+"""
+import json
+import math
+import os
+import re
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # optional exact tokenizer
+    tiktoken = None
+
+from utils.resume_schema import DEFAULT_SECTIONS, SECTION_EXAMPLES
+
+
+# Input token budget unless AI_MAX_INPUT_TOKENS is set
+DEFAULT_MAX_INPUT_TOKENS = 3000
+
+# Rough characters per token for English text when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+# Completion tokens assumed for a request before its real usage is known, for tokens-per-minute
+# limits, unless AI_EXPECTED_COMPLETION_TOKENS is set
+DEFAULT_EXPECTED_COMPLETION_TOKENS = 1000
+
+# Free-text fields that are shortened first when the input is over budget
+TRUNCATABLE_FIELDS = ("experience", "summary", "skills", "education", "achievements")
+TRUNCATION_MARKER = " [truncated]"
+
+SYSTEM_PROMPT = (
+    "You are an expert resume writer creating PowerPoint content. "
+    "Turn the resume information in the user message into a professional presentation. "
+    "Return ONLY valid JSON whose top-level fields are exactly the sections listed in the user message, "
+    "each shaped like its example here (name and title are REQUIRED, fields marked Optional may be omitted):\n"
+    + json.dumps(SECTION_EXAMPLES, separators=(",", ":"), ensure_ascii=False)
+)
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def estimate_tokens(text):
+    """Count tokens with tiktoken when installed, otherwise estimate from the length"""
+    if tiktoken is not None:
+        return len(_get_encoding().encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@lru_cache(maxsize=1)
+def _system_prompt_tokens():
+    return estimate_tokens(SYSTEM_PROMPT)
+
+
+def input_token_budget():
+    """Input token budget from AI_MAX_INPUT_TOKENS, read on use so values from .env apply"""
+    return int(os.getenv("AI_MAX_INPUT_TOKENS") or DEFAULT_MAX_INPUT_TOKENS)
+
+
+def expected_completion_tokens():
+    """Assumed completion size from AI_EXPECTED_COMPLETION_TOKENS, read on use so values from .env apply"""
+    return int(os.getenv("AI_EXPECTED_COMPLETION_TOKENS") or DEFAULT_EXPECTED_COMPLETION_TOKENS)
+
+
+def request_token_estimate(prompt):
+    """Total tokens a request is expected to use: system prompt, user message and completion"""
+    return _system_prompt_tokens() + estimate_tokens(prompt) + expected_completion_tokens()
+
+
+def _clean_text(text):
+    """Trim each line, collapse runs of spaces and blank lines"""
+    lines = [re.sub(r"[ \t]+", " ", line).strip() for line in text.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def compact_input(value):
+    """Drop empty strings, lists and objects recursively and normalize whitespace"""
+    if isinstance(value, str):
+        return _clean_text(value)
+    if isinstance(value, dict):
+        compacted = {key: compact_input(item) for key, item in value.items()}
+        return {key: item for key, item in compacted.items() if item not in ("", None, [], {})}
+    if isinstance(value, list):
+        return [item for item in (compact_input(item) for item in value) if item not in ("", None, [], {})]
+    return value
+
+
+def _serialize(user_input):
+    return json.dumps(user_input, separators=(",", ":"), ensure_ascii=False)
+
+
+def truncate_text(text, max_tokens):
+    """Cut text to about max_tokens, preferring a line or word boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if tiktoken is not None:
+        cut = _get_encoding().decode(_get_encoding().encode(text)[:max_tokens])
+    else:
+        cut = text[:max_tokens * CHARS_PER_TOKEN]
+
+    boundary = cut.rfind("\n")
+    if boundary < len(cut) // 2:
+        boundary = cut.rfind(" ")
+    if boundary >= len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip() + TRUNCATION_MARKER
+
+
+def fit_to_budget(user_input, max_tokens):
+    """
+    Shorten the free-text fields so the serialized input fits max_tokens. Every
+    field gets the same cap, so short fields stay whole and only the longest
+    ones are cut. Returns (input, truncated field names).
+    """
+    if estimate_tokens(_serialize(user_input)) <= max_tokens:
+        return user_input, []
+
+    fields = [field for field in TRUNCATABLE_FIELDS if isinstance(user_input.get(field), str)]
+    sizes = {field: estimate_tokens(user_input[field]) for field in fields}
+    fixed = estimate_tokens(_serialize({key: value for key, value in user_input.items() if key not in sizes}))
+    available = max(0, max_tokens - fixed - len(fields) * estimate_tokens(TRUNCATION_MARKER))
+
+    # Water-fill: the largest per-field cap whose total fits the available tokens
+    cap = available
+    remaining = available
+    for index, size in enumerate(sorted(sizes.values())):
+        share = remaining // (len(sizes) - index)
+        if size > share:
+            cap = share
+            break
+        remaining -= size
+
+    # Escaping makes the serialized fields a little longer than measured, so tighten and retry
+    for _ in range(3):
+        fitted = dict(user_input)
+        truncated = [field for field, size in sizes.items() if size > cap]
+        for field in truncated:
+            fitted[field] = truncate_text(user_input[field], cap)
+        overshoot = estimate_tokens(_serialize(fitted)) - max_tokens
+        if overshoot <= 0 or not truncated:
+            break
+        cap = max(0, cap - math.ceil(overshoot / len(truncated)))
+    return fitted, truncated
+
+
+def build_user_prompt(user_input, sections=None, max_tokens=None):
+    """Return (user message, truncated field names) asking for the given sections (default: the standard deck)"""
+    compacted, truncated = fit_to_budget(compact_input(user_input), max_tokens or input_token_budget())
+    return (
+        f"Generate only these sections: {', '.join(sections or DEFAULT_SECTIONS)}\n"
+        f"Resume information:\n{_serialize(compacted)}"
+    ), truncated
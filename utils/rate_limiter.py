@@ -0,0 +1,324 @@
+"""
+Cross-process admission control for AI provider calls. Every request waits in
+a shared SQLite queue until it is admitted by per-provider token buckets for
+requests per minute and tokens per minute, so all app sessions, replicas on
+the same host, batch runs and job workers share one provider budget. Waiting
+requests are served by priority, then by weighted fair queueing across
+tenants, so one heavy tenant cannot starve the others.
+
+Limits come from OPENAI_RPM, OPENAI_TPM, PERPLEXITY_RPM and PERPLEXITY_TPM;
+with none set, admission control is off.
+"""
+import asyncio
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from utils.metrics import metrics
+
+
+DEFAULT_LIMITER_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "ai_ppt_generator", "rate_limits.sqlite3"
+)
+LIMIT_ENV = {
+    "openai": ("OPENAI_RPM", "OPENAI_TPM"),
+    "perplexity": ("PERPLEXITY_RPM", "PERPLEXITY_TPM")
+}
+
+# Tenant and priority of the calls made in the current context (session, batch run or job)
+_tenant = contextvars.ContextVar("ai_tenant", default=("default", 0))
+
+
+@contextmanager
+def tenant_context(tenant, priority=0):
+    """Attribute AI calls made inside the block to a tenant; higher priorities are admitted first"""
+    token = _tenant.set((str(tenant), priority))
+    try:
+        yield
+    finally:
+        _tenant.reset(token)
+
+
+def current_tenant():
+    """(tenant, priority) for calls made in the current context"""
+    return _tenant.get()
+
+
+class SharedRateLimiter:
+    """Token buckets and a fair wait queue per provider, shared across processes through SQLite"""
+
+    def __init__(self, limits, path=None, burst_seconds=10.0, poll_interval=0.1, lease_seconds=5.0, weights=None):
+        # provider -> {"rpm": requests per minute, "tpm": tokens per minute}; missing or 0 means unlimited
+        self.limits = limits
+        # Buckets hold this many seconds of budget, since providers also enforce limits over sub-minute windows
+        self.burst_seconds = burst_seconds
+        self.path = path or os.getenv("AI_RATE_LIMIT_PATH", DEFAULT_LIMITER_PATH)
+        self.poll_interval = poll_interval
+        # Waiters that stop polling for this long (crashed processes) drop out of the queue
+        self.lease_seconds = lease_seconds
+        # tenant -> share of the provider budget relative to other waiting tenants (default 1)
+        self.weights = weights or {}
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+        with self._connect(immediate=True) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS buckets (
+                    provider TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    level REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (provider, kind)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS waiters (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    provider TEXT NOT NULL,
+                    tenant TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    start_tag REAL NOT NULL,
+                    finish_tag REAL NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_waiters_order ON waiters (provider, priority DESC, finish_tag, id)"
+            )
+            # Weighted fair queueing state: each tenant's last finish tag and each provider's virtual clock
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tenants (
+                    provider TEXT NOT NULL,
+                    tenant TEXT NOT NULL,
+                    last_finish REAL NOT NULL,
+                    PRIMARY KEY (provider, tenant)
+                )
+                """
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS clocks (provider TEXT PRIMARY KEY, virtual_time REAL NOT NULL)")
+
+    @contextmanager
+    def _connect(self, immediate=False):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            # BEGIN IMMEDIATE takes the write lock up front so concurrent admissions serialize
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _buckets(self, provider):
+        """(kind, capacity, refill per second) for each limited dimension of a provider"""
+        limits = self.limits.get(provider) or {}
+        buckets = []
+        for kind in ("rpm", "tpm"):
+            if limits.get(kind):
+                rate = limits[kind] / 60.0
+                buckets.append((kind, max(1.0, rate * self.burst_seconds), rate))
+        return buckets
+
+    def enabled(self, provider):
+        return bool(self._buckets(provider))
+
+    def enqueue(self, provider, tokens, tenant="default", priority=0):
+        """Join the provider's wait queue and return the ticket id"""
+        now = time.time()
+        weight = self.weights.get(tenant, 1.0)
+        with self._connect(immediate=True) as conn:
+            row = conn.execute("SELECT virtual_time FROM clocks WHERE provider = ?", (provider,)).fetchone()
+            virtual_time = row[0] if row else 0.0
+            row = conn.execute(
+                "SELECT last_finish FROM tenants WHERE provider = ? AND tenant = ?", (provider, tenant)
+            ).fetchone()
+            # Idle tenants start at the current virtual time instead of spending saved-up credit
+            start = max(virtual_time, row[0] if row else 0.0)
+            finish = start + tokens / weight
+            conn.execute(
+                "INSERT OR REPLACE INTO tenants (provider, tenant, last_finish) VALUES (?, ?, ?)",
+                (provider, tenant, finish)
+            )
+            ticket = conn.execute(
+                """
+                INSERT INTO waiters (provider, tenant, priority, tokens, start_tag, finish_tag, enqueued_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (provider, tenant, priority, tokens, start, finish, now, now + self.lease_seconds)
+            ).lastrowid
+            depth = conn.execute("SELECT COUNT(*) FROM waiters WHERE provider = ?", (provider,)).fetchone()[0]
+        metrics.observe("ai_admission_queue_depth", depth, service=provider)
+        return ticket
+
+    def try_admit(self, provider, ticket):
+        """
+        Admit the ticket if it is first in line and the buckets hold enough budget.
+        Returns 0.0 when admitted, otherwise the number of seconds to wait before asking again.
+        """
+        now = time.time()
+        # Cheap read-only check first, so waiters behind the head do not contend for the write lock
+        with self._connect() as conn:
+            head = self._head(conn, provider, now)
+            expires_at = conn.execute("SELECT expires_at FROM waiters WHERE id = ?", (ticket,)).fetchone()
+        if expires_at is None:
+            raise KeyError(f"Unknown or expired rate limiter ticket {ticket}")
+        if head != ticket:
+            if expires_at[0] - now < self.lease_seconds / 2:
+                with self._connect(immediate=True) as conn:
+                    conn.execute("UPDATE waiters SET expires_at = ? WHERE id = ?", (now + self.lease_seconds, ticket))
+            return self.poll_interval
+
+        with self._connect(immediate=True) as conn:
+            conn.execute("DELETE FROM waiters WHERE provider = ? AND expires_at < ?", (provider, now))
+            if self._head(conn, provider, now) != ticket:
+                return self.poll_interval
+            tokens, start = conn.execute("SELECT tokens, start_tag FROM waiters WHERE id = ?", (ticket,)).fetchone()
+
+            levels = {}
+            wait = 0.0
+            for kind, capacity, rate in self._buckets(provider):
+                row = conn.execute(
+                    "SELECT level, updated_at FROM buckets WHERE provider = ? AND kind = ?", (provider, kind)
+                ).fetchone()
+                level = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                # A request larger than the whole bucket waits for a full bucket instead of forever
+                needed = 1 if kind == "rpm" else min(tokens, capacity)
+                levels[kind] = (level, needed)
+                if level < needed:
+                    wait = max(wait, (needed - level) / rate)
+
+            admitted = wait == 0.0
+            for kind, (level, needed) in levels.items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (provider, kind, level, updated_at) VALUES (?, ?, ?, ?)",
+                    (provider, kind, level - needed if admitted else level, now)
+                )
+            if not admitted:
+                conn.execute("UPDATE waiters SET expires_at = ? WHERE id = ?", (now + self.lease_seconds, ticket))
+                # Sleep no longer than one lease so the ticket does not expire while waiting
+                return min(wait, self.lease_seconds / 2)
+
+            conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+            conn.execute(
+                "INSERT OR REPLACE INTO clocks (provider, virtual_time) VALUES (?, ?)", (provider, start)
+            )
+            return 0.0
+
+    @staticmethod
+    def _head(conn, provider, now):
+        row = conn.execute(
+            """
+            SELECT id FROM waiters WHERE provider = ? AND expires_at >= ?
+            ORDER BY priority DESC, finish_tag, id LIMIT 1
+            """,
+            (provider, now)
+        ).fetchone()
+        return row[0] if row else None
+
+    def cancel(self, ticket):
+        """Leave the queue without being admitted"""
+        with self._connect(immediate=True) as conn:
+            conn.execute("DELETE FROM waiters WHERE id = ?", (ticket,))
+
+    def acquire(self, provider, tokens, tenant="default", priority=0, timeout=None):
+        """Block until a request of `tokens` tokens is admitted; False if timeout passes first"""
+        if not self.enabled(provider):
+            return True
+        started = time.monotonic()
+        ticket = self.enqueue(provider, tokens, tenant, priority)
+        try:
+            while True:
+                wait = self.try_admit(provider, ticket)
+                if wait == 0.0:
+                    self._record_wait(provider, priority, started, admitted=True)
+                    return True
+                if timeout is not None and time.monotonic() + wait - started > timeout:
+                    self.cancel(ticket)
+                    self._record_wait(provider, priority, started, admitted=False)
+                    return False
+                time.sleep(wait)
+        except BaseException:
+            self.cancel(ticket)
+            raise
+
+    async def acquire_async(self, provider, tokens, tenant="default", priority=0, timeout=None):
+        """asyncio variant of acquire; the event loop keeps running while the request waits"""
+        if not self.enabled(provider):
+            return True
+        started = time.monotonic()
+        ticket = await asyncio.to_thread(self.enqueue, provider, tokens, tenant, priority)
+        try:
+            while True:
+                wait = await asyncio.to_thread(self.try_admit, provider, ticket)
+                if wait == 0.0:
+                    self._record_wait(provider, priority, started, admitted=True)
+                    return True
+                if timeout is not None and time.monotonic() + wait - started > timeout:
+                    await asyncio.to_thread(self.cancel, ticket)
+                    self._record_wait(provider, priority, started, admitted=False)
+                    return False
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Cancelled (for example a losing hedge): give the place in line back
+            await asyncio.shield(asyncio.to_thread(self.cancel, ticket))
+            raise
+
+    def _record_wait(self, provider, priority, started, admitted):
+        metrics.observe("ai_admission_wait_seconds", time.monotonic() - started, service=provider, priority=priority)
+        metrics.increment("ai_admissions_total", service=provider, admitted=admitted)
+
+    def queue_depths(self):
+        """provider -> {tenant: waiting requests}, for monitoring"""
+        depths = {}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT provider, tenant, COUNT(*) FROM waiters WHERE expires_at >= ? GROUP BY provider, tenant",
+                (time.time(),)
+            ).fetchall()
+        for provider, tenant, count in rows:
+            depths.setdefault(provider, {})[tenant] = count
+        return depths
+
+
+def limits_from_env():
+    """Per-provider {"rpm", "tpm"} limits from the environment, leaving out providers without any"""
+    limits = {}
+    for provider, (rpm_env, tpm_env) in LIMIT_ENV.items():
+        rpm = int(os.getenv(rpm_env) or 0)
+        tpm = int(os.getenv(tpm_env) or 0)
+        if rpm or tpm:
+            limits[provider] = {"rpm": rpm, "tpm": tpm}
+    return limits
+
+
+_shared_limiter = None
+_shared_lock = threading.Lock()
+
+
+def shared_limiter():
+    """The process-wide limiter configured from the environment, or None when no limits are set"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            limits = limits_from_env()
+            _shared_limiter = SharedRateLimiter(limits) if limits else False
+        return _shared_limiter or None
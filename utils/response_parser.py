@@ -0,0 +1,129 @@
+"""Turn raw model output into a resume dict: strip fences and repair common defects."""
+import json
+import re
+
+try:
+    import orjson
+except ImportError:  # optional fast JSON backend
+    orjson = None
+
+
+FENCE_PATTERN = re.compile(r"```[A-Za-z0-9_-]*\s*\n?(.*?)```", re.DOTALL)
+
+
+def loads(text):
+    """Decode JSON with orjson when it is installed, falling back to the stdlib"""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(text)
+
+
+def extract_json_text(raw_response):
+    """Strip markdown fences and any preamble or trailing prose around the JSON object"""
+    text = raw_response.strip()
+    fenced = FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+    elif text.startswith("```"):
+        # Opening fence of a truncated response with no closing fence
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+
+    start = text.find("{")
+    if start == -1:
+        return text
+    end = text.rfind("}")
+    # Keep a truncated tail so repair_json can close it
+    if end > start and _balanced(text[start:end + 1]):
+        return text[start:end + 1]
+    return text[start:]
+
+
+def _balanced(text):
+    """True when every bracket opened outside a string is closed"""
+    depth = 0
+    in_string = escape = False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+    return depth == 0 and not in_string
+
+
+def repair_json(text):
+    """Remove trailing commas and close strings, arrays and objects left open by truncation"""
+    out = []
+    stack = []
+    in_string = escape = False
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if stack:
+                stack.pop()
+        out.append(ch)
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+
+    # Drop a dangling separator or a key whose value never arrived
+    repaired = "".join(out).rstrip()
+    while True:
+        if repaired.endswith(","):
+            repaired = repaired[:-1].rstrip()
+        elif repaired.endswith(":"):
+            repaired = re.sub(r',?\s*"(?:[^"\\]|\\.)*"\s*:$', "", repaired).rstrip()
+        else:
+            break
+    if stack and stack[-1] == "}" and re.search(r'[{,]\s*"(?:[^"\\]|\\.)*"$', repaired):
+        # A key with no colon at all
+        repaired = re.sub(r',?\s*"(?:[^"\\]|\\.)*"$', "", repaired).rstrip()
+
+    return repaired + "".join(reversed(stack))
+
+
+def _drop_trailing_comma(out):
+    """Remove a comma directly before a closing bracket, skipping whitespace"""
+    index = len(out) - 1
+    while index >= 0 and out[index].isspace():
+        index -= 1
+    if index >= 0 and out[index] == ",":
+        del out[index]
+
+
+def parse_json_response(raw_response):
+    """Decode a model response, repairing it if the plain parse fails"""
+    text = extract_json_text(raw_response)
+    try:
+        return loads(text)
+    except ValueError:
+        return loads(repair_json(text))
+
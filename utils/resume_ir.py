@@ -0,0 +1,249 @@
+"""
+Typed intermediate representation of resume content. AI output is parsed and
+normalized into frozen, slotted dataclasses once, so renderers and batch jobs
+work with plain attributes instead of probing nested dicts, and each record
+stays small in memory. Records round-trip through JSON Lines (the ai_content
+shape) and a compact positional form packed with msgpack when it is installed.
+"""
+import json
+from dataclasses import dataclass, fields
+from utils.slide_plan import SECTION_RENDERERS
+
+try:
+    import msgpack
+except ImportError:  # optional binary packing
+    msgpack = None
+
+
+def _text(value):
+    """Normalize a scalar to stripped text; None becomes an empty string"""
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def _texts(values):
+    """Normalize a list of scalars to a tuple of non-empty strings"""
+    if values is None:
+        return ()
+    if isinstance(values, (str, int, float)):
+        values = [values]
+    return tuple(text for text in (_text(value) for value in values) if text)
+
+
+@dataclass(frozen=True, slots=True)
+class TitleSlide:
+    name: str = ""
+    title: str = ""
+    tagline: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(_text(data.get("name")), _text(data.get("title")), _text(data.get("tagline")))
+
+
+@dataclass(frozen=True, slots=True)
+class Points:
+    points: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(_texts((data or {}).get("points")))
+
+
+@dataclass(frozen=True, slots=True)
+class Experience:
+    title: str = ""
+    company: str = ""
+    dates: str = ""
+    responsibilities: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(_text(data.get("title")), _text(data.get("company")), _text(data.get("dates")),
+                   _texts(data.get("responsibilities")))
+
+    def heading(self, label="Experience"):
+        if not self.company:
+            return f"{label}: {self.title}"
+        return f"{label}: {self.title} at {self.company}"
+
+
+@dataclass(frozen=True, slots=True)
+class Education:
+    degree: str = ""
+    institution: str = ""
+    year: str = ""
+    gpa: str = ""
+    achievements: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(_text(data.get("degree")), _text(data.get("institution")), _text(data.get("year")),
+                   _text(data.get("gpa")), _texts(data.get("achievements")))
+
+    @property
+    def summary(self):
+        line = f"{self.degree} - {self.institution}"
+        if self.year:
+            line += f", {self.year}"
+        if self.gpa:
+            line += f" (GPA: {self.gpa})"
+        return line
+
+
+@dataclass(frozen=True, slots=True)
+class Skills:
+    technical: tuple = ()
+    soft: tuple = ()
+    domain: tuple = ()
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(_texts(data.get("technical")), _texts(data.get("soft")), _texts(data.get("domain")))
+
+    def categories(self):
+        """(category, skills) pairs for the non-empty categories, in display order"""
+        return [(name, getattr(self, name)) for name in ("technical", "soft", "domain") if getattr(self, name)]
+
+
+@dataclass(frozen=True, slots=True)
+class Contact:
+    email: str = ""
+    phone: str = ""
+    linkedin: str = ""
+    portfolio: str = ""
+
+    @classmethod
+    def from_dict(cls, data):
+        data = data or {}
+        return cls(*(_text(data.get(field.name)) for field in fields(cls)))
+
+
+@dataclass(frozen=True, slots=True)
+class Resume:
+    title_slide: TitleSlide = TitleSlide()
+    about_me: Points = Points()
+    work_experience: tuple = ()
+    education: tuple = ()
+    skills: Skills = Skills()
+    achievements: tuple = ()
+    contact: Contact = Contact()
+    executive_summary: Points = Points()
+    leadership_experience: tuple = ()
+    key_achievements: tuple = ()
+    board_positions: tuple = ()
+    portfolio_highlights: tuple = ()
+    research_interests: Points = Points()
+    publications: tuple = ()
+    teaching_experience: tuple = ()
+    grants_awards: tuple = ()
+
+    @classmethod
+    def from_dict(cls, ai_content):
+        """Parse and normalize an ai_content dict"""
+        return cls(**{section: parse_section(section, ai_content.get(section)) for section in RESUME_SECTIONS})
+
+    def to_dict(self):
+        """Convert back to the ai_content dict shape, leaving out empty sections"""
+        plain = {section: _to_plain(getattr(self, section)) for section in RESUME_SECTIONS}
+        return {section: value for section, value in plain.items() if value not in ({}, [])}
+
+    def to_row(self):
+        """Positional nested lists without field names, the compact serialized form"""
+        return _to_row(self)
+
+    @classmethod
+    def from_row(cls, row):
+        """Inverse of to_row; shorter rows written before sections were added leave them empty"""
+        return cls(**{section: KIND_ROW_DECODERS[SECTION_RENDERERS[section].kind](value)
+                      for section, value in zip(RESUME_SECTIONS, row)})
+
+
+def _parse_list(item_type):
+    def parse(data):
+        if isinstance(data, dict):
+            data = [data]
+        return tuple(item_type.from_dict(item) for item in data or () if isinstance(item, dict))
+    return parse
+
+
+# render kind -> parser from the raw ai_content value
+KIND_PARSERS = {
+    "title": TitleSlide.from_dict,
+    "points": Points.from_dict,
+    "jobs": _parse_list(Experience),
+    "education": _parse_list(Education),
+    "skills": Skills.from_dict,
+    "list": _texts,
+    "contact": Contact.from_dict
+}
+# render kind -> decoder from the positional row form
+KIND_ROW_DECODERS = {
+    "title": lambda row: TitleSlide(*row),
+    "points": lambda row: Points(tuple(row[0])),
+    "jobs": lambda rows: tuple(Experience(title, company, dates, tuple(items))
+                               for title, company, dates, items in rows),
+    "education": lambda rows: tuple(Education(degree, institution, year, gpa, tuple(items))
+                                     for degree, institution, year, gpa, items in rows),
+    "skills": lambda row: Skills(*(tuple(values) for values in row)),
+    "list": tuple,
+    "contact": lambda row: Contact(*row)
+}
+RESUME_SECTIONS = tuple(field.name for field in fields(Resume))
+IR_TYPES = (TitleSlide, Points, Experience, Education, Skills, Contact)
+
+
+def parse_section(section, data):
+    """Normalize one raw section value by its render kind; values that are already IR pass through"""
+    if isinstance(data, IR_TYPES) or (isinstance(data, tuple) and all(isinstance(item, IR_TYPES) for item in data)):
+        return data
+    return KIND_PARSERS[SECTION_RENDERERS[section].kind](data)
+
+
+def _to_plain(value):
+    if isinstance(value, IR_TYPES):
+        plain = {field.name: _to_plain(getattr(value, field.name)) for field in fields(value)}
+        return {key: item for key, item in plain.items() if item not in ("", [])}
+    if isinstance(value, tuple):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+def _to_row(value):
+    if isinstance(value, (Resume, *IR_TYPES)):
+        return [_to_row(getattr(value, field.name)) for field in fields(value)]
+    if isinstance(value, tuple):
+        return [_to_row(item) for item in value]
+    return value
+
+
+def dumps_jsonl(resumes):
+    """Serialize resumes as JSON Lines of ai_content dicts"""
+    return "".join(json.dumps(resume.to_dict(), separators=(",", ":"), ensure_ascii=False) + "\n"
+                   for resume in resumes)
+
+
+def loads_jsonl(lines):
+    """Parse JSON Lines of ai_content dicts into resumes"""
+    return [Resume.from_dict(json.loads(line)) for line in lines if line.strip()]
+
+
+def pack(resume):
+    """Pack a resume's positional row with msgpack, or compact JSON without it"""
+    if msgpack is not None:
+        return msgpack.packb(resume.to_row(), use_bin_type=True)
+    return json.dumps(resume.to_row(), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def unpack(data):
+    """Inverse of pack; detects which encoding was used"""
+    if data[:1] == b"[":
+        return Resume.from_row(json.loads(data))
+    if msgpack is None:
+        raise ValueError("msgpack is required to unpack this record")
+    return Resume.from_row(msgpack.unpackb(data, raw=False))
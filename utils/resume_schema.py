@@ -0,0 +1,192 @@
+"""Structure of the resume JSON the model is asked to produce, with a compiled validator."""
+
+
+class OptionalField:
+    """Marks an object field that may be missing or null"""
+
+    def __init__(self, spec):
+        self.spec = spec
+
+
+# Sections of the default (professional) deck, generated when no slide plan is given
+DEFAULT_SECTIONS = (
+    "title_slide",
+    "about_me",
+    "work_experience",
+    "education",
+    "skills",
+    "achievements",
+    "contact"
+)
+
+# Example value for each section, used to show the model the expected shape
+SECTION_EXAMPLES = {
+    "title_slide": {
+        "name": "FULL_NAME (REQUIRED)",
+        "title": "PROFESSIONAL_TITLE (REQUIRED)",
+        "tagline": "Optional tagline"
+    },
+    "about_me": {
+        "points": ["Bullet point 1", "Bullet point 2"]
+    },
+    "work_experience": [
+        {
+            "title": "Job Title",
+            "company": "Company Name",
+            "dates": "Employment Dates",
+            "responsibilities": ["Responsibility 1", "Responsibility 2"]
+        }
+    ],
+    "education": [
+        {
+            "degree": "Degree Name",
+            "institution": "Institution Name",
+            "year": "Graduation Year",
+            "gpa": "Optional GPA",
+            "achievements": ["Achievement 1"]
+        }
+    ],
+    "skills": {
+        "technical": ["Skill 1"],
+        "soft": ["Skill 2"],
+        "domain": ["Skill 3"]
+    },
+    "achievements": ["Achievement 1"],
+    "contact": {
+        "email": "user@example.com",
+        "phone": "+1234567890",
+        "linkedin": "linkedin.com/in/username",
+        "portfolio": "portfolio.com"
+    },
+    "executive_summary": {"points": ["Summary point 1"]},
+    "leadership_experience": [
+        {"title": "Role", "company": "Organization", "dates": "Dates", "responsibilities": ["Leadership impact 1"]}
+    ],
+    "key_achievements": ["Quantified achievement 1"],
+    "board_positions": ["Board Role, Organization, Years"],
+    "portfolio_highlights": ["Project: one-line outcome"],
+    "research_interests": {"points": ["Research interest 1"]},
+    "publications": ["Authors (Year). Title. Venue."],
+    "teaching_experience": [
+        {"title": "Course or Role", "company": "Institution", "dates": "Dates", "responsibilities": ["Detail 1"]}
+    ],
+    "grants_awards": ["Grant or Award, Funder, Year"]
+}
+
+# Type specs: str is any scalar text, [spec] a list, {key: spec} an object
+SECTION_SPECS = {
+    "title_slide": {"name": str, "title": str, "tagline": OptionalField(str)},
+    "about_me": {"points": [str]},
+    "work_experience": [{
+        "title": str,
+        "company": str,
+        "dates": OptionalField(str),
+        "responsibilities": OptionalField([str])
+    }],
+    "education": [{
+        "degree": str,
+        "institution": str,
+        "year": OptionalField(str),
+        "gpa": OptionalField(str),
+        "achievements": OptionalField([str])
+    }],
+    "skills": {"technical": OptionalField([str]), "soft": OptionalField([str]), "domain": OptionalField([str])},
+    "achievements": [str],
+    "contact": {
+        "email": OptionalField(str),
+        "phone": OptionalField(str),
+        "linkedin": OptionalField(str),
+        "portfolio": OptionalField(str)
+    },
+    "executive_summary": {"points": [str]},
+    "leadership_experience": [{
+        "title": str,
+        "company": str,
+        "dates": OptionalField(str),
+        "responsibilities": OptionalField([str])
+    }],
+    "key_achievements": [str],
+    "board_positions": [str],
+    "portfolio_highlights": [str],
+    "research_interests": {"points": [str]},
+    "publications": [str],
+    "teaching_experience": [{
+        "title": str,
+        "company": str,
+        "dates": OptionalField(str),
+        "responsibilities": OptionalField([str])
+    }],
+    "grants_awards": [str]
+}
+
+
+def compile_spec(spec):
+    """
+    Compile a type spec into a validator function. The validator takes a value
+    and a path and returns a list of error strings (empty when valid).
+    """
+    if spec is str:
+        def validate_scalar(value, path):
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                return []
+            return [f"{path}: expected text"]
+        return validate_scalar
+
+    if isinstance(spec, list):
+        validate_item = compile_spec(spec[0])
+
+        def validate_list(value, path):
+            if not isinstance(value, list):
+                return [f"{path}: expected a list"]
+            errors = []
+            for index, item in enumerate(value):
+                errors.extend(validate_item(item, f"{path}[{index}]"))
+            return errors
+        return validate_list
+
+    if isinstance(spec, dict):
+        fields = []
+        for key, field_spec in spec.items():
+            optional = isinstance(field_spec, OptionalField)
+            inner = field_spec.spec if optional else field_spec
+            fields.append((key, optional, compile_spec(inner)))
+
+        def validate_object(value, path):
+            if not isinstance(value, dict):
+                return [f"{path}: expected an object"]
+            errors = []
+            for key, optional, validate_field in fields:
+                field = value.get(key)
+                if field is None:
+                    if not optional:
+                        errors.append(f"{path}.{key}: missing")
+                    continue
+                errors.extend(validate_field(field, f"{path}.{key}"))
+            return errors
+        return validate_object
+
+    raise TypeError(f"Unsupported spec: {spec!r}")
+
+
+# Validators compiled once at import time
+SECTION_VALIDATORS = {section: compile_spec(spec) for section, spec in SECTION_SPECS.items()}
+# Validators for single entries of list sections, used when entries are streamed one by one
+ITEM_VALIDATORS = {
+    section: compile_spec(spec[0]) for section, spec in SECTION_SPECS.items() if isinstance(spec, list)
+}
+
+
+def validate_sections(content, sections=None):
+    """Return {section: [errors]} for every missing or invalid section"""
+    invalid = {}
+    for section in sections or DEFAULT_SECTIONS:
+        validator = SECTION_VALIDATORS.get(section)
+        if validator is None:
+            continue
+        if section not in content:
+            invalid[section] = [f"{section}: missing"]
+            continue
+        errors = validator(content[section], section)
+        if errors:
+            invalid[section] = errors
+    return invalid
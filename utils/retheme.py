@@ -0,0 +1,171 @@
+"""
+Re-theme a generated deck without rebuilding it. Every color PPTGenerator writes
+is an srgbClr value of a scheme role on the master, the layouts or a slide, so
+switching schemes only swaps those hex values, and optionally scales font sizes.
+The package is copied member by member: parts that do not change are copied
+still compressed, byte for byte, and only the rewritten ones are deflated again.
+"""
+import io
+import os
+import re
+import struct
+import zipfile
+import zlib
+from utils.metrics import metrics
+from utils.color_schemes import COLOR_SCHEMES
+
+
+# Parts whose XML carries scheme colors and font sizes
+THEMED_PART_PATTERN = re.compile(r"^ppt/(?:slideMasters|slideLayouts|slides)/[^/]+\.xml$")
+MASTER_PART = "ppt/slideMasters/slideMaster1.xml"
+
+SRGB_PATTERN = re.compile(rb'(<a:srgbClr val=")([0-9A-Fa-f]{6})(")')
+SIZE_PATTERN = re.compile(rb'(\ssz=")(\d+)(")')
+# The master background is the scheme's secondary color
+BACKGROUND_PATTERN = re.compile(rb'<p:bg>.*?<a:srgbClr val="([0-9A-Fa-f]{6})"', re.DOTALL)
+
+# ZIP record layouts (APPNOTE 4.3.7, 4.3.12 and 4.3.16)
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+CENTRAL_HEADER = struct.Struct("<4sHHHHHHIIIHHHHHII")
+END_RECORD = struct.Struct("<4sHHHHIIH")
+LOCAL_SIGNATURE = b"PK\x03\x04"
+CENTRAL_SIGNATURE = b"PK\x01\x02"
+END_SIGNATURE = b"PK\x05\x06"
+ZIP_VERSION = 20
+ZIP_LIMIT = 0xFFFFFFFF
+# Flag bit 3 marks a trailing data descriptor, which copied members never have
+DATA_DESCRIPTOR_FLAG = 0x08
+
+
+def _dos_datetime(date_time):
+    year, month, day, hour, minute, second = date_time
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+class RawZipWriter:
+    """Minimal ZIP writer that can append members whose compressed bytes are already known"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.entries = []
+
+    def write_compressed(self, info, data, crc, method, size):
+        """Append a member from its compressed bytes"""
+        if len(data) > ZIP_LIMIT or size > ZIP_LIMIT:
+            raise ValueError(f"{info.filename} is too large to copy without ZIP64")
+        name = info.filename.encode("utf-8")
+        flags = (info.flag_bits & ~DATA_DESCRIPTOR_FLAG) | (0x800 if not name.isascii() else 0)
+        dos_time, dos_date = _dos_datetime(info.date_time)
+        offset = self.stream.tell()
+        self.stream.write(LOCAL_HEADER.pack(LOCAL_SIGNATURE, ZIP_VERSION, flags, method, dos_time, dos_date,
+                                            crc, len(data), size, len(name), 0))
+        self.stream.write(name)
+        self.stream.write(data)
+        self.entries.append((name, flags, method, dos_time, dos_date, crc, len(data), size, offset))
+
+    def write(self, info, data):
+        """Deflate and append a member"""
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+        self.write_compressed(info, compressed, zlib.crc32(data), 8, len(data))
+
+    def close(self):
+        """Write the central directory"""
+        start = self.stream.tell()
+        if start > ZIP_LIMIT or len(self.entries) > 0xFFFF:
+            raise ValueError("Archive is too large to write without ZIP64")
+        for name, flags, method, dos_time, dos_date, crc, compressed, size, offset in self.entries:
+            self.stream.write(CENTRAL_HEADER.pack(CENTRAL_SIGNATURE, ZIP_VERSION, ZIP_VERSION, flags, method,
+                                                  dos_time, dos_date, crc, compressed, size, len(name), 0, 0, 0,
+                                                  0, 0, offset))
+            self.stream.write(name)
+        end = self.stream.tell()
+        self.stream.write(END_RECORD.pack(END_SIGNATURE, 0, 0, len(self.entries), len(self.entries),
+                                          end - start, start, 0))
+
+
+def _raw_member(source, info):
+    """Compressed bytes of a member, read straight from the archive"""
+    source.seek(info.header_offset)
+    header = LOCAL_HEADER.unpack(source.read(LOCAL_HEADER.size))
+    source.seek(info.header_offset + LOCAL_HEADER.size + header[9] + header[10])
+    return source.read(info.compress_size)
+
+
+def detect_scheme(deck):
+    """Name of the color scheme a deck was generated with, from its master background"""
+    with zipfile.ZipFile(_open(deck)) as archive:
+        master = archive.read(MASTER_PART) if MASTER_PART in archive.namelist() else b""
+    match = BACKGROUND_PATTERN.search(master)
+    if match is not None:
+        background = match.group(1).decode("ascii").upper()
+        for name, scheme in COLOR_SCHEMES.items():
+            if scheme["secondary"] == background:
+                return name
+    raise ValueError("Deck does not use a known color scheme")
+
+
+def _open(deck):
+    if isinstance(deck, (bytes, bytearray, memoryview)):
+        return io.BytesIO(deck)
+    if isinstance(deck, (str, os.PathLike)):
+        with open(deck, "rb") as f:
+            return io.BytesIO(f.read())
+    return deck
+
+
+def color_map(from_scheme, to_scheme):
+    """Hex value of every role in one scheme -> the same role's value in the other"""
+    source, target = COLOR_SCHEMES[from_scheme], COLOR_SCHEMES[to_scheme]
+    mapping = {}
+    for role, color in source.items():
+        mapping.setdefault(color.encode("ascii"), target[role].encode("ascii"))
+    return mapping
+
+
+def _rewrite(xml, colors, font_scale):
+    xml = SRGB_PATTERN.sub(lambda match: match.group(1) + colors.get(match.group(2).upper(), match.group(2))
+                           + match.group(3), xml)
+    if font_scale is not None:
+        xml = SIZE_PATTERN.sub(lambda match: match.group(1) + str(max(100, round(int(match.group(2)) * font_scale)))
+                               .encode("ascii") + match.group(3), xml)
+    return xml
+
+
+def retheme(deck, scheme_name, from_scheme=None, font_scale=None):
+    """
+    Return .pptx bytes of a generated deck (bytes, path or binary file) in another color
+    scheme, optionally with every font size scaled. The source scheme is detected
+    from the master when it is not given.
+    """
+    if scheme_name not in COLOR_SCHEMES:
+        raise ValueError(f"Unknown color scheme: {scheme_name}")
+    source = _open(deck)
+    from_scheme = from_scheme or detect_scheme(source)
+    colors = color_map(from_scheme, scheme_name)
+    if from_scheme == scheme_name and font_scale is None:
+        colors = {}
+
+    output = io.BytesIO()
+    writer = RawZipWriter(output)
+    rewritten = 0
+    with metrics.timer("ppt_retheme_seconds"), zipfile.ZipFile(source) as archive:
+        for info in archive.infolist():
+            if (colors or font_scale is not None) and THEMED_PART_PATTERN.match(info.filename):
+                xml = archive.read(info.filename)
+                themed = _rewrite(xml, colors, font_scale)
+                if themed != xml:
+                    writer.write(info, themed)
+                    rewritten += 1
+                    continue
+            writer.write_compressed(info, _raw_member(source, info), info.CRC, info.compress_type, info.file_size)
+        writer.close()
+    metrics.increment("ppt_retheme_parts_total", rewritten)
+    return output.getvalue()
+
+
+def retheme_all(deck, font_scale=None, from_scheme=None):
+    """The deck in every color scheme, keyed by scheme name"""
+    data = _open(deck).read()
+    from_scheme = from_scheme or detect_scheme(data)
+    return {name: retheme(data, name, from_scheme, font_scale) for name in COLOR_SCHEMES}
@@ -0,0 +1,121 @@
+import io
+import threading
+from pptx import Presentation
+from pptx.util import Inches
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+
+
+# Text styles defined once on the master/layouts and inherited by every slide.
+# Each entry is (font size in points, color role, bold, alignment).
+TITLE_SLIDE_TITLE_STYLE = (54, "primary", True, "ctr")
+TITLE_SLIDE_SUBTITLE_STYLE = (32, "text", None, "ctr")
+TITLE_STYLE = (40, "primary", True, "l")
+BODY_STYLES = {
+    1: (24, "text", None, None),  # bullet points and skill category headings
+    2: (20, "text", None, None)   # individual skills
+}
+
+# Compiled templates as serialized .pptx bytes, keyed by scheme name and colors
+_template_cache = {}
+_template_lock = threading.Lock()
+
+
+def _scheme_key(scheme_name, scheme):
+    return (scheme_name, tuple(sorted((role, str(color)) for role, color in scheme.items())))
+
+
+def _set_level_style(parent, level, style, scheme):
+    """Write one a:lvlNpPr entry of a list style with size, color, bold and alignment"""
+    size, color_role, bold, align = style
+    tag = qn(f"a:lvl{level}pPr")
+    lvl_ppr = parent.find(tag)
+    if lvl_ppr is None:
+        lvl_ppr = parse_xml(f"<a:lvl{level}pPr {nsdecls('a')}/>")
+        # List style levels must stay in ascending order
+        following = [child for child in parent if child.tag.startswith(qn("a:lvl")) and child.tag > tag]
+        if following:
+            following[0].addprevious(lvl_ppr)
+        else:
+            parent.append(lvl_ppr)
+    if align:
+        lvl_ppr.set("algn", align)
+
+    def_rpr = lvl_ppr.find(qn("a:defRPr"))
+    if def_rpr is None:
+        def_rpr = parse_xml(f"<a:defRPr {nsdecls('a')}/>")
+        ext_lst = lvl_ppr.find(qn("a:extLst"))
+        if ext_lst is not None:
+            ext_lst.addprevious(def_rpr)
+        else:
+            lvl_ppr.append(def_rpr)
+    def_rpr.set("sz", str(size * 100))
+    if bold is not None:
+        def_rpr.set("b", "1" if bold else "0")
+
+    for fill in def_rpr.findall(qn("a:solidFill")):
+        def_rpr.remove(fill)
+    fill = parse_xml(f'<a:solidFill {nsdecls("a")}><a:srgbClr val="{scheme[color_role]}"/></a:solidFill>')
+    line = def_rpr.find(qn("a:ln"))
+    if line is not None:
+        line.addnext(fill)
+    else:
+        def_rpr.insert(0, fill)
+
+
+def apply_theme(prs, scheme):
+    """Define background, title and body styles for a color scheme on the master and layouts"""
+    master = prs.slide_master._element
+
+    # Solid background on the master, inherited by every layout and slide
+    c_sld = master.cSld
+    background = c_sld.find(qn("p:bg"))
+    if background is not None:
+        c_sld.remove(background)
+    c_sld.insert(0, parse_xml(
+        f'<p:bg {nsdecls("p", "a")}><p:bgPr>'
+        f'<a:solidFill><a:srgbClr val="{scheme["secondary"]}"/></a:solidFill><a:effectLst/>'
+        f'</p:bgPr></p:bg>'
+    ))
+
+    tx_styles = master.find(qn("p:txStyles"))
+    _set_level_style(tx_styles.find(qn("p:titleStyle")), 1, TITLE_STYLE, scheme)
+    body_style = tx_styles.find(qn("p:bodyStyle"))
+    for level, style in BODY_STYLES.items():
+        _set_level_style(body_style, level, style, scheme)
+
+    # The title slide layout centers a larger name and subtitle
+    for placeholder in prs.slide_layouts[0].placeholders:
+        placeholder_type = placeholder.placeholder_format.type
+        lst_style = placeholder._element.txBody.find(qn("a:lstStyle"))
+        if placeholder_type == PP_PLACEHOLDER.CENTER_TITLE:
+            _set_level_style(lst_style, 1, TITLE_SLIDE_TITLE_STYLE, scheme)
+        elif placeholder_type == PP_PLACEHOLDER.SUBTITLE:
+            _set_level_style(lst_style, 1, TITLE_SLIDE_SUBTITLE_STYLE, scheme)
+
+
+def _compile_template(scheme):
+    """Build a themed 16:9 presentation and serialize it"""
+    prs = Presentation()
+    # Set default slide size to 16:9 (widescreen)
+    prs.slide_width = Inches(13.33)
+    prs.slide_height = Inches(7.5)
+    apply_theme(prs, scheme)
+
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    return buffer.getvalue()
+
+
+def load_themed_presentation(scheme_name, scheme):
+    """Return a fresh Presentation cloned from the cached themed template for a scheme"""
+    key = _scheme_key(scheme_name, scheme)
+    template = _template_cache.get(key)
+    if template is None:
+        with _template_lock:
+            template = _template_cache.get(key)
+            if template is None:
+                template = _compile_template(scheme)
+                _template_cache[key] = template
+    return Presentation(io.BytesIO(template))
@@ -0,0 +1,83 @@
+"""
+Registry of section renderers and the slide plan compiler. Every section a
+template can list is registered with the kind of slide that renders it, its
+slide title and the user input fields it is generated from. A template is
+compiled once into a SlidePlan whose section order drives both which sections
+the model is asked for and the order the slides are built in.
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from utils.resume_schema import SECTION_SPECS
+from utils.templates import ResumeTemplates
+
+
+# Slide kinds PPTGenerator knows how to render
+RENDER_KINDS = ("title", "points", "jobs", "education", "skills", "list", "contact")
+
+
+@dataclass(frozen=True, slots=True)
+class SectionRenderer:
+    section: str
+    kind: str
+    title: str
+    inputs: tuple
+
+
+@dataclass(frozen=True, slots=True)
+class SlidePlan:
+    template: str
+    color_scheme: str
+    sections: tuple
+    # Sections the template lists that have no registered renderer
+    skipped: tuple = ()
+
+
+SECTION_RENDERERS = {}
+
+
+def register_section(section, kind, title, inputs):
+    """Register how a section is rendered and which user input fields it is generated from"""
+    if kind not in RENDER_KINDS:
+        raise ValueError(f"Unknown render kind: {kind}")
+    if section not in SECTION_SPECS:
+        raise ValueError(f"No schema for section: {section}")
+    SECTION_RENDERERS[section] = SectionRenderer(section, kind, title, tuple(inputs))
+    # Plans compiled before the registration may have skipped this section
+    compile_plan.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def compile_plan(template_name):
+    """Compile a template's slide list into a SlidePlan, once per template"""
+    structure = ResumeTemplates.get_template_structure(template_name)
+    sections = []
+    skipped = []
+    for section in structure["slides"]:
+        if section not in SECTION_RENDERERS:
+            skipped.append(section)
+        elif section not in sections:
+            sections.append(section)
+    return SlidePlan(template_name, structure["color_scheme"], tuple(sections), tuple(skipped))
+
+
+def section_inputs(section):
+    """The user input fields a section is generated from"""
+    return SECTION_RENDERERS[section].inputs
+
+
+register_section("title_slide", "title", "", ("name", "title", "summary"))
+register_section("about_me", "points", "About Me", ("name", "title", "summary"))
+register_section("work_experience", "jobs", "Experience", ("title", "experience"))
+register_section("education", "education", "Education", ("education",))
+register_section("skills", "skills", "Skills & Expertise", ("title", "skills", "experience"))
+register_section("achievements", "list", "Achievements & Certifications", ("achievements",))
+register_section("contact", "contact", "Contact Information", ("contact",))
+register_section("executive_summary", "points", "Executive Summary", ("name", "title", "summary", "experience"))
+register_section("leadership_experience", "jobs", "Leadership", ("title", "experience"))
+register_section("key_achievements", "list", "Key Achievements", ("achievements", "experience"))
+register_section("board_positions", "list", "Board Positions", ("experience", "achievements"))
+register_section("portfolio_highlights", "list", "Portfolio Highlights", ("experience", "achievements"))
+register_section("research_interests", "points", "Research Interests", ("title", "summary", "skills"))
+register_section("publications", "list", "Publications", ("achievements", "experience"))
+register_section("teaching_experience", "jobs", "Teaching", ("experience",))
+register_section("grants_awards", "list", "Grants & Awards", ("achievements",))
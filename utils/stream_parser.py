@@ -0,0 +1,114 @@
+import json
+from collections import namedtuple
+
+
+# kind is "item" (one entry of an array section), "section" (a complete
+# top-level section), "replace" (a section to rebuild whole because some of its
+# items were already emitted), "done" (the whole document) or "error"
+SectionEvent = namedtuple("SectionEvent", ["kind", "section", "value"])
+
+# Array sections whose entries are emitted one by one as they close
+ITEM_SECTIONS = ("work_experience",)
+
+
+class IncrementalSectionParser:
+    """
+    Incremental JSON parser that emits each top-level section of a streamed
+    object as soon as its value closes, without waiting for the full document
+    """
+
+    def __init__(self, item_sections=ITEM_SECTIONS):
+        self.item_sections = set(item_sections)
+        self.buffer = ""
+        self.sections = {}
+        self.done = False
+
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._expect_key = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+        self._item_start = None
+
+    def feed(self, chunk):
+        """Consume a chunk of text and return the events it completed"""
+        self.buffer += chunk
+        events = []
+        buf = self.buffer
+
+        while self._pos < len(buf) and not self.done:
+            i = self._pos
+            ch = buf[i]
+            self._pos += 1
+
+            # Skip any preamble or markdown fence before the root object
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._key_start = None
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = i
+                    self._expect_key = False
+            elif ch == ":" and self._depth == 1:
+                self._value_start = i + 1
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "{" and self._depth == 3 and self._key in self.item_sections:
+                    self._item_start = i
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._item_start is not None:
+                    item = json.loads(buf[self._item_start:i + 1])
+                    self._item_start = None
+                    events.append(SectionEvent("item", self._key, item))
+                elif self._depth == 0:
+                    events.extend(self._close_value(buf[self._value_start:i]))
+                    self.done = True
+                    events.append(SectionEvent("done", None, dict(self.sections)))
+            elif ch == "," and self._depth == 1:
+                events.extend(self._close_value(buf[self._value_start:i]))
+                self._expect_key = True
+
+        return events
+
+    def _close_value(self, text):
+        """Decode the value of the current top-level key"""
+        if self._key is None or self._value_start is None:
+            return []
+        value = json.loads(text)
+        self.sections[self._key] = value
+        event = SectionEvent("section", self._key, value)
+        self._key = None
+        self._value_start = None
+        return [event]
+
+
+def events_from_content(ai_content, item_sections=ITEM_SECTIONS):
+    """Replay an already complete ai_content dict as a stream of section events"""
+    for section, value in ai_content.items():
+        if section in item_sections and isinstance(value, list):
+            for item in value:
+                yield SectionEvent("item", section, item)
+        yield SectionEvent("section", section, value)
+    yield SectionEvent("done", None, ai_content)
@@ -0,0 +1,200 @@
+"""
+Local OpenAI/Perplexity-compatible chat completions server for offline load tests.
+
+Usage:
+    python -m utils.stub_server --port 8080 --latency-median 2.0 --error-rate 0.02
+    python -m utils.stub_server --replay recorded.jsonl --stall-rate 0.01
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8080/v1 and
+PERPLEXITY_BASE_URL=http://127.0.0.1:8080 (any API key works). Responses are
+resume JSON replayed from a JSONL file of ai_content records, or synthetic
+content; per-section prompts get only the sections they ask for. Latency is
+lognormal around the median, and a fraction of requests fail or stall.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.benchmark import synthetic_ai_content
+from utils.prompt_builder import estimate_tokens
+
+
+SECTIONS_PATTERN = re.compile(r"Generate only these sections: ([a-z_, ]+)")
+
+
+class StubBehavior:
+    """Latency distribution, failure rates and response content of the stub"""
+
+    def __init__(self, latency_median=1.0, latency_sigma=0.5, error_rate=0.0, rate_limit_rate=0.0,
+                 stall_rate=0.0, stall_seconds=60.0, replay_path=None, chunk_size=40, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.chunk_size = chunk_size
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        if replay_path:
+            with open(replay_path, encoding="utf-8") as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            responses = [record.get("ai_content", record) for record in records]
+        else:
+            responses = [synthetic_ai_content(jobs, 4, skills, 14, seed=index)
+                         for index, (jobs, skills) in enumerate([(2, 15), (4, 30), (6, 60), (10, 100)])]
+        self._responses = itertools.cycle(responses)
+
+    def next_response(self):
+        with self._lock:
+            return next(self._responses)
+
+    def draw(self):
+        """Return (latency seconds, status code) for one request"""
+        with self._lock:
+            roll = self.random.random()
+            latency = self.random.lognormvariate(0, self.latency_sigma) * self.latency_median
+        if roll < self.error_rate:
+            return latency, 500
+        if roll < self.error_rate + self.rate_limit_rate:
+            return 0.0, 429
+        if roll < self.error_rate + self.rate_limit_rate + self.stall_rate:
+            return self.stall_seconds, 200
+        return latency, 200
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """Answers POST .../chat/completions like the real providers, streamed or not"""
+
+    behavior = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "Not found"}})
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+
+        latency, status = self.behavior.draw()
+        if status == 429:
+            return self._send_json(429, {"error": {"message": "Rate limited"}}, {"Retry-After": "1"})
+        time.sleep(latency)
+        if status != 200:
+            return self._send_json(status, {"error": {"message": "Stub server error"}})
+
+        prompt = request["messages"][-1]["content"]
+        response = self.behavior.next_response()
+        requested = SECTIONS_PATTERN.search(prompt)
+        if requested:
+            sections = [section.strip() for section in requested.group(1).split(",")]
+            response = {section: response[section] for section in sections if section in response}
+        content = json.dumps(response)
+        usage = {
+            "prompt_tokens": sum(estimate_tokens(message["content"]) for message in request["messages"]),
+            "completion_tokens": estimate_tokens(content)
+        }
+        model = request.get("model", "stub")
+
+        if not request.get("stream"):
+            return self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+
+        # Server-sent events, one delta per chunk
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        size = self.behavior.chunk_size
+        for start in range(0, len(content), size):
+            chunk = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + size]}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+def start_stub_server(behavior=None, host="127.0.0.1", port=0):
+    """Start the stub in a background thread and return (server, base URL)"""
+    handler = type("BoundStubRequestHandler", (StubRequestHandler,), {"behavior": behavior or StubBehavior()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}"
+
+
+def add_behavior_arguments(parser):
+    """Add the stub behavior options to an argparse parser"""
+    parser.add_argument("--latency-median", type=float, default=1.0, help="Median response time in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal sigma of the response time")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction answered with 429")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fraction that stall for --stall-seconds")
+    parser.add_argument("--stall-seconds", type=float, default=60.0)
+    parser.add_argument("--replay", help="JSONL file of recorded ai_content to replay")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def behavior_from_args(args):
+    return StubBehavior(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+        replay_path=args.replay,
+        seed=args.seed
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local stub of the AI chat completions APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_behavior_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((args.host, args.port), type(
+        "BoundStubRequestHandler", (StubRequestHandler,), {"behavior": behavior_from_args(args)}
+    ))
+    server.daemon_threads = True
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Estimate rendered text size from glyph-width tables so overflowing bullet
+lists can be split across slides or shrunk to fit, without a rendering backend.
+"""
+import unicodedata
+from functools import lru_cache
+
+
+EMU_PER_POINT = 12700
+
+# Advance widths in thousandths of an em. Characters missing from a table fall
+# back to the width of their character class.
+CALIBRI_WIDTHS = {
+    " ": 226, "!": 326, '"': 401, "#": 498, "$": 507, "%": 715, "&": 682, "'": 221,
+    "(": 303, ")": 303, "*": 498, "+": 498, ",": 250, "-": 306, ".": 252, "/": 386,
+    ":": 268, ";": 268, "<": 498, "=": 498, ">": 498, "?": 463, "@": 894, "[": 307,
+    "\\": 386, "]": 307, "_": 498, "|": 460, "•": 498, "–": 498, "—": 905,
+    "A": 579, "B": 544, "C": 533, "D": 615, "E": 488, "F": 459, "G": 631, "H": 623,
+    "I": 252, "J": 319, "K": 520, "L": 420, "M": 855, "N": 646, "O": 662, "P": 517,
+    "Q": 673, "R": 543, "S": 459, "T": 487, "U": 642, "V": 567, "W": 890, "X": 519,
+    "Y": 487, "Z": 468,
+    "a": 479, "b": 525, "c": 423, "d": 525, "e": 498, "f": 305, "g": 471, "h": 525,
+    "i": 229, "j": 239, "k": 455, "l": 229, "m": 799, "n": 525, "o": 527, "p": 525,
+    "q": 525, "r": 349, "s": 391, "t": 335, "u": 525, "v": 452, "w": 715, "x": 433,
+    "y": 453, "z": 395
+}
+CALIBRI_CLASS_WIDTHS = {"upper": 560, "lower": 460, "digit": 507, "wide": 1000, "other": 500}
+
+# font name -> (per-character widths, per-class widths)
+FONT_METRICS = {
+    "Calibri": (CALIBRI_WIDTHS, CALIBRI_CLASS_WIDTHS)
+}
+DEFAULT_FONT = "Calibri"
+
+# Line height and the 20% space-before of the master body style, as multiples of the font size
+LINE_SPACING = 1.2
+PARAGRAPH_SPACING = 0.2
+
+# Body placeholder insets and per-level left margins, in points
+INSET_X = 7.2
+INSET_Y = 3.6
+LEVEL_MARGINS = {0: 27, 1: 58.5}
+
+# Smallest font scale tried before a list is split across slides
+MIN_FONT_SCALE = 0.8
+FONT_SCALE_STEP = 0.05
+
+
+def _char_class(ch):
+    if ch.isdigit():
+        return "digit"
+    if ch.isupper():
+        return "upper"
+    if ch.islower():
+        return "lower"
+    if unicodedata.east_asian_width(ch) in ("W", "F"):
+        return "wide"
+    return "other"
+
+
+@lru_cache(maxsize=65536)
+def text_width(text, font=DEFAULT_FONT, size=24):
+    """Width of a single line of text in points"""
+    widths, class_widths = FONT_METRICS.get(font, FONT_METRICS[DEFAULT_FONT])
+    units = 0
+    for ch in text:
+        width = widths.get(ch)
+        units += width if width is not None else class_widths[_char_class(ch)]
+    return units * size / 1000
+
+
+@lru_cache(maxsize=65536)
+def line_count(text, width, font=DEFAULT_FONT, size=24):
+    """Number of lines the text wraps to in a box of the given width in points"""
+    if not text.strip():
+        return 1
+    space = text_width(" ", font, size)
+    lines, current = 1, 0.0
+    for word in text.split():
+        word_width = text_width(word, font, size)
+        if current and current + space + word_width > width:
+            lines += 1
+            current = 0.0
+        elif current:
+            current += space
+        if word_width > width:
+            # A word longer than the line breaks across lines
+            extra, word_width = divmod(word_width, width)
+            lines += int(extra)
+        current += word_width
+    return lines
+
+
+def paragraph_height(text, level, width, sizes, font=DEFAULT_FONT, scale=1.0):
+    """Height in points of one paragraph, including its spacing before"""
+    size = sizes[level] * scale
+    text_box = width - LEVEL_MARGINS.get(level, LEVEL_MARGINS[0])
+    return size * (PARAGRAPH_SPACING + LINE_SPACING * line_count(text, text_box, font, size))
+
+
+def _fits(paragraphs, width, height, sizes, font, scale):
+    total = 0.0
+    for text, level in paragraphs:
+        total += paragraph_height(text, level, width, sizes, font, scale)
+        if total > height:
+            return False
+    return True
+
+
+def paginate(paragraphs, width, height, sizes, font=DEFAULT_FONT, min_scale=MIN_FONT_SCALE):
+    """
+    Lay out (text, level) paragraphs in a body box of width x height points.
+    Returns (pages, scale): the whole list on one page shrunk by scale if that
+    fits at min_scale or above, otherwise the list split into full-size pages.
+    """
+    width -= 2 * INSET_X
+    height -= 2 * INSET_Y
+
+    scale = 1.0
+    while scale >= min_scale - 1e-9:
+        if _fits(paragraphs, width, height, sizes, font, scale):
+            return [list(paragraphs)], round(scale, 2)
+        scale -= FONT_SCALE_STEP
+
+    pages, page, used = [], [], 0.0
+    for text, level in paragraphs:
+        if not page and not text.strip():
+            continue  # no blank spacer at the top of a page
+        paragraph = paragraph_height(text, level, width, sizes, font)
+        if page and used + paragraph > height:
+            # Move a trailing heading to the next page with its first item
+            carried = []
+            while len(page) > 1 and page[-1][1] < level and page[-1][0].strip():
+                carried.insert(0, page.pop())
+            pages.append(page)
+            page = carried
+            used = sum(paragraph_height(t, l, width, sizes, font) for t, l in page)
+        page.append((text, level))
+        used += paragraph
+    if page:
+        pages.append(page)
+    return pages, 1.0
+
+
+def emu_to_points(emu):
+    """Convert an EMU length to points"""
+    return emu / EMU_PER_POINT